@@ -0,0 +1,612 @@
+import re
+import time
+import numpy as np
+import market_data
+from metrics import timed
+
+# User-defined alert rules.
+#
+# A rule is a small boolean expression over price fields and indicators, e.g.
+#
+#     close crosses above sma(close, 50)
+#     rsi(14) > 70
+#     volume > 3 * sma(volume, 20)
+#     drawdown(close, 252) > 20
+#
+# Rules are parsed once into expression trees and compiled into a single
+# program shared by every rule. Identical sub-expressions (e.g. the same
+# sma(close, 50) used by several rules) are hash-consed into one node, so each
+# is computed once per evaluation. The program is evaluated with NumPy over a
+# (bars x tickers) panel, so all watched tickers are handled in one pass.
+#
+# A comparison whose inputs lack history (NaN) is undecided. Undecided
+# conditions are false, and stay false under 'not'; and/or follow
+# three-valued logic, so one decided side can still settle them.
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+# Functions taking (series, window). When called with a single numeric
+# argument the series defaults to close, so rsi(14) means rsi(close, 14).
+WINDOW_FUNCTIONS = ("sma", "ema", "rsi", "max", "min", "change", "drawdown")
+
+# Window functions whose value depends on the whole history rather than on
+# the last `window` bars only.
+RECURSIVE_FUNCTIONS = ("ema", "rsi")
+
+COMPARISONS = (">", ">=", "<", "<=", "==", "!=")
+
+_TOKEN_RE = re.compile(r"\s*(?:(\d+(?:\.\d*)?|\.\d+)|([A-Za-z_][A-Za-z_0-9]*)|(>=|<=|==|!=|[-+*/(),<>]))")
+
+
+class AlertRuleError(ValueError):
+    """Raised when an alert rule cannot be parsed or type-checked."""
+
+
+def _tokenize(rule):
+    tokens = []
+    pos = 0
+    rule = rule.strip()
+    while pos < len(rule):
+        match = _TOKEN_RE.match(rule, pos)
+        if not match:
+            raise AlertRuleError(f"Unexpected character {rule[pos]!r} at position {pos} in rule {rule!r}")
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(("number", float(number)))
+        elif name is not None:
+            tokens.append(("name", name.lower()))
+        else:
+            tokens.append(("op", op))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing nested tuples.
+
+    Grammar::
+
+        rule       := or_expr
+        or_expr    := and_expr ("or" and_expr)*
+        and_expr   := not_expr ("and" not_expr)*
+        not_expr   := "not" not_expr | comparison
+        comparison := sum (cmp_op sum | "crosses" ("above" | "below") sum)?
+        sum        := product (("+" | "-") product)*
+        product    := unary (("*" | "/") unary)*
+        unary      := "-" unary | atom
+        atom       := number | field | function "(" args ")" | "(" or_expr ")"
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.tokens = _tokenize(rule)
+        self.pos = 0
+
+    def error(self, message):
+        return AlertRuleError(f"{message} in rule {self.rule!r}")
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.peek() == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind, value):
+        if not self.accept(kind, value):
+            found = self.peek()[1]
+            raise self.error(f"Expected {value!r} but found {'end of rule' if found is None else repr(found)}")
+
+    def parse(self):
+        if not self.tokens:
+            raise self.error("Empty rule")
+        tree = self.or_expr()
+        if self.pos != len(self.tokens):
+            raise self.error(f"Unexpected {self.peek()[1]!r}")
+        return tree
+
+    def or_expr(self):
+        tree = self.and_expr()
+        while self.accept("name", "or"):
+            tree = ("or", tree, self.and_expr())
+        return tree
+
+    def and_expr(self):
+        tree = self.not_expr()
+        while self.accept("name", "and"):
+            tree = ("and", tree, self.not_expr())
+        return tree
+
+    def not_expr(self):
+        if self.accept("name", "not"):
+            return ("not", self.not_expr())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.sum()
+        kind, value = self.peek()
+        if kind == "op" and value in COMPARISONS:
+            self.take()
+            return (value, left, self.sum())
+        if (kind, value) == ("name", "crosses"):
+            self.take()
+            direction = self.take()
+            if direction not in (("name", "above"), ("name", "below")):
+                raise self.error("Expected 'above' or 'below' after 'crosses'")
+            return ("crosses_" + direction[1], left, self.sum())
+        return left
+
+    def sum(self):
+        tree = self.product()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            tree = (self.take()[1], tree, self.product())
+        return tree
+
+    def product(self):
+        tree = self.unary()
+        while self.peek() in (("op", "*"), ("op", "/")):
+            tree = (self.take()[1], tree, self.unary())
+        return tree
+
+    def unary(self):
+        if self.accept("op", "-"):
+            return ("neg", self.unary())
+        return self.atom()
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ("const", value)
+        if (kind, value) == ("op", "("):
+            tree = self.or_expr()
+            self.expect("op", ")")
+            return tree
+        if kind == "name" and value in FIELDS:
+            return ("field", value)
+        if kind == "name" and value in WINDOW_FUNCTIONS:
+            self.expect("op", "(")
+            args = [self.sum()]
+            while self.accept("op", ","):
+                args.append(self.sum())
+            self.expect("op", ")")
+            if len(args) == 1:
+                args.insert(0, ("field", "close"))
+            if len(args) != 2 or args[1][0] != "const":
+                raise self.error(f"{value}() takes a series and a constant window, e.g. {value}(close, 20)")
+            window = args[1][1]
+            if window < 1 or window != int(window):
+                raise self.error(f"{value}() window must be a positive integer")
+            return (value, args[0], int(window))
+        if kind is None:
+            raise self.error("Unexpected end of rule")
+        raise self.error(f"Unknown name {value!r}")
+
+
+def parse_rule(rule):
+    """
+    Parse an alert rule into an expression tree.
+
+    :param rule: Rule text, e.g. "rsi(close, 14) > 70"
+    :return: Nested tuple expression tree
+    """
+    return _Parser(rule).parse()
+
+
+class AlertProgram:
+    """
+    A set of alert rules compiled into one deduplicated list of NumPy operations.
+
+    Nodes are stored in topological order as (op, args, param) where args are
+    indices of earlier nodes. `roots[i]` is the node answering rule i.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.nodes = []
+        self.kinds = []
+        self._index = {}
+        self.roots = []
+        self.expression_count = 0
+        for rule in self.rules:
+            root = self._compile(parse_rule(rule), rule)
+            if self.kinds[root] != "bool":
+                raise AlertRuleError(f"Rule {rule!r} does not evaluate to true/false; add a comparison")
+            self.roots.append(root)
+        self.rows = self._required_rows()
+
+    def _intern(self, op, args, param, kind):
+        self.expression_count += 1
+        key = (op, args, param)
+        node = self._index.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self._index[key] = node
+            self.nodes.append(key)
+            self.kinds.append(kind)
+        return node
+
+    def _compile(self, tree, rule):
+        op = tree[0]
+        if op == "const":
+            return self._intern("const", (), tree[1], "const")
+        if op == "field":
+            return self._intern("field", (), tree[1], "series")
+        if op in WINDOW_FUNCTIONS:
+            arg = self._compile(tree[1], rule)
+            if self.kinds[arg] != "series":
+                raise AlertRuleError(f"{op}() needs a price series argument in rule {rule!r}")
+            return self._intern(op, (arg,), tree[2], "series")
+        if op == "neg":
+            arg = self._compile(tree[1], rule)
+            if self.kinds[arg] == "bool":
+                raise AlertRuleError(f"Cannot negate a condition in rule {rule!r}; use 'not'")
+            if self.kinds[arg] == "const":
+                return self._intern("const", (), -self.nodes[arg][2], "const")
+            return self._intern("neg", (arg,), None, "series")
+        if op == "not":
+            arg = self._compile(tree[1], rule)
+            if self.kinds[arg] != "bool":
+                raise AlertRuleError(f"'not' needs a condition in rule {rule!r}")
+            return self._intern("not", (arg,), None, "bool")
+
+        left = self._compile(tree[1], rule)
+        right = self._compile(tree[2], rule)
+        kinds = (self.kinds[left], self.kinds[right])
+        if op in ("and", "or"):
+            if kinds != ("bool", "bool"):
+                raise AlertRuleError(f"'{op}' needs conditions on both sides in rule {rule!r}")
+            return self._intern(op, tuple(sorted((left, right))), None, "bool")
+        if "bool" in kinds:
+            raise AlertRuleError(f"'{op}' cannot be applied to a condition in rule {rule!r}")
+        if op in ("+", "-", "*", "/"):
+            if kinds == ("const", "const"):
+                a, b = self.nodes[left][2], self.nodes[right][2]
+                if op == "/" and b == 0:
+                    raise AlertRuleError(f"Division by zero in rule {rule!r}")
+                return self._intern("const", (), _apply(op, [a, b], None, 1), "const")
+            if op in ("+", "*"):
+                left, right = sorted((left, right))
+            return self._intern(op, (left, right), None, "series")
+        if kinds == ("const", "const"):
+            raise AlertRuleError(f"Rule {rule!r} compares two constants")
+        # Canonicalise a < b as b > a so mirrored comparisons share a node.
+        if op in ("<", "<="):
+            op, left, right = op.replace("<", ">"), right, left
+        elif op in ("==", "!="):
+            left, right = sorted((left, right))
+        return self._intern(op, (left, right), None, "bool")
+
+    def _required_rows(self):
+        """Work out how many trailing bars each node must produce.
+
+        Rules only look at the latest bar, so pointwise nodes are evaluated on
+        a short tail instead of the whole history. Window functions widen the
+        requirement of their input by the window length; recursive ones
+        (ema, rsi) need the full history, marked as None.
+        """
+        rows = [0] * len(self.nodes)
+        for root in self.roots:
+            rows[root] = 1
+        for node in range(len(self.nodes) - 1, -1, -1):
+            op, args, param = self.nodes[node]
+            need = rows[node]
+            if need is None or need == 0:
+                child_need = None if need is None else 0
+            elif op in RECURSIVE_FUNCTIONS:
+                child_need = None
+            elif op in ("sma", "max", "min", "drawdown"):
+                child_need = need + param - 1
+            elif op == "change":
+                child_need = need + param
+            elif op in ("crosses_above", "crosses_below"):
+                child_need = need + 1
+            else:
+                child_need = need
+            for arg in args:
+                if child_need is None or rows[arg] is None:
+                    rows[arg] = None
+                else:
+                    rows[arg] = max(rows[arg], child_need)
+        return rows
+
+    @property
+    def max_lookback(self):
+        """Largest number of bars any rule looks back over."""
+        windows = [param for op, _, param in self.nodes if op in WINDOW_FUNCTIONS]
+        return max(windows, default=1) + 1
+
+    @timed("alerts.evaluate")
+    def evaluate(self, panel):
+        """
+        Evaluate every rule against every ticker of a panel.
+
+        :param panel: Dict mapping field name to a (bars, tickers) float array
+        :return: Boolean array of shape (rules, tickers)
+        """
+        total_rows = next(iter(panel.values())).shape[0]
+        values = [None] * len(self.nodes)
+        # For conditions: where the inputs had enough history to decide them.
+        known = [None] * len(self.nodes)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node, (op, args, param) in enumerate(self.nodes):
+                rows = self.rows[node]
+                rows = total_rows if rows is None else min(rows, total_rows)
+                if op == "const":
+                    values[node] = np.float64(param)
+                elif op == "field":
+                    if param not in panel:
+                        raise AlertRuleError(f"Panel has no {param!r} data")
+                    values[node] = panel[param][total_rows - rows:]
+                else:
+                    inputs = [values[arg] for arg in args]
+                    values[node] = _apply(op, inputs, param, rows)
+                    if self.kinds[node] == "bool":
+                        # An undecided condition is false, including under 'not' and '!='.
+                        known[node] = _known(op, inputs, [known[arg] for arg in args], rows)
+                        values[node] = values[node] & known[node]
+        n_tickers = next(iter(panel.values())).shape[1]
+        result = np.zeros((len(self.roots), n_tickers), dtype=bool)
+        for i, root in enumerate(self.roots):
+            result[i] = values[root][-1]
+        return result
+
+
+def _tail(value, rows):
+    return value if np.ndim(value) == 0 else value[-rows:]
+
+
+def _pad(result, rows):
+    """Left-pad with NaN so a window result has exactly `rows` rows."""
+    if result.shape[0] >= rows:
+        return result[result.shape[0] - rows:]
+    padding = np.full((rows - result.shape[0],) + result.shape[1:], np.nan)
+    return np.concatenate([padding, result])
+
+
+def _rolling(values, window, reducer):
+    if values.shape[0] < window:
+        return np.empty((0,) + values.shape[1:])
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+    return reducer(windows, axis=-1)
+
+
+def _sma(values, window):
+    if values.shape[0] < window:
+        return np.empty((0,) + values.shape[1:])
+    cumsum = np.cumsum(np.concatenate([np.zeros((1,) + values.shape[1:]), values]), axis=0)
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+def _ema(values, window, alpha=None):
+    alpha = 2.0 / (window + 1) if alpha is None else alpha
+    result = np.empty_like(values)
+    current = np.full(values.shape[1:], np.nan)
+    for i in range(values.shape[0]):
+        row = values[i]
+        current = np.where(np.isnan(current), row, np.where(np.isnan(row), current, current + alpha * (row - current)))
+        result[i] = current
+    return result
+
+
+def _rsi(values, window):
+    delta = np.diff(values, axis=0, prepend=np.nan)
+    gains = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+    losses = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    avg_gain = _ema(gains, window, alpha=1.0 / window)
+    avg_loss = _ema(losses, window, alpha=1.0 / window)
+    rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, 100.0, rsi)
+    # Wilder smoothing needs `window` changes before it is meaningful.
+    valid = np.cumsum(~np.isnan(delta), axis=0) >= window
+    return np.where(valid, rsi, np.nan)
+
+
+def _known(op, inputs, known, rows):
+    """
+    Where a condition is decided: its compared values are not NaN, or for
+    and/or, one side alone settles the result (three-valued logic).
+    """
+    if op == "not":
+        return known[0][-rows:]
+    if op in ("and", "or"):
+        a, b = inputs[0][-rows:], inputs[1][-rows:]
+        known_a, known_b = known[0][-rows:], known[1][-rows:]
+        settles = ~a if op == "and" else a
+        other_settles = ~b if op == "and" else b
+        return (known_a & known_b) | (known_a & settles) | (known_b & other_settles)
+    if op in ("crosses_above", "crosses_below"):
+        a, b = _tail(inputs[0], rows + 1), _tail(inputs[1], rows + 1)
+        present = ~np.isnan(a) & ~np.isnan(b)
+        decided = present[1:] & present[:-1]
+        if decided.shape[0] < rows:
+            padding = np.zeros((rows - decided.shape[0],) + decided.shape[1:], dtype=bool)
+            decided = np.concatenate([padding, decided])
+        return decided
+    a, b = _tail(inputs[0], rows), _tail(inputs[1], rows)
+    return ~np.isnan(a) & ~np.isnan(b)
+
+
+def _apply(op, inputs, param, rows):
+    if op == "sma":
+        return _pad(_sma(inputs[0], param), rows)
+    if op == "max":
+        return _pad(_rolling(inputs[0], param, np.max), rows)
+    if op == "min":
+        return _pad(_rolling(inputs[0], param, np.min), rows)
+    if op == "drawdown":
+        series = inputs[0][-(rows + param - 1):]
+        peak = _pad(_rolling(series, param, np.max), rows)
+        return (1.0 - series[-rows:] / peak) * 100.0
+    if op == "change":
+        series = inputs[0]
+        if series.shape[0] <= param:
+            return np.full((rows,) + series.shape[1:], np.nan)
+        return _pad((series[param:] / series[:-param] - 1.0) * 100.0, rows)
+    if op == "ema":
+        return _ema(inputs[0], param)[-rows:]
+    if op == "rsi":
+        return _rsi(inputs[0], param)[-rows:]
+    if op == "neg":
+        return -inputs[0][-rows:]
+    if op == "not":
+        return ~inputs[0][-rows:]
+    if op in ("crosses_above", "crosses_below"):
+        a, b = _tail(inputs[0], rows + 1), _tail(inputs[1], rows + 1)
+        if op == "crosses_above":
+            crossed = (a > b)[1:] & (a <= b)[:-1]
+        else:
+            crossed = (a < b)[1:] & (a >= b)[:-1]
+        if crossed.shape[0] < rows:
+            padding = np.zeros((rows - crossed.shape[0],) + crossed.shape[1:], dtype=bool)
+            crossed = np.concatenate([padding, crossed])
+        return crossed
+    a, b = _tail(inputs[0], rows), _tail(inputs[1], rows)
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return a / b
+    if op == "and":
+        return a & b
+    if op == "or":
+        return a | b
+    if op == ">":
+        return a > b
+    if op == ">=":
+        return a >= b
+    if op == "==":
+        return a == b
+    if op == "!=":
+        return a != b
+    raise AlertRuleError(f"Unknown operation {op!r}")
+
+
+def build_panel(histories):
+    """
+    Align per-ticker OHLCV frames into one panel of (bars, tickers) arrays.
+
+    :param histories: Dict mapping ticker to a history DataFrame (yfinance column names)
+    :return: Tuple (tickers, panel) where panel maps lower-case field names to float arrays
+    """
+    tickers = [ticker for ticker, frame in histories.items() if frame is not None and not frame.empty]
+    if not tickers:
+        return [], {}
+    index = histories[tickers[0]].index
+    for ticker in tickers[1:]:
+        index = index.union(histories[ticker].index)
+    panel = {}
+    for field in FIELDS:
+        column = field.capitalize()
+        panel[field] = np.column_stack([
+            histories[ticker][column].reindex(index).to_numpy(dtype=float) if column in histories[ticker]
+            else np.full(len(index), np.nan)
+            for ticker in tickers
+        ])
+    return tickers, panel
+
+
+@timed("fetch.histories")
+def fetch_histories(tickers, period="1y"):
+    """
+    Download daily history for several tickers in one batched request.
+
+    :param tickers: List of stock ticker symbols
+    :param period: yfinance period string
+    :return: Dict mapping ticker to its history DataFrame
+    """
+    return market_data.histories(tickers, period)
+
+
+def period_for_lookback(bars):
+    """Smallest yfinance period that covers `bars` daily bars."""
+    for period, period_bars in (("3mo", 60), ("6mo", 120), ("1y", 250), ("2y", 500), ("5y", 1250)):
+        if bars <= period_bars:
+            return period
+    return "max"
+
+
+def check_alert_rules(watchlist, rules):
+    """
+    Evaluate user-defined alert rules against the latest bar of each watched ticker.
+
+    :param watchlist: List of stock tickers to monitor
+    :param rules: List of rule strings
+    :return: List of (rule, ticker) pairs whose rule is currently true
+    """
+    if not watchlist or not rules:
+        return []
+    program = AlertProgram(rules)
+    tickers, panel = build_panel(fetch_histories(watchlist, period_for_lookback(program.max_lookback)))
+    if not tickers:
+        return []
+    triggered = program.evaluate(panel)
+    return [(rules[i], tickers[j]) for i, j in zip(*np.nonzero(triggered))]
+
+
+def _random_walk_panel(num_tickers, num_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(num_bars, num_tickers))
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape))
+    return {
+        "open": close * (1 + rng.normal(0, 0.005, size=close.shape)),
+        "high": close * (1 + spread),
+        "low": close * (1 - spread),
+        "close": close,
+        "volume": rng.lognormal(14, 0.5, size=close.shape),
+    }
+
+
+def _random_rules(num_rules, seed=0):
+    rng = np.random.default_rng(seed)
+    templates = [
+        lambda: f"close crosses above sma(close, {rng.choice([20, 50, 100, 200])})",
+        lambda: f"close crosses below sma(close, {rng.choice([20, 50, 100, 200])})",
+        lambda: f"rsi({rng.choice([7, 14, 21])}) > {rng.integers(60, 90)}",
+        lambda: f"rsi({rng.choice([7, 14, 21])}) < {rng.integers(10, 40)}",
+        lambda: f"volume > {rng.integers(2, 6)} * sma(volume, {rng.choice([10, 20, 50])})",
+        lambda: f"drawdown(close, 252) > {rng.integers(5, 50)}",
+        lambda: f"change(close, {rng.choice([1, 5, 20])}) > {rng.integers(1, 15)} and close > ema(close, {rng.choice([12, 26, 50])})",
+    ]
+    return [templates[rng.integers(len(templates))]() for _ in range(num_rules)]
+
+
+def benchmark_alert_rules(num_rules=10000, num_tickers=1000, num_bars=260):
+    """
+    Benchmark compiling and evaluating many alert rules over many tickers.
+
+    :param num_rules: Number of synthetic rules
+    :param num_tickers: Number of synthetic tickers
+    :param num_bars: Number of daily bars per ticker
+    """
+    panel = _random_walk_panel(num_tickers, num_bars)
+    rules = _random_rules(num_rules)
+
+    start_time = time.perf_counter()
+    program = AlertProgram(rules)
+    compile_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    triggered = program.evaluate(panel)
+    evaluate_time = time.perf_counter() - start_time
+
+    print(f"Compiled {num_rules} rules in {compile_time:.2f} seconds "
+          f"({program.expression_count} sub-expressions deduplicated to {len(program.nodes)} nodes)")
+    print(f"Evaluated {num_rules} rules x {num_tickers} tickers in {evaluate_time:.2f} seconds "
+          f"({triggered.sum()} alerts triggered)")
+
+
+if __name__ == "__main__":
+    print("Running alert rule benchmark...")
+    benchmark_alert_rules()
@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from metrics import timed
+
+# Approximate pixel width of the price chart column. Sending more points than
+# there are pixels only grows the payload without changing what is drawn.
+DEFAULT_CHART_WIDTH = 700
+
+PERIOD_LABELS = {
+    "1mo": "Last Month",
+    "6mo": "Last 6 Months",
+    "1y": "Last Year",
+    "5y": "Last 5 Years",
+    "max": "All Time",
+}
+
+FIGURE_CACHE_SIZE = 64
+
+_figure_cache = OrderedDict()
+# Sessions run in concurrent threads; the lock guards every read and update of the LRU order.
+_figure_cache_lock = threading.Lock()
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    :param x: Numeric x values (monotonic)
+    :param y: Numeric y values
+    :param threshold: Number of points to keep
+    :return: Sorted indices of the points to keep
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_downsample(y, buckets):
+    """
+    Keep the minimum and maximum point of each of `buckets` equal-width buckets.
+
+    :param y: Numeric y values
+    :param buckets: Number of buckets
+    :return: Sorted indices of the points to keep
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+
+def _bucket_starts(n, buckets):
+    if buckets >= n:
+        return np.arange(n)
+    return np.unique(np.arange(buckets) * n // buckets)
+
+
+def downsample_ohlc(history, buckets):
+    """
+    Aggregate OHLCV bars into at most `buckets` coarser bars.
+
+    :param history: DataFrame with Open, High, Low, Close and Volume columns
+    :param buckets: Maximum number of bars to return
+    :return: Downsampled DataFrame indexed by each bucket's first timestamp
+    """
+    n = len(history)
+    if buckets >= n:
+        return history
+    starts = _bucket_starts(n, buckets)
+    ends = np.append(starts[1:], n) - 1
+    data = {
+        "Open": history["Open"].to_numpy()[starts],
+        "High": np.maximum.reduceat(history["High"].to_numpy(), starts),
+        "Low": np.minimum.reduceat(history["Low"].to_numpy(), starts),
+        "Close": history["Close"].to_numpy()[ends],
+    }
+    if "Volume" in history:
+        data["Volume"] = np.add.reduceat(history["Volume"].to_numpy(), starts)
+    return pd.DataFrame(data, index=history.index[starts])
+
+
+def downsample_series(series, width=DEFAULT_CHART_WIDTH, method="lttb"):
+    """
+    Downsample a price series to roughly one point per horizontal pixel.
+
+    :param series: pandas Series indexed by timestamp
+    :param width: Chart width in pixels
+    :param method: "lttb" or "minmax"
+    :return: Downsampled Series
+    """
+    series = series.dropna()
+    if len(series) <= width:
+        return series
+    if method == "minmax":
+        keep = minmax_downsample(series.to_numpy(), width // 2)
+    else:
+        x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+        keep = lttb(x, series.to_numpy(), width)
+    return series.iloc[keep]
+
+
+def _history_fingerprint(history):
+    if history is None or history.empty:
+        return (0,)
+    return (len(history), history.index[0], history.index[-1], float(history["Close"].iloc[-1]))
+
+
+@timed("charts.build_price_figure")
+def build_price_figure(ticker, history, period="6mo", dark_mode=False, mode="line", width=DEFAULT_CHART_WIDTH):
+    """
+    Build a downsampled price chart.
+
+    :param ticker: Stock ticker symbol
+    :param history: DataFrame of OHLCV bars
+    :param period: yfinance period string the history covers
+    :param dark_mode: Use the dark Plotly template
+    :param mode: "line" or "candlestick" (candlesticks with a volume panel)
+    :param width: Chart width in pixels, used to size the downsampling
+    :return: Plotly Figure
+    """
+    template = "plotly_dark" if dark_mode else "plotly_white"
+    title = f"{ticker} Stock Price ({PERIOD_LABELS.get(period, period)})"
+
+    if mode == "candlestick":
+        bars = downsample_ohlc(history, max(width // 4, 1))
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.75, 0.25])
+        fig.add_trace(go.Candlestick(
+            x=bars.index, open=bars["Open"], high=bars["High"], low=bars["Low"], close=bars["Close"], name="Price"
+        ), row=1, col=1)
+        if "Volume" in bars:
+            fig.add_trace(go.Bar(x=bars.index, y=bars["Volume"], name="Volume", marker_color="#4facfe"), row=2, col=1)
+        fig.update_layout(xaxis_rangeslider_visible=False, showlegend=False)
+        fig.update_yaxes(title_text="Price", row=1, col=1)
+        fig.update_yaxes(title_text="Volume", row=2, col=1)
+    else:
+        close = downsample_series(history["Close"], width)
+        fig = go.Figure(data=go.Scatter(x=close.index, y=close.to_numpy(), mode='lines', name='Close'))
+        fig.update_layout(xaxis_title="Date", yaxis_title="Price")
+
+    fig.update_layout(title=title, template=template)
+    return fig
+
+
+def get_price_figure(ticker, history, period="6mo", dark_mode=False, mode="line", width=DEFAULT_CHART_WIDTH):
+    """
+    Return a cached price chart, rebuilding it only when the inputs or the data change.
+
+    Parameters are the same as build_price_figure. Figures are cached per
+    (ticker, period, theme, mode, width) together with a fingerprint of the
+    history, so a rerun with unchanged data skips rebuilding the figure.
+    """
+    key = (ticker, period, bool(dark_mode), mode, width)
+    fingerprint = _history_fingerprint(history)
+    with _figure_cache_lock:
+        cached = _figure_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _figure_cache.move_to_end(key)
+            return cached[1]
+    # Built outside the lock so other sessions are not held up by it.
+    fig = build_price_figure(ticker, history, period, dark_mode, mode, width)
+    with _figure_cache_lock:
+        _figure_cache[key] = (fingerprint, fig)
+        _figure_cache.move_to_end(key)
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return fig
+
+
+def _synthetic_history(num_bars, freq, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars)))
+    spread = np.abs(rng.normal(0, 0.005, num_bars))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.002, num_bars)),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 5_000_000, num_bars),
+    }, index=pd.date_range("2000-01-03", periods=num_bars, freq=freq))
+
+
+def benchmark_price_chart(repeats=5):
+    """
+    Compare payload size and build+serialize time of the original full-resolution
+    chart against the downsampled and cached charts.
+
+    Browser render time is proportional to the number of points in the payload,
+    so point counts and payload bytes are reported as its proxy.
+
+    :param repeats: Number of timed builds per case
+    """
+    cases = {
+        "6mo daily": _synthetic_history(126, "B"),
+        "5y daily": _synthetic_history(1260, "B"),
+        "20y daily": _synthetic_history(5040, "B"),
+        "1mo 1-minute": _synthetic_history(30 * 390, "min"),
+    }
+    for name, history in cases.items():
+        results = {}
+
+        def original():
+            fig = go.Figure(data=go.Scatter(x=history.index, y=history['Close'], mode='lines', name='Close'))
+            fig.update_layout(title="Benchmark", template="plotly_white")
+            return fig
+
+        builders = {
+            "original": original,
+            "line": lambda: build_price_figure("BENCH", history, mode="line"),
+            "candlestick": lambda: build_price_figure("BENCH", history, mode="candlestick"),
+            "cached": lambda: get_price_figure("BENCH", history, period=name, mode="line"),
+        }
+        for label, builder in builders.items():
+            builder()
+            start_time = time.perf_counter()
+            for _ in range(repeats):
+                payload = builder().to_json()
+            results[label] = ((time.perf_counter() - start_time) / repeats * 1000, len(payload))
+
+        print(f"{name} ({len(history)} bars):")
+        for label, (elapsed_ms, size) in results.items():
+            print(f"  {label:<12} {size / 1024:8.1f} KiB  {elapsed_ms:7.1f} ms build+serialize")
+
+
+if __name__ == "__main__":
+    print("Running price chart benchmark...")
+    benchmark_price_chart()
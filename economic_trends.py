@@ -1,9 +1,84 @@
-import requests
+import io
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from metrics import timed, increment
 
-def get_economic_trends():
-    # This is a mock function. In a real-world scenario, you would use an API to fetch actual economic data.
-    # For demonstration purposes, we'll return some static data.
-    return """
+# Macro-economic time series.
+#
+# The MacroStore keeps each series as two columns (observation dates and
+# values), loaded from local drops and, optionally, a fetcher:
+#
+#   drops     INVESTSMARTLY_MACRO_DIR/<SERIES>.csv (a FRED CSV download, or any
+#             CSV whose first column is the date and last column the value) or
+#             <SERIES>.json (a list of {"date", "value"} objects, or a FRED API
+#             response with an "observations" list)
+#   fetcher   a callable taking a series id and returning CSV text in the same
+#             format; fred_csv_fetcher downloads FRED's public CSV and is used
+#             unless INVESTSMARTLY_MACRO_FETCH=off. Fetches run in a background
+#             thread, so the tab keeps serving the current data meanwhile
+#
+# Ingested columns are cached as .npz files so drops are parsed only when they
+# change. Every series has a version that increases only when it gets a new or
+# revised observation. Derived views (YoY change, moving averages, the yield
+# curve spread) are computed on first use and recomputed only when the version
+# of one of their inputs changes.
+
+MACRO_DATA_DIR = os.environ.get('INVESTSMARTLY_MACRO_DIR', 'macro_data')
+MACRO_CACHE_DIR = os.path.join(os.environ.get('INVESTSMARTLY_CACHE_DIR', '.cache'), 'macro')
+
+# Seconds between checks of the drops and fetches from the fetcher.
+DROP_CHECK_SECONDS = 60
+FETCH_INTERVAL_SECONDS = 6 * 3600
+FETCH_RETRY_SECONDS = 600
+
+SERIES = {
+    "CPIAUCSL": {"name": "Consumer Price Index", "units": "Index 1982-1984=100", "frequency": "monthly"},
+    "UNRATE": {"name": "Unemployment Rate", "units": "%", "frequency": "monthly"},
+    "GDPC1": {"name": "Real GDP", "units": "Billions of chained 2017 dollars", "frequency": "quarterly"},
+    "FEDFUNDS": {"name": "Federal Funds Rate", "units": "%", "frequency": "monthly"},
+    "DGS10": {"name": "10-Year Treasury Yield", "units": "%", "frequency": "daily"},
+    "DGS2": {"name": "2-Year Treasury Yield", "units": "%", "frequency": "daily"},
+}
+
+
+def _yoy(series, periods):
+    return (series / series.shift(periods) - 1).dropna() * 100
+
+
+def _annualized_growth(series):
+    return ((series / series.shift(1)) ** 4 - 1).dropna() * 100
+
+
+def _moving_average(series, window):
+    return series.rolling(window).mean().dropna()
+
+
+def _spread(long, short):
+    aligned = pd.concat([long, short], axis=1, join="inner").dropna()
+    return aligned.iloc[:, 0] - aligned.iloc[:, 1]
+
+
+# Derived views: name -> (title, units, input series, function of the inputs).
+DERIVED_VIEWS = {
+    "inflation": ("Inflation (CPI, year over year)", "%", ("CPIAUCSL",), lambda cpi: _yoy(cpi, 12)),
+    "unemployment": ("Unemployment Rate", "%", ("UNRATE",), lambda rate: rate),
+    "unemployment_12m_avg": ("Unemployment Rate, 12-month average", "%", ("UNRATE",), lambda rate: _moving_average(rate, 12)),
+    "gdp_growth": ("Real GDP Growth (annualized)", "%", ("GDPC1",), _annualized_growth),
+    "gdp_yoy": ("Real GDP, year over year", "%", ("GDPC1",), lambda gdp: _yoy(gdp, 4)),
+    "fed_funds": ("Federal Funds Rate", "%", ("FEDFUNDS",), lambda rate: rate),
+    "treasury_10y": ("10-Year Treasury Yield", "%", ("DGS10",), lambda yield_10y: yield_10y),
+    "treasury_10y_50d_avg": ("10-Year Treasury Yield, 50-day average", "%", ("DGS10",), lambda yield_10y: _moving_average(yield_10y, 50)),
+    "yield_curve_spread": ("Yield Curve Spread (10Y - 2Y)", "percentage points", ("DGS10", "DGS2"), _spread),
+}
+
+# Views shown as headline figures, in order.
+HEADLINE_VIEWS = ["inflation", "unemployment", "gdp_growth", "fed_funds", "treasury_10y", "yield_curve_spread"]
+
+STATIC_TRENDS = """
     Current Economic Trends:
     1. Inflation Rate: 2.6%
     2. Unemployment Rate: 6.1%
@@ -16,3 +91,391 @@ def get_economic_trends():
     - Looking for companies with strong pricing power
     - Monitoring the Federal Reserve's policies and their impact on interest rates
     """
+
+
+def parse_observations(data, filename="data.csv"):
+    """
+    Parse a CSV or JSON drop into observation columns.
+
+    Missing values ("." in FRED files, empty cells, null) are dropped.
+
+    :param data: File contents, as text
+    :param filename: Name of the file, whose extension selects the format
+    :return: Tuple (dates as datetime64[D], values as float64), sorted by date
+    """
+    if filename.endswith(".json"):
+        records = json.loads(data)
+        if isinstance(records, dict):
+            records = records.get("observations", [])
+        dates = [record["date"] for record in records]
+        values = [record["value"] for record in records]
+    else:
+        frame = pd.read_csv(io.StringIO(data), dtype=str)
+        dates = frame.iloc[:, 0]
+        values = frame.iloc[:, -1]
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(dtype="datetime64[D]")
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    keep = ~np.isnan(values) & ~np.isnat(dates)
+    order = np.argsort(dates[keep], kind="stable")
+    return dates[keep][order], values[keep][order]
+
+
+def fred_csv_fetcher(series_id, timeout=5):
+    """
+    Download a series from FRED's public CSV endpoint (no API key needed).
+
+    :param series_id: FRED series id, e.g. "CPIAUCSL"
+    :param timeout: Request timeout in seconds
+    :return: CSV text
+    """
+    import requests
+    response = requests.get("https://fred.stlouisfed.org/graph/fredgraph.csv", params={"id": series_id}, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+
+class MacroStore:
+    """
+    Columnar store of macro series with lazily computed, versioned derived views.
+
+    :param data_dir: Directory of CSV/JSON drops
+    :param cache_dir: Directory for the columnar cache, or None to keep it in memory only
+    :param fetcher: Callable returning CSV text for a series id, or None
+    :param series: Series ids to load
+    """
+
+    def __init__(self, data_dir=MACRO_DATA_DIR, cache_dir=MACRO_CACHE_DIR, fetcher=None, series=tuple(SERIES)):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.series_ids = list(series)
+        self._columns = {}
+        self.versions = {}
+        self._series = {}
+        self._views = {}
+        self._drop_stats = {}
+        self._checked_at = 0
+        self._fetched_at = 0
+        self._fetch_failed_at = 0
+        self._fetch_thread = None
+        self._lock = threading.RLock()
+        if cache_dir:
+            self._load_cache()
+
+    def _cache_path(self, series_id):
+        return os.path.join(self.cache_dir, f"{series_id}.npz")
+
+    def _load_cache(self):
+        for series_id in self.series_ids:
+            try:
+                with np.load(self._cache_path(series_id)) as cached:
+                    self._columns[series_id] = (cached["dates"], cached["values"])
+                    self.versions[series_id] = int(cached["version"])
+                    self._drop_stats[series_id] = tuple(cached["drop_stat"])
+            except (OSError, KeyError, ValueError):
+                continue
+
+    def _save_cache(self, series_id):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        dates, values = self._columns[series_id]
+        tmp_path = f"{self._cache_path(series_id)}.tmp.npz"
+        np.savez(tmp_path, dates=dates, values=values, version=self.versions[series_id],
+                 drop_stat=np.array(self._drop_stats.get(series_id, (0, 0)), dtype=np.int64))
+        os.replace(tmp_path, self._cache_path(series_id))
+
+    @timed("macro.ingest")
+    def ingest(self, series_id, dates, values):
+        """
+        Merge observations into a series; later observations for a date replace earlier ones.
+
+        :param series_id: Series id
+        :param dates: Observation dates (anything numpy converts to datetime64[D])
+        :param values: Observation values
+        :return: True if the series got a new or revised observation
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            old_dates, old_values = self._columns.get(series_id, (np.empty(0, "datetime64[D]"), np.empty(0)))
+            # np.unique keeps the first occurrence of each date; new observations come first so they win.
+            merged_dates, first = np.unique(np.concatenate([dates, old_dates]), return_index=True)
+            merged_values = np.concatenate([values, old_values])[first]
+            if np.array_equal(merged_dates, old_dates) and np.array_equal(merged_values, old_values):
+                return False
+            self._columns[series_id] = (merged_dates, merged_values)
+            self.versions[series_id] = self.versions.get(series_id, 0) + 1
+            self._series.pop(series_id, None)
+            increment("macro.series_updated")
+            return True
+
+    def _load_drops(self):
+        changed = []
+        for series_id in self.series_ids:
+            for extension in (".csv", ".json"):
+                path = os.path.join(self.data_dir, f"{series_id}{extension}")
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                key = (stat.st_mtime_ns, stat.st_size)
+                if self._drop_stats.get(series_id) == key:
+                    break
+                with open(path) as f:
+                    dates, values = parse_observations(f.read(), path)
+                self._drop_stats[series_id] = key
+                if self.ingest(series_id, dates, values):
+                    changed.append(series_id)
+                self._save_cache(series_id)
+                break
+        return changed
+
+    def _fetch(self):
+        # Runs without the store lock, so readers are never blocked on the network;
+        # ingest takes the lock for each series.
+        changed = []
+        try:
+            for series_id in self.series_ids:
+                try:
+                    dates, values = parse_observations(self.fetcher(series_id), f"{series_id}.csv")
+                except Exception as e:
+                    # Stop at the first failure rather than wait on every series.
+                    print(f"Error fetching {series_id}: {e}")
+                    increment("macro.fetch_errors")
+                    self._fetch_failed_at = time.time()
+                    return changed
+                with self._lock:
+                    if self.ingest(series_id, dates, values):
+                        changed.append(series_id)
+                        self._save_cache(series_id)
+            self._fetched_at = time.time()
+            return changed
+        finally:
+            with self._lock:
+                self._fetch_thread = None
+
+    @property
+    def fetching(self):
+        """True while a background fetch is running."""
+        return self._fetch_thread is not None
+
+    def refresh(self, force=False, wait=False):
+        """
+        Pick up changed drops and, when due, start a fetch from the fetcher in
+        a background thread.
+
+        Cheap to call on every rerun: drops are checked at most every
+        DROP_CHECK_SECONDS and the fetcher runs at most every FETCH_INTERVAL_SECONDS.
+
+        :param force: Check and fetch now
+        :param wait: Wait for the fetch and include its series in the result
+        :return: List of series ids that got new observations
+        """
+        now = time.time()
+        changed = []
+        thread = None
+        with self._lock:
+            if force or now - self._checked_at >= DROP_CHECK_SECONDS:
+                self._checked_at = now
+                changed += self._load_drops()
+            if self.fetcher is not None and self._fetch_thread is None and (force or (
+                    now - self._fetched_at >= FETCH_INTERVAL_SECONDS and now - self._fetch_failed_at >= FETCH_RETRY_SECONDS)):
+                fetched = []
+                thread = threading.Thread(target=lambda: fetched.extend(self._fetch()), name="macro-fetch", daemon=True)
+                self._fetch_thread = thread
+                thread.start()
+        if wait and thread is not None:
+            thread.join()
+            changed += fetched
+        return changed
+
+    def series(self, series_id):
+        """
+        A series as a pandas Series indexed by date.
+
+        :param series_id: Series id
+        :return: Series, or None if there are no observations
+        """
+        with self._lock:
+            series = self._series.get(series_id)
+            if series is None and series_id in self._columns:
+                dates, values = self._columns[series_id]
+                series = pd.Series(values, index=pd.DatetimeIndex(dates.astype("datetime64[ns]"), name="Date"), name=series_id)
+                self._series[series_id] = series
+            return series
+
+    def view(self, name):
+        """
+        A derived view, recomputed only when one of its input series has changed.
+
+        :param name: Key of DERIVED_VIEWS
+        :return: Series, or None if an input series has no observations
+        """
+        title, units, inputs, compute = DERIVED_VIEWS[name]
+        # Under the lock so a background fetch cannot change the inputs between
+        # reading their versions and their values.
+        with self._lock:
+            key = tuple(self.versions.get(series_id, 0) for series_id in inputs)
+            cached = self._views.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            if not all(self.versions.get(series_id) for series_id in inputs):
+                return None
+            with timed("macro.compute_view"):
+                view = compute(*(self.series(series_id) for series_id in inputs))
+            view.name = name
+            increment("macro.views_computed")
+            self._views[name] = (key, view)
+            return view
+
+    def view_version(self, name):
+        """Version key of a view; changes exactly when the view is recomputed."""
+        return tuple(self.versions.get(series_id, 0) for series_id in DERIVED_VIEWS[name][2])
+
+    def headlines(self):
+        """
+        Latest value of each headline view.
+
+        :return: List of dicts with name, title, units, value, change since the
+                 previous observation, and date
+        """
+        headlines = []
+        for name in HEADLINE_VIEWS:
+            view = self.view(name)
+            if view is None or view.empty:
+                continue
+            title, units = DERIVED_VIEWS[name][:2]
+            headlines.append({
+                "name": name,
+                "title": title,
+                "units": units,
+                "value": float(view.iloc[-1]),
+                "change": float(view.iloc[-1] - view.iloc[-2]) if len(view) > 1 else 0.0,
+                "date": view.index[-1],
+            })
+        return headlines
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_macro_store():
+    """
+    The process-wide store, created on first use and refreshed when due.
+
+    Fetches from FRED unless INVESTSMARTLY_MACRO_FETCH=off; they run in the
+    background, so the first call may return a store that is still empty.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            fetcher = None if os.environ.get('INVESTSMARTLY_MACRO_FETCH', 'fred') == 'off' else fred_csv_fetcher
+            _store = MacroStore(fetcher=fetcher)
+    _store.refresh()
+    return _store
+
+
+def get_economic_trends(store=None):
+    """
+    Summarise the latest macro figures, or the static overview when no data has been loaded.
+
+    :param store: MacroStore to read, or None for the process-wide store
+    :return: Text summary
+    """
+    headlines = (store or get_macro_store()).headlines()
+    if not headlines:
+        return STATIC_TRENDS
+    lines = ["Current Economic Trends:"]
+    for i, headline in enumerate(headlines, 1):
+        units = "%" if headline["units"] == "%" else f" {headline['units']}"
+        lines.append(f"{i}. {headline['title']}: {headline['value']:.2f}{units} ({headline['date']:%b %Y})")
+    return "\n".join(lines)
+
+
+_figure_cache = {}
+
+
+def get_view_figure(store, name, dark_mode=False):
+    """
+    Line chart of a derived view, rebuilt only when the view changes.
+
+    :param store: MacroStore
+    :param name: Key of DERIVED_VIEWS
+    :param dark_mode: Use the dark Plotly template
+    :return: Plotly Figure, or None if the view has no data
+    """
+    key = (id(store), name, bool(dark_mode))
+    version = store.view_version(name)
+    cached = _figure_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    view = store.view(name)
+    if view is None:
+        return None
+    from charts import downsample_series
+    import plotly.graph_objects as go
+    title, units = DERIVED_VIEWS[name][:2]
+    points = downsample_series(view)
+    fig = go.Figure(data=go.Scatter(x=points.index, y=points.to_numpy(), mode="lines", name=title))
+    fig.update_layout(title=title, yaxis_title=units, template="plotly_dark" if dark_mode else "plotly_white")
+    _figure_cache[key] = (version, fig)
+    return fig
+
+
+def _synthetic_observations(series_id, start="1960-01-01", end="2026-01-01"):
+    frequency = SERIES[series_id]["frequency"]
+    dates = pd.date_range(start, end, freq={"monthly": "MS", "quarterly": "QS", "daily": "B"}[frequency])
+    rng = np.random.default_rng(sum(map(ord, series_id)))
+    if series_id in ("CPIAUCSL", "GDPC1"):
+        values = 100 * np.exp(np.cumsum(rng.normal(0.003, 0.003, len(dates))))
+    else:
+        values = np.clip(5 + np.cumsum(rng.normal(0, 0.05, len(dates))), 0, None)
+    return dates.to_numpy(dtype="datetime64[D]"), np.round(values, 3)
+
+
+def benchmark_macro_store(repeats=20):
+    """
+    Time ingesting drops, computing views cold and warm, recomputing after one
+    new observation, and building the tab's charts cold and cached.
+
+    :param repeats: Repetitions of each warm measurement
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "drops")
+        os.makedirs(data_dir)
+        observations = {series_id: _synthetic_observations(series_id) for series_id in SERIES}
+        for series_id, (dates, values) in observations.items():
+            pd.DataFrame({"observation_date": dates, series_id: values}).to_csv(
+                os.path.join(data_dir, f"{series_id}.csv"), index=False)
+        total = sum(len(dates) for dates, _ in observations.values())
+
+        def timed_ms(function, count=1):
+            start_time = time.perf_counter()
+            for _ in range(count):
+                result = function()
+            return (time.perf_counter() - start_time) / count * 1000, result
+
+        cache_dir = os.path.join(tmp, "cache")
+        store = MacroStore(data_dir, cache_dir)
+        print(f"Ingest {len(SERIES)} CSV drops ({total} observations): {timed_ms(lambda: store.refresh(force=True))[0]:.1f} ms")
+        print(f"Reopen from the columnar cache: {timed_ms(lambda: MacroStore(data_dir, cache_dir).refresh(force=True))[0]:.1f} ms")
+        print(f"All views, cold: {timed_ms(lambda: [store.view(name) for name in DERIVED_VIEWS])[0]:.1f} ms")
+        print(f"All views, warm: {timed_ms(lambda: [store.view(name) for name in DERIVED_VIEWS], repeats)[0]:.3f} ms")
+        last = observations["DGS2"][0][-1]
+        store.ingest("DGS2", [last + 1], [4.0])
+        print(f"All views after a new DGS2 observation (recomputes one view): "
+              f"{timed_ms(lambda: [store.view(name) for name in DERIVED_VIEWS])[0]:.1f} ms")
+        figures = lambda: [get_view_figure(store, name).to_json() for name in HEADLINE_VIEWS]
+        _figure_cache.clear()
+        print(f"Tab charts, cold build + serialize: {timed_ms(figures)[0]:.1f} ms")
+        print(f"Tab charts, cached + serialize: {timed_ms(figures, repeats)[0]:.1f} ms")
+        cached = lambda: [get_view_figure(store, name) for name in HEADLINE_VIEWS]
+        print(f"Tab charts, cached lookup: {timed_ms(cached, repeats)[0]:.3f} ms")
+
+
+if __name__ == "__main__":
+    print("Benchmarking macro store...")
+    benchmark_macro_store()
@@ -0,0 +1,34 @@
+import market_data
+
+# Fake upstream for tests and benchmarks: FakeMarketDataProvider data behind a
+# request counter. Walks are generated afresh on every request, so like a
+# network API it keeps nothing in the calling process, and memory measured
+# around it is what the caller holds.
+
+
+class CountingProvider:
+    """
+    Fake upstream that counts requests and keeps nothing in-process.
+
+    :param seed: Extra seed mixed into every symbol's random walk
+    """
+
+    def __init__(self, seed=0):
+        self.inner = market_data.FakeMarketDataProvider(seed, memoize=False)
+        self.fetches = 0
+
+    def ticker(self, symbol):
+        return market_data._ProviderTicker(self, symbol)
+
+    def _fetched(self, result):
+        self.fetches += 1
+        return result
+
+    def info(self, symbol):
+        return self._fetched(self.inner.info(symbol))
+
+    def history(self, symbol, period="1mo"):
+        return self._fetched(self.inner.history(symbol, period))
+
+    def histories(self, symbols, period="1y"):
+        return self._fetched(self.inner.histories(symbols, period))
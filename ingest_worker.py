@@ -0,0 +1,352 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import market_data
+from metrics import timed
+
+# Standalone ingestion worker.
+#
+# The worker owns fetching: every interval it downloads the universe in one
+# batched request, aligns the OHLCV bars on a common date axis and publishes
+# them, with each symbol's fundamentals, as a new versioned snapshot (see
+# market_data.publish_snapshot). Streamlit processes started with
+# INVESTSMARTLY_MARKET_DATA=shared attach to the snapshots read-only through
+# memory-mapped files, so N UI processes share one copy of the data and make
+# no upstream requests for the symbols the worker covers.
+#
+#     python ingest_worker.py                        # refresh every 5 minutes
+#     python ingest_worker.py --once TSLA NVDA       # publish once, with extra symbols
+#     python ingest_worker.py --benchmark            # memory and fetch counts at 1, 4 and 8 UI processes,
+#                                                    # then through main.py at 1 and 4
+#
+# The upstream is the provider selected by INVESTSMARTLY_MARKET_DATA (yfinance
+# by default, or fake/replay for testing); the snapshot directory is
+# INVESTSMARTLY_SNAPSHOT_DIR.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_INTERVAL_SECONDS = 300
+DEFAULT_PERIOD = "5y"
+INFO_REFRESH_SECONDS = 3600
+
+# Stocks offered in the Stock Analysis tab and by the recommendations, and the
+# indices watched for market events.
+DEFAULT_SYMBOLS = [
+    "AAPL", "GOOGL", "MSFT", "AMZN", "FB", "JNJ", "V", "TSLA", "NVDA", "SQ",
+    "UNH", "PFE", "JPM", "MA", "WMT", "HD", "XOM", "CVX", "BP",
+    "^GSPC", "^DJI", "^IXIC",
+]
+
+
+def universe(extra=()):
+    """
+    Symbols to ingest: the defaults, every user's watchlist and `extra`.
+
+    :param extra: Additional symbols
+    :return: List of unique symbols
+    """
+    from user_accounts import load_users
+    symbols = list(DEFAULT_SYMBOLS)
+    for user in load_users().values():
+        symbols.extend(user.get('watchlist', []))
+    symbols.extend(extra)
+    return list(dict.fromkeys(symbols))
+
+
+class IngestWorker:
+    """
+    Fetches the universe and publishes snapshots.
+
+    Fundamentals change slowly and cost one request per symbol, so they are
+    refetched only every `info_refresh` seconds; prices are fetched on every
+    refresh in one batched request.
+
+    :param directory: Snapshot directory
+    :param symbols: Symbols to ingest, or None for universe()
+    :param period: yfinance period string to cover
+    :param provider: Upstream provider, or None for the active provider
+    :param info_refresh: Seconds between fundamentals refreshes
+    """
+
+    def __init__(self, directory=market_data.DEFAULT_SNAPSHOT_DIR, symbols=None, period=DEFAULT_PERIOD,
+                 provider=None, info_refresh=INFO_REFRESH_SECONDS):
+        self.directory = directory
+        self.symbols = symbols
+        self.period = period
+        self.provider = provider or market_data.get_provider()
+        if isinstance(self.provider, market_data.SharedSnapshotProvider):
+            raise ValueError("The ingestion worker cannot read from the snapshots it publishes; "
+                             "set INVESTSMARTLY_MARKET_DATA to an upstream provider")
+        self.info_refresh = info_refresh
+        self.infos = {}
+        self._info_fetched_at = {}
+
+    @timed("ingest.fetch")
+    def fetch(self, symbols, price_only=()):
+        """
+        Fetch prices for `symbols` and `price_only`, and fundamentals, when due, for `symbols` only.
+
+        :param symbols: Symbols to fetch prices and fundamentals for
+        :param price_only: Symbols to fetch prices for
+        :return: Dict of symbol -> history DataFrame
+        """
+        histories = self.provider.histories(list(dict.fromkeys([*symbols, *price_only])), self.period)
+        now = time.time()
+        for symbol in symbols:
+            if now - self._info_fetched_at.get(symbol, 0) < self.info_refresh:
+                continue
+            try:
+                self.infos[symbol] = dict(self.provider.ticker(symbol).info)
+                self._info_fetched_at[symbol] = now
+            except Exception as e:
+                # Keep the previous fundamentals, if any, and retry next time.
+                print(f"Error fetching info for {symbol}: {e}")
+        return histories
+
+    def refresh(self):
+        """
+        Fetch the universe and publish it as a new snapshot.
+
+        :return: The published version
+        """
+        if self.symbols is not None:
+            symbols, price_only = self.symbols, []
+        else:
+            # Prices of the market overview's universe too, so its batched request is
+            # served from the snapshot; the overview needs no fundamentals.
+            from market_overview import load_universe
+            symbols = universe()
+            price_only = list(load_universe().index)
+        histories = self.fetch(symbols, price_only)
+        infos = {symbol: self.infos[symbol] for symbol in symbols if symbol in self.infos}
+        with timed("ingest.publish"):
+            return market_data.publish_snapshot(self.directory, histories, infos, self.period)
+
+    def run(self, interval=DEFAULT_INTERVAL_SECONDS):
+        """Refresh every `interval` seconds until interrupted."""
+        while True:
+            start_time = time.perf_counter()
+            try:
+                version = self.refresh()
+                print(f"Published snapshot v{version} in {time.perf_counter() - start_time:.1f} s")
+            except Exception as e:
+                print(f"Error refreshing market data: {e}")
+            time.sleep(max(interval - (time.perf_counter() - start_time), 0))
+
+
+def process_memory():
+    """
+    Memory of this process in bytes.
+
+    :return: Dict with "rss" and "pss" (proportional set size, which splits
+             shared pages between the processes mapping them; None where
+             /proc/self/smaps_rollup is unavailable)
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {key.lower(): int(fields[key].split()[0]) * 1024 for key in ("Rss", "Pss")}
+    except (OSError, KeyError, ValueError):
+        from load_test import current_rss
+        return {"rss": current_rss(), "pss": None}
+
+
+# Each UI process views every symbol over the periods the Stock Analysis tab
+# offers and holds what it fetched, as load_stock_info's cache does.
+UI_PERIODS = ["1mo", "6mo", "1y", "5y"]
+
+UI_PROCESS_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+import market_data
+from fake_upstream import CountingProvider
+from ingest_worker import UI_PERIODS, process_memory
+symbols = {symbols!r}
+if {mode!r} == "shared":
+    provider = market_data.SharedSnapshotProvider({directory!r})
+else:
+    provider = CountingProvider()
+baseline = process_memory()
+start_time = time.perf_counter()
+held = []
+for symbol in symbols:
+    held.append(provider.info(symbol))
+    for period in UI_PERIODS:
+        history = provider.history(symbol, period)
+        float(history["Close"].sum())
+        held.append(history)
+elapsed = time.perf_counter() - start_time
+print("ready", flush=True)
+sys.stdin.readline()
+memory = process_memory()
+print(json.dumps({{
+    "fetches": getattr(provider, "fetches", 0),
+    "seconds": elapsed,
+    "rss": memory["rss"] - baseline["rss"],
+    "pss": memory["pss"] - baseline["pss"] if memory["pss"] is not None else None,
+}}), flush=True)
+"""
+
+
+# The same through main.py: a logged-in session views every ticker offered in
+# the Stock Analysis tab over each period, with main.py's own caching.
+APP_PROCESS_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+import market_data
+import similarity
+import user_accounts
+from fake_upstream import CountingProvider
+from ingest_worker import UI_PERIODS, process_memory
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+# Anything the app prints goes to stderr; stdout carries the handshake.
+out, sys.stdout = sys.stdout, sys.stderr
+set_log_level("error")
+if {mode!r} == "shared":
+    provider = market_data.SharedSnapshotProvider({directory!r})
+else:
+    provider = CountingProvider()
+market_data.set_provider(provider)
+user_accounts.use_user_store({user_store!r})
+at = AppTest.from_file({main_script!r}, default_timeout=120).run()
+at.text_input(key="login_username").input({username!r})
+at.text_input(key="login_password").input({password!r})
+at.button(key="login_button").click().run()
+similarity.get_similarity_index(wait=True)
+baseline = process_memory()
+start_time = time.perf_counter()
+for symbol in at.selectbox(key="stock_select").options:
+    for period in UI_PERIODS:
+        at.selectbox(key="stock_select").set_value(symbol)
+        at.selectbox(key="stock_period").set_value(period)
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+elapsed = time.perf_counter() - start_time
+print("ready", file=out, flush=True)
+sys.stdin.readline()
+memory = process_memory()
+print(json.dumps({{
+    "fetches": getattr(provider, "fetches", 0),
+    "seconds": elapsed,
+    "rss": memory["rss"] - baseline["rss"],
+    "pss": memory["pss"] - baseline["pss"] if memory["pss"] is not None else None,
+}}), file=out, flush=True)
+"""
+
+APP_USER = "benchmark_user"
+APP_PASSWORD = "benchmark-password"
+# Offered in the Stock Analysis tab next to the five default tickers.
+APP_WATCHLIST = ["JNJ", "V", "TSLA", "NVDA", "UNH"]
+
+
+def _run_ui_processes(count, mode, symbols, directory, script=UI_PROCESS_SCRIPT, **fields):
+    script = script.format(app_dir=APP_DIR, symbols=symbols, mode=mode, directory=directory, **fields)
+    processes = [subprocess.Popen([sys.executable, "-c", script], cwd=APP_DIR, text=True,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(count)]
+    try:
+        # Measure only once every process holds its data, so shared pages are
+        # split between all of them.
+        for process in processes:
+            if process.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"UI process failed in {mode} mode")
+        for process in processes:
+            process.stdin.write("\n")
+            process.stdin.flush()
+        return [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+
+def benchmark_ui_processes(process_counts=(1, 4, 8), num_symbols=500):
+    """
+    Compare per-process memory and upstream fetches with every UI process
+    fetching its own data against UI processes attached to a shared snapshot.
+
+    :param process_counts: Numbers of concurrent UI processes
+    :param num_symbols: Number of symbols each process views
+    """
+    from fake_upstream import CountingProvider
+    symbols = [f"SYM{i:04d}" for i in range(num_symbols)]
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as directory:
+        upstream = CountingProvider()
+        start_time = time.perf_counter()
+        IngestWorker(directory, symbols, DEFAULT_PERIOD, upstream).refresh()
+        snapshot_bytes = sum(os.path.getsize(os.path.join(root, name))
+                             for root, _, names in os.walk(directory) for name in names)
+        print(f"Worker published {num_symbols} symbols x {DEFAULT_PERIOD} in {time.perf_counter() - start_time:.1f} s "
+              f"with {upstream.fetches} upstream requests ({snapshot_bytes / 2**20:.1f} MiB snapshot)")
+        print(f"{'processes':>9} {'mode':>7} {'fetches':>8} {'RSS MB/proc':>12} {'PSS MB/proc':>12} {'load s':>7}")
+        for count in process_counts:
+            for mode in ("direct", "shared"):
+                results = _run_ui_processes(count, mode, symbols, directory)
+                fetches = sum(result["fetches"] for result in results)
+                if mode == "shared":
+                    fetches += upstream.fetches
+                rss = sum(result["rss"] for result in results) / count / 2**20
+                pss = (f"{sum(result['pss'] for result in results) / count / 2**20:12.1f}"
+                       if results[0]["pss"] is not None else f"{'n/a':>12}")
+                seconds = max(result["seconds"] for result in results)
+                print(f"{count:>9} {mode:>7} {fetches:>8} {rss:>12.1f} {pss} {seconds:>7.2f}")
+
+
+def benchmark_app_processes(process_counts=(1, 4)):
+    """
+    Compare per-process memory of main.py sessions fetching their own data
+    against sessions attached to a shared snapshot. Each session views every
+    ticker the Stock Analysis tab offers over each period.
+
+    :param process_counts: Numbers of concurrent app processes
+    """
+    from fake_upstream import CountingProvider
+    import user_accounts
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as directory:
+        upstream = CountingProvider()
+        IngestWorker(directory, DEFAULT_SYMBOLS, DEFAULT_PERIOD, upstream).refresh()
+        user_store = os.path.join(directory, "users.json")
+        previous = user_accounts.USER_DATA_FILE
+        user_accounts.use_user_store(user_store)
+        user_accounts.create_user(APP_USER, APP_PASSWORD)
+        user_accounts.update_user_watchlist(APP_USER, APP_WATCHLIST)
+        user_accounts.use_user_store(previous)
+        fields = dict(main_script=os.path.join(APP_DIR, "main.py"), user_store=user_store,
+                      username=APP_USER, password=APP_PASSWORD)
+        print(f"{'processes':>9} {'mode':>7} {'fetches':>8} {'RSS MB/proc':>12} {'PSS MB/proc':>12} {'views s':>8}")
+        for count in process_counts:
+            for mode in ("direct", "shared"):
+                results = _run_ui_processes(count, mode, DEFAULT_SYMBOLS, directory, APP_PROCESS_SCRIPT, **fields)
+                fetches = sum(result["fetches"] for result in results)
+                rss = sum(result["rss"] for result in results) / count / 2**20
+                pss = (f"{sum(result['pss'] for result in results) / count / 2**20:12.1f}"
+                       if results[0]["pss"] is not None else f"{'n/a':>12}")
+                seconds = max(result["seconds"] for result in results)
+                print(f"{count:>9} {mode:>7} {fetches:>8} {rss:>12.1f} {pss} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch market data and publish shared snapshots for the UI processes.")
+    parser.add_argument("symbols", nargs="*", help="extra symbols to ingest besides the defaults and watchlists")
+    parser.add_argument("--dir", default=os.environ.get('INVESTSMARTLY_SNAPSHOT_DIR', market_data.DEFAULT_SNAPSHOT_DIR))
+    parser.add_argument("--period", default=DEFAULT_PERIOD)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="publish one snapshot and exit")
+    parser.add_argument("--benchmark", action="store_true", help="measure memory and fetches at 1, 4 and 8 UI processes")
+    args = parser.parse_args()
+    if args.benchmark:
+        print("Benchmarking shared snapshots...")
+        benchmark_ui_processes()
+        print("\nThrough main.py...")
+        benchmark_app_processes()
+    else:
+        worker = IngestWorker(args.dir, universe(args.symbols) if args.symbols else None, args.period)
+        if args.once:
+            print(f"Published snapshot v{worker.refresh()} to {args.dir}")
+        else:
+            worker.run(args.interval)
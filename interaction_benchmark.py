@@ -0,0 +1,251 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Interaction benchmark: the wall-clock cost of each interaction with fragment
+# isolation on, and off (INVESTSMARTLY_FRAGMENTS=0: every section in st.tabs
+# and every widget rerunning the whole app, as before the fragment split), in
+# the same build.
+#
+# Each mode runs main.py in a headless Streamlit server against fake market
+# data and a throwaway user store. The client speaks Streamlit's websocket
+# protocol as the browser does, so a widget inside a fragment reruns only that
+# fragment, and times each interaction from sending it to the end of the rerun.
+#
+#     python interaction_benchmark.py        # 10 timed repeats of each interaction
+#     python interaction_benchmark.py 30
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(APP_DIR, "main.py")
+
+USERNAME = "benchmark_user"
+PASSWORD = "benchmark-password"
+
+INTERACTIONS = ["switch ticker", "change period", "mark as read", "switch section"]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_server(fragments, user_store):
+    """
+    Start main.py in a headless Streamlit server.
+
+    :param fragments: Run with fragment isolation on
+    :param user_store: Path of the user data file
+    :return: Tuple of (process, port)
+    """
+    import requests
+    port = _free_port()
+    env = dict(os.environ, INVESTSMARTLY_FRAGMENTS="1" if fragments else "0", INVESTSMARTLY_MARKET_DATA="fake",
+               INVESTSMARTLY_USER_DATA=user_store, INVESTSMARTLY_MACRO_FETCH="off")
+    process = subprocess.Popen([sys.executable, "-m", "streamlit", "run", MAIN_SCRIPT, "--server.headless", "true",
+                                "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+                               cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            if requests.get(f"http://localhost:{port}/_stcore/health", timeout=1).ok:
+                return process, port
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Streamlit server did not start")
+
+
+class AppClient:
+    """
+    One browser session, speaking Streamlit's websocket protocol.
+
+    Widgets are looked up by their key, or by their label when they have none.
+    Like the browser, every rerun sends the current value of every widget on
+    the page, and a widget inside a fragment reruns only that fragment.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}
+        self.values = {}
+
+    @classmethod
+    async def connect(cls, port):
+        import websockets
+        websocket = await websockets.connect(f"ws://localhost:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                             max_size=None)
+        websocket.transport.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(websocket)
+
+    def _ack_immediately(self):
+        # The server streams many small messages per rerun; with delayed ACKs
+        # on this side every interaction would take at least ~40 ms whatever
+        # the app does. Linux resets TCP_QUICKACK after reads, so set it per read.
+        if hasattr(socket, "TCP_QUICKACK"):
+            self.websocket.transport.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    async def close(self):
+        await self.websocket.close()
+
+    def _name(self, widget_id, label):
+        key = widget_id.split("-", 2)[-1]
+        return label if key == "None" else key
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        """
+        Rerun the app, or one fragment, and wait for it to finish.
+
+        :param trigger: WidgetState of a clicked button, if any
+        :param fragment_id: Fragment to rerun, or "" for the whole app
+        :return: Seconds from sending the request to the end of the rerun
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        message = BackMsg()
+        message.rerun_script.widget_states.widgets.extend(
+            state for widget_id, state in self.values.items() if widget_id in {w[0] for w in self.widgets.values()})
+        if trigger is not None:
+            message.rerun_script.widget_states.widgets.append(trigger)
+        if fragment_id:
+            message.rerun_script.fragment_id = fragment_id
+        start_time = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        seen = {}
+        while True:
+            forward = ForwardMsg()
+            self._ack_immediately()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = getattr(forward.delta.new_element, forward.delta.new_element.WhichOneof("type"))
+                widget_id = getattr(element, "id", "")
+                if widget_id.startswith("$$ID-"):
+                    seen[self._name(widget_id, getattr(element, "label", ""))] = (widget_id, forward.delta.fragment_id, element)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                    self.widgets = seen
+                    break
+                if forward.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+                    self.widgets = {name: widget for name, widget in self.widgets.items() if widget[1] != fragment_id}
+                    self.widgets.update(seen)
+                    break
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("main.py failed to compile")
+                # FINISHED_EARLY_FOR_RERUN: st.rerun() started another run.
+                seen = {}
+        return time.perf_counter() - start_time
+
+    async def set_value(self, name, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id, fragment_id, _ = self.widgets[name]
+        self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+        return await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, name):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id, fragment_id, _ = self.widgets[name]
+        return await self.rerun(WidgetState(id=widget_id, trigger_value=True), fragment_id)
+
+    def options(self, name):
+        return list(self.widgets[name][2].options)
+
+
+async def _log_in(client):
+    await client.rerun()
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    for name, value in (("login_username", USERNAME), ("login_password", PASSWORD)):
+        widget_id = client.widgets[name][0]
+        client.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+    await client.click("login_button")
+
+
+async def _measure(port, repeats):
+    timings = {interaction: [] for interaction in INTERACTIONS}
+    client = await AppClient.connect(port)
+    try:
+        await _log_in(client)
+        tickers = client.options("stock_select")[:2]
+        periods = client.options("stock_period")[:2]
+        tabbed = "active_tab" not in client.widgets
+        # The first round warms caches and is not recorded.
+        for i in range(repeats + 1):
+            record = i > 0
+            seconds = await client.set_value("stock_select", tickers[i % 2])
+            if record:
+                timings["switch ticker"].append(seconds)
+            seconds = await client.set_value("stock_period", periods[i % 2])
+            if record:
+                timings["change period"].append(seconds)
+            if not tabbed:
+                seconds = await client.set_value("active_tab", "Investor Profiles")
+                await client.set_value("active_tab", "Stock Analysis")
+                if record:
+                    timings["switch section"].append(seconds)
+            unread = [name for name in client.widgets if name.startswith("read_")]
+            if not unread:
+                # Logging out clears the session's inbox; logging back in regenerates it.
+                await client.click("Logout")
+                client.values.clear()
+                await _log_in(client)
+                unread = [name for name in client.widgets if name.startswith("read_")]
+            if unread:
+                seconds = await client.click(unread[0])
+                if record:
+                    timings["mark as read"].append(seconds)
+    finally:
+        await client.close()
+    if tabbed:
+        # Switching st.tabs happens in the browser without a rerun.
+        timings["switch section"] = [0.0]
+    return timings
+
+
+def measure(fragments, repeats=10):
+    """
+    Time each interaction in one mode.
+
+    :param fragments: Run with fragment isolation on
+    :param repeats: Timed repeats of each interaction
+    :return: Dict of interaction -> list of seconds
+    """
+    import user_accounts
+    with tempfile.TemporaryDirectory() as tmp:
+        user_store = os.path.join(tmp, "users.json")
+        previous = user_accounts.USER_DATA_FILE
+        user_accounts.use_user_store(user_store)
+        user_accounts.create_user(USERNAME, PASSWORD)
+        user_accounts.use_user_store(previous)
+        process, port = start_server(fragments, user_store)
+        try:
+            return asyncio.run(_measure(port, repeats))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def benchmark_interactions(repeats=10):
+    """
+    Print the median cost of each interaction with fragment isolation off and on.
+
+    :param repeats: Timed repeats of each interaction
+    """
+    before = measure(False, repeats)
+    after = measure(True, repeats)
+    print(f"{'interaction':<16} {'fragments off':>14} {'fragments on':>13} {'speedup':>8}")
+    for interaction in INTERACTIONS:
+        off, on = statistics.median(before[interaction]) * 1000, statistics.median(after[interaction]) * 1000
+        if interaction == "switch section" and off == 0:
+            print(f"{interaction:<16} {'in browser':>14} {on:>10.1f} ms {'':>8}")
+        else:
+            print(f"{interaction:<16} {off:>11.1f} ms {on:>10.1f} ms {off / on:>7.1f}x")
+
+
+if __name__ == "__main__":
+    print("Benchmarking interactions...")
+    benchmark_interactions(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,267 @@
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Multi-session load test for the Streamlit app.
+#
+# Simulated users drive main.py headlessly through Streamlit's AppTest API
+# against the fake market data provider (or the provider selected by
+# INVESTSMARTLY_MARKET_DATA) and a throwaway user store. Each AppTest.run() is
+# one rerun of the app.
+#
+# AppTest is not thread-safe, so each simulated user runs in its own process,
+# like app processes behind a load balancer. Reruns from different users run
+# in parallel, and throughput scales with the available cores. Each process
+# warms up its imports and caches before the timed journey starts.
+#
+#     python load_test.py                      # ramp 1, 2, 4, 8 concurrent users
+#     python load_test.py 1 4 16               # custom concurrency levels
+#     python load_test.py --compare a.json b.json
+#
+# Reports are saved as JSON in load_reports/ for comparing builds.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(APP_DIR, "main.py")
+REPORT_DIR = os.path.join(APP_DIR, "load_reports")
+
+DEFAULT_CONCURRENCY = (1, 2, 4, 8)
+USER_PASSWORD = "load-test-password"
+
+# Each step is (description, action); the action interacts with the AppTest
+# and the harness then reruns the app.
+JOURNEY = [
+    ("open login page", lambda at, user: at),
+    ("log in", lambda at, user: _login(at, user)),
+    ("open stock analysis", lambda at, user: at.radio(key="active_tab").set_value("Stock Analysis")),
+    ("switch ticker", lambda at, user: at.selectbox(key="stock_select").set_value("MSFT")),
+    ("add to watchlist", lambda at, user: _click(at, "Add to Watchlist")),
+    ("open notification history", lambda at, user: _click(at.sidebar, "View Notification History")),
+    ("back to main", lambda at, user: _click(at, "Back to Main")),
+    ("compare stocks", lambda at, user: at.multiselect(key="compare_select").set_value(["AAPL", "GOOGL", "MSFT"])),
+    ("switch section", lambda at, user: at.radio(key="active_tab").set_value("Investor Profiles")),
+]
+
+
+def _login(at, user):
+    at.text_input(key="login_username").input(user)
+    at.text_input(key="login_password").input(USER_PASSWORD)
+    return at.button(key="login_button").click()
+
+
+def _click(container, label):
+    for button in container.button:
+        if button.label == label:
+            return button.click()
+    raise LookupError(f"No button labelled {label!r}")
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS).
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def _prepare_environment(user, store_path):
+    """
+    Point the app at a throwaway user store holding `user`, and at fake market
+    data unless INVESTSMARTLY_MARKET_DATA selects a provider (e.g. replay).
+    """
+    import market_data
+    import user_accounts
+    if 'INVESTSMARTLY_MARKET_DATA' not in os.environ:
+        market_data.set_provider(market_data.FakeMarketDataProvider())
+    user_accounts.use_user_store(store_path)
+    user_accounts.create_user(user, USER_PASSWORD)
+
+
+def run_session(user, repeats=1):
+    """
+    Drive one simulated user through the journey.
+
+    :param user: Username to log in as
+    :param repeats: Number of times to repeat the post-login steps
+    :return: List of (step, seconds) for every rerun
+    """
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=120)
+    timings = []
+    steps = JOURNEY[:2] + JOURNEY[2:] * repeats
+    for step, action in steps:
+        action(at, user)
+        start_time = time.perf_counter()
+        at.run()
+        timings.append((step, time.perf_counter() - start_time))
+        if at.exception:
+            raise RuntimeError(f"{user} failed at '{step}': {at.exception[0].value}")
+    return timings
+
+
+def _session_process(user, repeats, store_path, barrier, results):
+    """Warm up one simulated user's process, wait for the others, then time its journey."""
+    try:
+        _prepare_environment(user, store_path)
+        run_session(user, repeats=1)
+        barrier.wait()
+        rss_before = current_rss()
+        timings = run_session(user, repeats)
+        results.put((timings, rss_before, current_rss(), None))
+    except Exception as e:
+        barrier.abort()
+        results.put((None, 0, 0, str(e)))
+
+
+def run_level(concurrency, store_dir, repeats=1):
+    """
+    Run `concurrency` simulated users at once, each in its own process.
+
+    :param concurrency: Number of concurrent sessions
+    :param store_dir: Directory for the sessions' throwaway user stores
+    :param repeats: Number of times each user repeats the journey after logging in
+    :return: Dict of results for this level
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(concurrency + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_session_process, args=(
+            f"load_user_{i}", repeats, os.path.join(store_dir, f"users_{concurrency}_{i}.json"), barrier, results))
+        for i in range(concurrency)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        # Timing starts once every process has warmed up.
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    start_time = time.perf_counter()
+    outcomes = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start_time
+    for process in processes:
+        process.join()
+    errors = [error for _, _, _, error in outcomes if error]
+    if errors:
+        raise RuntimeError(errors[0])
+    results = [timings for timings, _, _, _ in outcomes]
+
+    latencies = [seconds for timings in results for _, seconds in timings]
+    steps = {}
+    for timings in results:
+        for step, seconds in timings:
+            steps.setdefault(step, []).append(seconds)
+    return {
+        'concurrency': concurrency,
+        'reruns': len(latencies),
+        'elapsed_seconds': elapsed,
+        'reruns_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'rss_mb': statistics.mean(after for _, _, after, _ in outcomes) / 2**20,
+        'rss_growth_per_session_mb': statistics.mean(after - before for _, before, after, _ in outcomes) / 2**20,
+        'step_median_ms': {step: statistics.median(values) * 1000 for step, values in steps.items()},
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"Build {report['revision'] or 'unknown'} on Python {report['python']}")
+    print(f"{'users':>5} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'MB/session':>10}")
+    for level in report['levels']:
+        print(f"{level['concurrency']:>5} {level['reruns']:>7} {level['reruns_per_second']:>9.1f} "
+              f"{level['p50_ms']:>8.1f} {level['p95_ms']:>8.1f} {level['p99_ms']:>8.1f} "
+              f"{level['rss_mb']:>8.1f} {level['rss_growth_per_session_mb']:>10.2f}")
+
+
+def run_load_test(concurrency_levels=DEFAULT_CONCURRENCY, repeats=2, save=True):
+    """
+    Ramp up concurrent simulated users and report throughput, latency and memory.
+
+    :param concurrency_levels: Numbers of concurrent users, run in order
+    :param repeats: Number of times each user repeats the journey after logging in
+    :param save: Save the report as JSON in load_reports/
+    :return: Report dict
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        levels = []
+        for concurrency in concurrency_levels:
+            levels.append(run_level(concurrency, tmp, repeats))
+            print(f"{concurrency} concurrent users: {levels[-1]['reruns_per_second']:.1f} reruns/s, "
+                  f"p95 {levels[-1]['p95_ms']:.0f} ms")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'journey': [step for step, _ in JOURNEY],
+        'repeats': repeats,
+        'levels': levels,
+    }
+    if save:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"load_{datetime.now():%Y%m%d_%H%M%S}_{report['revision'] or 'local'}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        report['path'] = path
+    return report
+
+
+def compare_reports(baseline_path, candidate_path):
+    """
+    Print the change in throughput and latency between two saved reports.
+
+    :param baseline_path: Path of the baseline report
+    :param candidate_path: Path of the report to compare against it
+    """
+    with open(baseline_path) as f:
+        baseline = {level['concurrency']: level for level in json.load(f)['levels']}
+    with open(candidate_path) as f:
+        candidate = {level['concurrency']: level for level in json.load(f)['levels']}
+    print(f"{'users':>5} {'reruns/s':>18} {'p95 ms':>18} {'MB/session':>18}")
+    for concurrency in sorted(set(baseline) & set(candidate)):
+        b, c = baseline[concurrency], candidate[concurrency]
+        print(f"{concurrency:>5} "
+              f"{b['reruns_per_second']:>7.1f} -> {c['reruns_per_second']:<7.1f} "
+              f"{b['p95_ms']:>7.1f} -> {c['p95_ms']:<7.1f} "
+              f"{b['rss_growth_per_session_mb']:>7.2f} -> {c['rss_growth_per_session_mb']:<7.2f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--compare"]:
+        compare_reports(sys.argv[2], sys.argv[3])
+    else:
+        levels = tuple(int(arg) for arg in sys.argv[1:]) or DEFAULT_CONCURRENCY
+        print("Running load test...")
+        report = run_load_test(levels)
+        print()
+        print_report(report)
+        print(f"\nReport saved to {report['path']}")
@@ -1,37 +1,131 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
-from stock_analysis import get_stock_info, compare_stocks
+import os
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from functools import wraps
 from investor_profiles import get_investor_profile, get_profile_recommendations
-from economic_trends import get_economic_trends
-from utils import format_large_number
-import streamlit_lottie as st_lottie
-import requests
-import ta
-import numpy as np
+from utils import format_large_number, read_text_file, load_lottieurl
 from user_accounts import create_user, authenticate_user, get_personalized_recommendations, update_user_preferences, get_user_watchlist, update_user_watchlist, get_user_preferences
 from educational_resources import display_educational_resources
-from notifications import generate_notifications, mark_notification_as_read, get_notification_history, process_notifications, stress_test_notifications, test_no_notifications
+import metrics
+
+# Heavy modules (pandas, yfinance, plotly, numpy) are imported inside the
+# functions that need them, so the login page renders without loading them.
+
+LOGIN_ANIMATION_URL = "https://assets5.lottiefiles.com/packages/lf20_V9t630.json"
+
+# Notifications are regenerated at most this often per session. Reruns in
+# between reuse the notifications already held in session state.
+NOTIFICATION_REFRESH_SECONDS = 300
+
+# Number of unread notification groups shown per sidebar page.
+NOTIFICATION_GROUPS_PER_PAGE = 10
+
+# Number of recent interactions kept for the performance panel.
+INTERACTION_HISTORY_SIZE = 50
+
+# INVESTSMARTLY_FRAGMENTS=0 turns fragment isolation off for comparison: every
+# section is rendered in st.tabs and every widget reruns the whole app, as
+# before the app was split into fragments.
+FRAGMENTS_ENABLED = os.environ.get('INVESTSMARTLY_FRAGMENTS', '1') != '0'
+
+TAB_NAMES = ["Stock Analysis", "Watchlist", "Market Overview", "Economic Trends", "Investor Profiles", "Educational Resources", "Documentation"]
+
+_timing_state = threading.local()
+
+@contextmanager
+def track_interaction(name):
+    """
+    Record the wall-clock time of a rerun in the session's interaction log.
+
+    Only the outermost run is recorded: a fragment executed as part of a full
+    app rerun is counted in that rerun, while a fragment rerunning on its own
+    is recorded under its own name.
+    """
+    depth = getattr(_timing_state, 'depth', 0)
+    _timing_state.depth = depth + 1
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timing_state.depth = depth
+        if depth == 0:
+            timings = st.session_state.setdefault('interaction_timings', [])
+            timings.append({
+                'interaction': name,
+                'milliseconds': (time.perf_counter() - start_time) * 1000,
+                'timestamp': datetime.now()
+            })
+            del timings[:-INTERACTION_HISTORY_SIZE]
+
+def timed_fragment(name, run_every=None):
+    """
+    Turn a render function into an independently rerunnable, timed Streamlit
+    fragment, optionally rerun every `run_every` seconds. With fragments
+    turned off (FRAGMENTS_ENABLED) the function is only timed.
+    """
+    stage = "render." + name.lower().replace(" ", "_")
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_interaction(name), metrics.timed(stage):
+                return func(*args, **kwargs)
+        return st.fragment(wrapper, run_every=run_every) if FRAGMENTS_ENABLED else wrapper
+    return decorator
+
+# st.cache_resource hands every session the same object: st.cache_data would
+# pickle each result and unpickle a copy on every read, copying histories that
+# the shared snapshot provider serves memory-mapped. Treat the result as read-only.
+@st.cache_resource(ttl=300, show_spinner=False)
+def load_stock_info(ticker, period):
+    from stock_analysis import get_stock_info
+    return get_stock_info(ticker, period)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_stock_comparison(tickers):
+    from stock_analysis import compare_stocks
+    return compare_stocks(list(tickers))
+
+def display_interaction_timings():
+    timings = st.session_state.get('interaction_timings', [])
+    with st.sidebar.expander("Performance"):
+        if not timings:
+            st.write("No interactions recorded yet.")
+            return
+        import pandas as pd
+        df = pd.DataFrame(timings)
+        summary = df.groupby('interaction')['milliseconds'].agg(['count', 'median', 'max']).round(1)
+        st.write("**Wall-clock time per interaction (ms)**")
+        st.dataframe(summary, use_container_width=True)
+        st.write("**Most recent**")
+        recent = df.tail(10).iloc[::-1]
+        st.dataframe(recent[['interaction', 'milliseconds']].round(1), hide_index=True, use_container_width=True)
+        display_process_metrics()
+
+def display_process_metrics():
+    if not metrics.is_enabled():
+        st.caption("Set INVESTSMARTLY_METRICS=1 to record process-wide stage latencies.")
+        return
+    import pandas as pd
+    stages = metrics.snapshot()['stages']
+    if stages:
+        st.write("**Process-wide stage latency (ms)**")
+        df = pd.DataFrame.from_dict(stages, orient='index')[['count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']].round(1)
+        st.dataframe(df, use_container_width=True)
+    st.download_button("Download metrics (Prometheus)", metrics.export_prometheus(), file_name="metrics.prom")
+    st.download_button("Download metrics (JSON lines)", metrics.export_json_lines(), file_name="metrics.jsonl")
 
 def load_css():
-    with open("style.css") as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
+    st.markdown(f'<style>{read_text_file("style.css")}</style>', unsafe_allow_html=True)
 
 def login_page():
     st.markdown('<div class="futuristic-header">Welcome to InvestSmartly</div>', unsafe_allow_html=True)
     
-    lottie_url = "https://assets5.lottiefiles.com/packages/lf20_V9t630.json"
-    lottie_json = load_lottieurl(lottie_url)
+    lottie_json = load_lottieurl(LOGIN_ANIMATION_URL)
     if lottie_json:
+        import streamlit_lottie as st_lottie
         st_lottie.st_lottie(lottie_json, speed=1, height=200, key="lottie_login")
     
     username = st.text_input("Username", key="login_username")
@@ -91,43 +185,78 @@ def user_preferences_page():
         })
         st.success("Preferences saved successfully!")
 
-def display_notifications(username):
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Notifications")
+def get_notification_inbox():
+    from notifications import NotificationInbox
+    
+    if 'notification_inbox' not in st.session_state:
+        st.session_state.notification_inbox = NotificationInbox()
+    return st.session_state.notification_inbox
+
+def refresh_notifications(username):
+    from notifications import generate_notifications
+    
+    inbox = get_notification_inbox()
     
-    if 'notifications' not in st.session_state:
-        st.session_state.notifications = []
+    last_refresh = st.session_state.get('notifications_refreshed_at')
+    if last_refresh is not None and time.time() - last_refresh < NOTIFICATION_REFRESH_SECONDS:
+        return
     
     watchlist = get_user_watchlist(username)
     user_preferences = get_user_preferences(username)
     
     new_notifications = generate_notifications(watchlist, user_preferences)
-    st.session_state.notifications.extend(new_notifications)
-    
-    unread_notifications = [n for n in st.session_state.notifications if not n['read']]
-    
-    if unread_notifications:
-        for notification in unread_notifications:
-            col1, col2 = st.sidebar.columns([3, 1])
+    inbox.extend(new_notifications)
+    st.session_state.notifications_refreshed_at = time.time()
+
+def change_notification_page(delta):
+    st.session_state.notification_page = max(st.session_state.get('notification_page', 0) + delta, 0)
+
+@timed_fragment("Notifications")
+def display_notifications(username):
+    refresh_notifications(username)
+    inbox = get_notification_inbox()
+    
+    st.markdown("---")
+    st.subheader(f"Notifications ({inbox.unread_count} unread)" if inbox.unread_count else "Notifications")
+    
+    if inbox.unread_count:
+        # Only one page of groups is rendered, so the sidebar costs the same
+        # however many notifications are unread.
+        page_count = -(-inbox.group_count // NOTIFICATION_GROUPS_PER_PAGE)
+        page = min(st.session_state.get('notification_page', 0), page_count - 1)
+        st.session_state.notification_page = page
+        
+        for group in inbox.unread_page(page, NOTIFICATION_GROUPS_PER_PAGE):
+            col1, col2 = st.columns([3, 1])
             with col1:
-                st.info(notification['message'])
+                st.info(group['summary'])
             with col2:
-                if st.button("Mark as Read", key=f"read_{notification['timestamp'].isoformat()}_{hash(notification['message'])}"):
-                    mark_notification_as_read(notification)
-                    st.rerun()
+                # Callbacks run before the fragment reruns, so the page is
+                # redrawn without the group and without a full app rerun.
+                group_type, ticker = group['key']
+                st.button("Mark as Read", key=f"read_{group_type}_{ticker}",
+                          on_click=inbox.mark_group_read, args=(group['key'],))
         
-        if st.sidebar.button("Mark All as Read"):
-            for notification in unread_notifications:
-                mark_notification_as_read(notification)
-            st.rerun()
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("◀", key="notification_page_prev", disabled=page == 0,
+                          on_click=change_notification_page, args=(-1,))
+            with col2:
+                st.caption(f"Page {page + 1} of {page_count}")
+            with col3:
+                st.button("▶", key="notification_page_next", disabled=page >= page_count - 1,
+                          on_click=change_notification_page, args=(1,))
+        
+        st.button("Mark All as Read", on_click=inbox.mark_all_read)
     else:
-        st.sidebar.info("No new notifications.")
+        st.info("No new notifications.")
     
-    if st.sidebar.button("View Notification History"):
+    if st.button("View Notification History"):
         st.session_state.show_notification_history = True
         st.rerun()
     
-    if st.sidebar.button("Notification Preferences"):
+    if st.button("Notification Preferences"):
         st.session_state.show_notification_preferences = True
         st.rerun()
 
@@ -150,14 +279,29 @@ def notification_preferences_page():
     st.subheader("Email Notifications")
     email_notifications = st.checkbox("Receive Email Notifications", value=user_preferences.get('email_notifications', False))
     
+    from alerts import AlertProgram, AlertRuleError
+    
+    st.subheader("Custom Alert Rules")
+    alert_rules_text = st.text_area(
+        "One rule per line, e.g. `close crosses above sma(close, 50)` or `rsi(14) > 70`",
+        value="\n".join(user_preferences.get('alert_rules', []))
+    )
+    alert_rules = [line.strip() for line in alert_rules_text.splitlines() if line.strip()]
+    
     if st.button("Save Preferences"):
+        try:
+            AlertProgram(alert_rules)
+        except AlertRuleError as e:
+            st.error(f"Invalid alert rule: {e}")
+            return
         update_user_preferences(st.session_state.username, {
             "price_changes": price_changes,
             "market_news": market_news,
             "market_events": market_events,
             "frequency": frequency,
             "price_change_threshold": price_change_threshold,
-            "email_notifications": email_notifications
+            "email_notifications": email_notifications,
+            "alert_rules": alert_rules
         })
         st.success("Notification preferences updated successfully!")
     
@@ -166,9 +310,11 @@ def notification_preferences_page():
         st.rerun()
 
 def notification_history_page():
+    from notifications import get_notification_history
+    
     st.markdown('<div class="futuristic-header">Notification History</div>', unsafe_allow_html=True)
     
-    history = get_notification_history(st.session_state.notifications)
+    history = get_notification_history(get_notification_inbox().notifications)
     
     if history:
         for notification in history:
@@ -192,17 +338,26 @@ def user_documentation():
     1. **Price Changes**: Alerts for significant price movements in your watchlist stocks.
     2. **Market News**: Important headlines and updates about the overall market.
     3. **Market Events**: Notifications about significant index movements and other market-wide events.
+    4. **Custom Alert Rules**: Your own conditions on your watchlist stocks, for example:
+       - `close crosses above sma(close, 50)`: price crosses above its 50-day moving average
+       - `rsi(14) > 70`: 14-day RSI is overbought
+       - `volume > 3 * sma(volume, 20)`: volume is more than 3× its 20-day average
+       - `drawdown(close, 252) > 20`: price is more than 20% below its 52-week high
+
+       Available fields are `open`, `high`, `low`, `close` and `volume`; functions are `sma`, `ema`, `rsi`, `max`, `min`, `change` (percent) and `drawdown` (percent). Combine conditions with `and`, `or` and `not`.
 
     ### Customizing Your Notifications
     You can customize your notification preferences in the Notification Preferences page:
     - Toggle different types of notifications on/off
     - Set the update frequency (Real-time, Daily, or Weekly)
     - Adjust the price change threshold for alerts
+    - Add custom alert rules, one per line
     - Enable/disable email notifications for important updates
 
     ### Viewing Notifications
-    - New notifications appear in the sidebar of the app.
-    - Click "Mark as Read" to acknowledge a notification.
+    - New notifications appear in the sidebar of the app, grouped by type and stock (for example "AAPL: 4 moves, latest +5.3%").
+    - Click "Mark as Read" to acknowledge a notification or a whole group.
+    - Use the arrows below the notifications to page through them.
     - Use the "Mark All as Read" button to clear all notifications at once.
     - Use the "View Notification History" button to see past notifications.
 
@@ -231,15 +386,41 @@ def developer_documentation():
     5. `process_notifications(user, notifications)`: Handles email alerts for new notifications.
     6. `mark_notification_as_read(notification)`: Marks a notification as read.
     7. `get_notification_history(notifications, days)`: Retrieves notification history.
+    8. `NotificationInbox`: Holds a session's notifications with stable numeric ids, drops same-day repeats and keeps unread notifications grouped by type and ticker, so the sidebar renders one page of groups and bulk mark-read is a single call.
+    9. `alerts.check_alert_rules(watchlist, rules)`: Evaluates user-defined alert rules. Rules are compiled once by `alerts.AlertProgram` into a deduplicated set of NumPy operations evaluated over all watched tickers in one pass.
 
     ### Extending the System
     - To add new types of notifications, update the `generate_notifications()` function.
     - Implement real news API integration in `get_market_news()`.
     - Add more checks in `check_market_events()` for additional market-wide indicators.
+    - To add a new alert rule function, add it to `alerts.WINDOW_FUNCTIONS` and implement it in `alerts._apply()`.
 
     ### Testing
     - Use `stress_test_notifications(num_notifications)` to test system performance with a large number of notifications.
     - `test_no_notifications()` tests the system's behavior when there are no new notifications.
+    - Use `benchmark_notification_inbox()` to check that sidebar page cost stays flat as unread notifications grow.
+    - Use `alerts.benchmark_alert_rules(num_rules, num_tickers)` (or `python alerts.py`) to benchmark rule evaluation.
+    - Use `charts.benchmark_price_chart()` (or `python charts.py`) to compare chart payload size and build time.
+
+    ### Performance
+    - The sidebar notifications, the stock analysis panel and each tab are Streamlit fragments (`timed_fragment`), so their widgets rerun only that fragment instead of the whole app.
+    - Notifications are regenerated at most every `NOTIFICATION_REFRESH_SECONDS`; stock data is cached for five minutes by `load_stock_info`, with `st.cache_resource` so memory-mapped snapshot histories are not copied; do not modify its result.
+    - Heavy libraries (pandas, yfinance, plotly) are imported inside the functions that use them, so the login page does not load them. Keep new imports of these modules out of the top of `main.py`.
+    - `style.css` is read once per process and the login animation is cached on disk in `INVESTSMARTLY_CACHE_DIR` (default `.cache`) by `utils.load_lottieurl`. Both caches live in `utils` because Streamlit re-executes `main.py` on every rerun, so module-level state there does not persist. Run `python startup_benchmark.py` for an import-time and first-paint breakdown.
+    - Set `INVESTSMARTLY_METRICS=1` to record per-stage latency histograms and counters (`metrics.py`) for upstream fetches, password checks, JSON saves, recommendations, chart builds and each tab's render. They can be downloaded from the Performance panel in Prometheus text format or as JSON lines, or written to `INVESTSMARTLY_METRICS_DIR` on exit. Set `INVESTSMARTLY_PROFILE=1` to also run the sampling profiler, which writes folded stacks to `profile.folded`. Time new hot paths with `@metrics.timed("stage.name")`.
+    - Enable Advanced Mode to see the Performance panel in the sidebar with the wall-clock cost of each interaction. "Full rerun" entries are whole-app reruns; other entries are fragment-only reruns.
+    - Sections are chosen with a radio button rather than `st.tabs`. Tabs are switched in the browser, so every full rerun would have to render all seven sections, including the Market Overview and Economic Trends charts; with the radio only the selected section runs. Switching section is then a server rerun of about 30 ms instead of being instant.
+    - Set `INVESTSMARTLY_FRAGMENTS=0` to turn fragment isolation off: sections go back into `st.tabs` and every widget reruns the whole app. `python interaction_benchmark.py` runs the app both ways in headless servers and prints the median cost of switching ticker, changing period, marking a notification read and switching section.
+
+    ### Load Testing
+    - `python load_test.py` ramps up simulated users, each in its own process, driving `main.py` through Streamlit's AppTest API and saves a report to `load_reports/`.
+    - Market data goes through `market_data.py`; use `market_data.ticker(symbol)` and `market_data.histories(symbols, period)` rather than calling yfinance directly so the fake and replay providers cover new code paths. Set `INVESTSMARTLY_MARKET_DATA=record` to capture a session to an archive and `INVESTSMARTLY_MARKET_DATA=replay` to serve it offline, optionally with `INVESTSMARTLY_REPLAY_LATENCY_MS` and `INVESTSMARTLY_REPLAY_ERROR_RATE`.
+    - With several app processes, run `python ingest_worker.py` and start each process with `INVESTSMARTLY_MARKET_DATA=shared`. The worker publishes versioned, memory-mapped snapshots that all processes read without copying; histories from the shared provider are read-only views.
+    - Long histories belong in a price archive (`price_archive.py`): `PriceArchive(path).read(symbol, start, end, columns)` decodes only the chunks and columns a date range touches, and `INVESTSMARTLY_MARKET_DATA=archive` serves the app's history requests from `INVESTSMARTLY_PRICE_ARCHIVE`.
+    - "Similar Stocks" comes from `similarity.SimilarityIndex`: each stock is a unit vector of six months of z-scored returns plus fundamentals, so a query is one matrix-vector product. The process-wide index is built in a background thread from `ingest_worker.universe()` (served from the worker's snapshot with `INVESTSMARTLY_MARKET_DATA=shared`) and updated with `add_bars` as new bars arrive, so renders never wait on the upstream; `most_similar(symbol, k, mode="approximate")` searches only the nearest k-means clusters. Run `python similarity.py` to benchmark both modes at 5k and 50k stocks.
+    - The Watchlist tab is one `st.dataframe` with a sparkline column, not one chart per ticker. `watchlist_dashboard.WatchlistTable` refetches a watchlist's stale tickers in one batched request and recomputes only rows whose history changed; the tab fragment reruns every minute. Run `python watchlist_dashboard.py` for time-to-render at 10, 50 and 200 tickers.
+    - The Market Overview tab reads `market_overview.get_market_overview()`, which fetches `market_universe.csv` and the indices in one `market_data.histories` call and aggregates sectors and industries with `np.bincount`. It is computed at most every `REFRESH_SECONDS` per process and shared by all sessions; don't fetch per ticker to extend it, add columns to the universe CSV or groups to `compute_overview` instead.
+    - Macro data lives in `economic_trends.MacroStore`. Add a series to `SERIES` and a derived view to `DERIVED_VIEWS` as (title, units, input series, function); `store.view(name)` computes it on first use and again only after an input series changes, and `get_view_figure` caches its chart on the same version.
 
     ### Email Configuration
     Email notifications use the following environment variables:
@@ -256,6 +437,11 @@ def developer_documentation():
 
 def stock_analysis_tab(dark_mode, advanced_mode):
     st.markdown('<div class="futuristic-header">Stock Analysis</div>', unsafe_allow_html=True)
+    stock_analysis_panel(dark_mode, advanced_mode)
+
+@timed_fragment("Stock Analysis")
+def stock_analysis_panel(dark_mode, advanced_mode):
+    from charts import get_price_figure, PERIOD_LABELS
     
     recommendations = get_personalized_recommendations(st.session_state.username)
     
@@ -271,8 +457,10 @@ def stock_analysis_tab(dark_mode, advanced_mode):
         else:
             st.info(f"{ticker} is already in your watchlist.")
     
+    period = st.selectbox("Period:", list(PERIOD_LABELS), index=1, format_func=PERIOD_LABELS.get, key="stock_period")
+    
     with st.spinner("Fetching stock data..."):
-        stock_info = get_stock_info(ticker)
+        stock_info = load_stock_info(ticker, period)
     
     if stock_info:
         col1, col2 = st.columns(2)
@@ -286,30 +474,127 @@ def stock_analysis_tab(dark_mode, advanced_mode):
         
         with col2:
             st.subheader("Price Chart")
-            fig = go.Figure(data=go.Scatter(x=stock_info['history'].index, y=stock_info['history']['Close'], mode='lines', name='Close'))
-            fig.update_layout(
-                title=f"{ticker} Stock Price (Last 6 Months)",
-                xaxis_title="Date",
-                yaxis_title="Price",
-                template="plotly_dark" if dark_mode else "plotly_white"
-            )
+            chart_type = st.radio("Chart type:", ["Line", "Candlestick"], horizontal=True, key="chart_type")
+            fig = get_price_figure(ticker, stock_info['history'], period, dark_mode, mode=chart_type.lower())
             st.plotly_chart(fig, use_container_width=True)
     
+    st.subheader("Compare Stocks")
+    compare_tickers = st.multiselect("Select stocks to compare:", list(dict.fromkeys(ticker_options)), key="compare_select")
+    if len(compare_tickers) >= 2:
+        with st.spinner("Fetching comparison data..."):
+            comparison = load_stock_comparison(tuple(compare_tickers))
+        comparison["Market Cap"] = comparison["Market Cap"].apply(format_large_number)
+        st.dataframe(comparison, hide_index=True, use_container_width=True)
+    
+    st.subheader("Similar Stocks")
+    # The index is process-wide and built in the background, so this is not cached per ticker.
+    from similarity import similar_stocks
+    with st.spinner("Finding similar stocks..."):
+        similar = similar_stocks(ticker)
+    if similar is None:
+        st.info("Similar stocks are being indexed. They will appear here in a minute or two.")
+    elif similar.empty:
+        st.info(f"No similar stocks found for {ticker}.")
+    else:
+        st.caption("Ranked by correlation of daily returns over the last six months and by valuation, yield, size and sector.")
+        st.dataframe(similar, hide_index=True, use_container_width=True,
+                     column_config={"Similarity": st.column_config.ProgressColumn("Similarity", min_value=-1.0, max_value=1.0, format="%.2f")})
+    
     st.markdown('<div class="futuristic-card recommendations">', unsafe_allow_html=True)
     st.subheader("Personalized Recommendations")
     for rec in recommendations:
         st.write(f"- {rec}")
     st.markdown('</div>', unsafe_allow_html=True)
 
+@timed_fragment("Economic Trends")
 def economic_trends_tab(dark_mode):
     st.markdown('<div class="futuristic-header">Economic Trends</div>', unsafe_allow_html=True)
 
-    st.markdown('<div class="futuristic-card">', unsafe_allow_html=True)
+    from economic_trends import DERIVED_VIEWS, get_economic_trends, get_macro_store, get_view_figure
     with st.spinner("Fetching economic trends..."):
-        economic_trends = get_economic_trends()
-    st.write(economic_trends)
+        store = get_macro_store()
+    headlines = store.headlines()
+
+    st.markdown('<div class="futuristic-card">', unsafe_allow_html=True)
+    if not headlines:
+        st.write(get_economic_trends(store))
+        if store.fetching:
+            st.caption("Fetching the latest figures from FRED; they will appear on the next refresh.")
+        else:
+            st.caption("Live figures could not be fetched. Add CSV or JSON series to the macro_data folder to see them offline.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+
+    for row in range(0, len(headlines), 3):
+        for column, headline in zip(st.columns(3), headlines[row:row + 3]):
+            units = "%" if headline['units'] == "%" else " pts"
+            column.metric(
+                headline['title'],
+                f"{headline['value']:.2f}{units}",
+                f"{headline['change']:+.2f}",
+                help=f"Latest observation {headline['date']:%d %b %Y}; change since the previous observation."
+            )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    available = [name for name in DERIVED_VIEWS if store.view(name) is not None]
+    view = st.selectbox("Chart:", available, format_func=lambda name: DERIVED_VIEWS[name][0], key="macro_view")
+    st.plotly_chart(get_view_figure(store, view, dark_mode), use_container_width=True)
+
+@timed_fragment("Watchlist", run_every=60)
+def watchlist_tab():
+    st.markdown('<div class="futuristic-header">Watchlist</div>', unsafe_allow_html=True)
+
+    watchlist = get_user_watchlist(st.session_state.username)
+    if not watchlist:
+        st.info("Your watchlist is empty. Add stocks from the Stock Analysis tab.")
+        return
+
+    from watchlist_dashboard import get_watchlist_table
+    with st.spinner("Loading your watchlist..."):
+        table, changed = get_watchlist_table(watchlist)
+    st.dataframe(table, hide_index=True, use_container_width=True, column_config={
+        "Price": st.column_config.NumberColumn("Price", format="$%.2f"),
+        "Change %": st.column_config.NumberColumn("Day Change", format="%+.2f%%"),
+        "52W Low": st.column_config.NumberColumn("52W Low", format="$%.2f"),
+        "52W High": st.column_config.NumberColumn("52W High", format="$%.2f"),
+        "52W Range": st.column_config.ProgressColumn("52W Range", help="Price between the 52-week low (0) and high (1)", min_value=0.0, max_value=1.0, format="%.2f"),
+        "Trend": st.column_config.LineChartColumn("1Y Trend", width="medium"),
+    })
+    st.caption(f"{len(table)} stocks, refreshed every minute; {len(changed)} updated on the last refresh.")
+
+@timed_fragment("Market Overview")
+def market_overview_tab(dark_mode):
+    st.markdown('<div class="futuristic-header">Market Overview</div>', unsafe_allow_html=True)
+
+    import pandas as pd
+    from market_overview import HORIZONS, get_heatmap_figure, get_market_overview
+    with st.spinner("Loading market overview..."):
+        version, overview = get_market_overview()
+    if overview is None:
+        st.info("Market data is unavailable right now. Please try again in a few minutes.")
+        return
+
+    st.markdown('<div class="futuristic-card">', unsafe_allow_html=True)
+    indices = overview['indices']
+    # An index with a short history has no return for the longer horizons.
+    percent = lambda value: f"{value:+.2f}%" if pd.notna(value) else "n/a"
+    for column, (name, row) in zip(st.columns(max(len(indices), 1)), indices.iterrows()):
+        column.metric(name, percent(row['1D']), f"{percent(row['YTD'])} YTD" if pd.notna(row['YTD']) else None,
+                      help=f"1 week {percent(row['1W'])}, 1 month {percent(row['1M'])}")
     st.markdown('</div>', unsafe_allow_html=True)
 
+    level = st.radio("Group by:", ["Sectors", "Industries"], horizontal=True, key="overview_level")
+    st.plotly_chart(get_heatmap_figure(version, overview, level.lower(), dark_mode), use_container_width=True)
+    st.caption(f"Equal-weighted average return of {int(overview['sectors']['Stocks'].sum())} stocks "
+               f"as of {overview['as_of']:%d %b %Y}, refreshed every five minutes.")
+
+    sector = st.selectbox("Stocks in sector:", list(overview['sectors'].index), key="overview_sector")
+    stocks = overview['stocks']
+    st.dataframe(stocks[stocks['sector'] == sector].sort_values("YTD", ascending=False)[["industry"] + HORIZONS],
+                 use_container_width=True,
+                 column_config={horizon: st.column_config.NumberColumn(horizon, format="%+.2f%%") for horizon in HORIZONS})
+
+@timed_fragment("Investor Profiles")
 def investor_profiles_tab(dark_mode):
     st.markdown('<div class="futuristic-header">Investor Profiles</div>', unsafe_allow_html=True)
 
@@ -330,7 +615,23 @@ def investor_profiles_tab(dark_mode):
         st.write(f"- {stock}")
     st.markdown('</div>', unsafe_allow_html=True)
 
+@timed_fragment("Educational Resources")
+def educational_resources_tab():
+    display_educational_resources()
+
+@timed_fragment("Documentation")
+def documentation_tab():
+    doc_type = st.radio("Select documentation type:", ["User Guide", "Developer Guide"])
+    if doc_type == "User Guide":
+        user_documentation()
+    else:
+        developer_documentation()
+
 def main():
+    with track_interaction("Full rerun"), metrics.timed("render.app"):
+        run_app()
+
+def run_app():
     load_css()
 
     if not hasattr(st.session_state, 'logged_in') or not st.session_state.logged_in:
@@ -355,9 +656,15 @@ def main():
     if st.sidebar.button("Logout"):
         st.session_state.logged_in = False
         st.session_state.username = None
+        for key in ('notification_inbox', 'notifications_refreshed_at', 'notification_page'):
+            st.session_state.pop(key, None)
         st.rerun()
     
-    display_notifications(st.session_state.username)
+    with st.sidebar:
+        display_notifications(st.session_state.username)
+    
+    if advanced_mode:
+        display_interaction_timings()
     
     if hasattr(st.session_state, 'show_preferences') and st.session_state.show_preferences:
         user_preferences_page()
@@ -368,27 +675,33 @@ def main():
         notification_history_page()
     elif hasattr(st.session_state, 'show_notification_preferences') and st.session_state.show_notification_preferences:
         notification_preferences_page()
+    elif FRAGMENTS_ENABLED:
+        # Only the selected section is rendered; each section is a fragment, so
+        # its own widgets rerun just that section. st.tabs would render every
+        # section on every full rerun, since the server cannot tell which tab
+        # is visible.
+        active_tab = st.radio("Section", TAB_NAMES, horizontal=True, key="active_tab", label_visibility="collapsed")
+        render_section(active_tab, dark_mode, advanced_mode)
     else:
-        tabs = st.tabs(["Stock Analysis", "Economic Trends", "Investor Profiles", "Educational Resources", "Documentation"])
-        
-        with tabs[0]:
-            stock_analysis_tab(dark_mode, advanced_mode)
-        
-        with tabs[1]:
-            economic_trends_tab(dark_mode)
-        
-        with tabs[2]:
-            investor_profiles_tab(dark_mode)
-        
-        with tabs[3]:
-            display_educational_resources()
-        
-        with tabs[4]:
-            doc_type = st.radio("Select documentation type:", ["User Guide", "Developer Guide"])
-            if doc_type == "User Guide":
-                user_documentation()
-            else:
-                developer_documentation()
+        for name, tab in zip(TAB_NAMES, st.tabs(TAB_NAMES)):
+            with tab:
+                render_section(name, dark_mode, advanced_mode)
+
+def render_section(name, dark_mode, advanced_mode):
+    if name == "Stock Analysis":
+        stock_analysis_tab(dark_mode, advanced_mode)
+    elif name == "Watchlist":
+        watchlist_tab()
+    elif name == "Market Overview":
+        market_overview_tab(dark_mode)
+    elif name == "Economic Trends":
+        economic_trends_tab(dark_mode)
+    elif name == "Investor Profiles":
+        investor_profiles_tab(dark_mode)
+    elif name == "Educational Resources":
+        educational_resources_tab()
+    else:
+        documentation_tab()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
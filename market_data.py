@@ -0,0 +1,726 @@
+import atexit
+import io
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from metrics import increment
+
+# Market data providers.
+#
+# All market data goes through the active provider instead of calling
+# yfinance directly, so the app can run against fake data in load tests.
+# A provider offers:
+#
+#     provider.ticker(symbol)                  -> object with .info and .history(period=...)
+#     provider.histories(symbols, period=...)  -> dict of symbol -> history DataFrame
+#
+# The provider is chosen with INVESTSMARTLY_MARKET_DATA or replaced at runtime
+# with set_provider():
+#   yfinance   live data (default)
+#   fake       deterministic synthetic data
+#   record     live data, with every .info dict and history frame captured to
+#              the archive at INVESTSMARTLY_MARKET_DATA_ARCHIVE on exit
+#   replay     serve a recorded archive offline; INVESTSMARTLY_REPLAY_LATENCY_MS
+#              and INVESTSMARTLY_REPLAY_ERROR_RATE simulate a slow or flaky upstream
+#   shared     read the snapshots published by ingest_worker.py in
+#              INVESTSMARTLY_SNAPSHOT_DIR, falling back to yfinance for
+#              symbols or periods the snapshot does not cover
+#   archive    read histories from the price archive (price_archive.py) at
+#              INVESTSMARTLY_PRICE_ARCHIVE, falling back to yfinance for
+#              fundamentals and symbols the archive does not hold
+
+# Approximate number of daily bars in each yfinance period.
+PERIOD_BARS = {
+    "1d": 1, "2d": 2, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126,
+    "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 5040,
+}
+
+
+def period_bars(period):
+    """Number of daily bars in a yfinance period string."""
+    if period == "ytd":
+        return max(np.busday_count(date(date.today().year, 1, 1), date.today()), 1)
+    return PERIOD_BARS.get(period, PERIOD_BARS["max"])
+
+
+class YFinanceProvider:
+    """Live data from Yahoo Finance."""
+
+    def ticker(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol)
+
+    def histories(self, symbols, period="1y"):
+        import yfinance as yf
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        # Adjusted for splits and dividends, like yf.Ticker.history(), so batched
+        # and single-ticker requests return the same Close series.
+        data = yf.download(symbols, period=period, group_by="ticker", progress=False, auto_adjust=True)
+        if data is None or data.empty:
+            return {}
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {symbols[0]: data}
+        available = set(data.columns.get_level_values(0))
+        return {symbol: data[symbol].dropna(how="all") for symbol in symbols if symbol in available}
+
+
+class _ProviderTicker:
+    def __init__(self, provider, symbol):
+        self._provider = provider
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        return self._provider.info(self.symbol)
+
+    def history(self, period="1mo", **kwargs):
+        return self._provider.history(self.symbol, period)
+
+
+FAKE_SECTORS = [
+    "Technology", "Healthcare", "Financial Services", "Consumer Cyclical", "Consumer Defensive",
+    "Energy", "Industrials", "Communication Services", "Utilities", "Real Estate", "Basic Materials",
+]
+
+
+class FakeMarketDataProvider:
+    """
+    Deterministic synthetic data: every symbol gets its own seeded random walk
+    ending today, so repeated runs see identical prices.
+
+    :param seed: Extra seed mixed into every symbol's random walk
+    :param memoize: Keep generated walks in a process-wide cache; turn off to
+        model an upstream that keeps nothing in-process
+    """
+
+    MAX_BARS = PERIOD_BARS["max"]
+
+    def __init__(self, seed=0, memoize=True):
+        self.seed = seed
+        self.memoize = memoize
+
+    def ticker(self, symbol):
+        return _ProviderTicker(self, symbol)
+
+    def histories(self, symbols, period="1y"):
+        return {symbol: self.history(symbol, period) for symbol in dict.fromkeys(symbols)}
+
+    def history(self, symbol, period="1mo"):
+        generate = _fake_history if self.memoize else _fake_history.__wrapped__
+        return generate(symbol, self.seed, date.today()).iloc[-period_bars(period):].copy()
+
+    def info(self, symbol):
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()) + self.seed)
+        history = self.history(symbol, "1d")
+        price = float(history["Close"].iloc[-1])
+        return {
+            "symbol": symbol,
+            "longName": f"{symbol} Holdings Inc.",
+            "currentPrice": price,
+            "marketCap": int(price * rng.integers(50_000_000, 5_000_000_000)),
+            "trailingPE": float(rng.uniform(8, 60)),
+            "dividendYield": float(rng.choice([0.0, rng.uniform(0.002, 0.05)])),
+            "sector": FAKE_SECTORS[int(rng.integers(len(FAKE_SECTORS)))],
+        }
+
+
+@lru_cache(maxsize=1024)
+def _fake_history(symbol, seed, end):
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()) + seed)
+    n = FakeMarketDataProvider.MAX_BARS
+    close = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+    spread = np.abs(rng.normal(0, 0.01, n))
+    # Same dates as pd.bdate_range(end=end, periods=n), which is much slower.
+    last = np.busday_offset(np.datetime64(end, "D"), 0, roll="backward")
+    index = pd.DatetimeIndex(np.busday_offset(last, np.arange(1 - n, 1)).astype("datetime64[ns]"), name="Date")
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.005, n)),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, n),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=index)
+
+
+DEFAULT_ARCHIVE = "market_data_archive.zip"
+
+# Archive layout (a zip file, members deflated):
+#   manifest.json           {"version": 1, "info": {symbol: info}, "histories": [entry, ...]}
+#   histories/<n>.npy       float64 array of shape (rows, columns) for entry n
+#   histories/<n>.index.npy int64 nanosecond UTC timestamps of entry n
+# Each history entry records its symbol, period, column names, column dtypes
+# and index time zone.
+ARCHIVE_VERSION = 1
+
+
+class MissingRecordingError(LookupError):
+    """The replay archive has no recording for a request."""
+
+
+class SimulatedUpstreamError(ConnectionError):
+    """Failure injected by ReplayProvider to simulate a flaky upstream."""
+
+
+def _encode_history(history):
+    index = history.index
+    tz = str(index.tz) if getattr(index, "tz", None) is not None else None
+    if tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    meta = {
+        "columns": [str(column) for column in history.columns],
+        "dtypes": [str(dtype) for dtype in history.dtypes],
+        "tz": tz,
+        "index_name": history.index.name,
+    }
+    return meta, history.to_numpy(dtype=np.float64), index.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+
+def _decode_history(meta, values, timestamps):
+    index = pd.DatetimeIndex(timestamps.astype("datetime64[ns]"), name=meta["index_name"])
+    if meta["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+    columns = {column: values[:, i].astype(dtype) for i, (column, dtype) in enumerate(zip(meta["columns"], meta["dtypes"]))}
+    return pd.DataFrame(columns, index=index)
+
+
+def _npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def save_archive(path, infos, histories):
+    """
+    Write recorded market data to a compact archive, replacing it atomically.
+
+    :param path: Archive path
+    :param infos: Dict of symbol -> info dict
+    :param histories: Dict of (symbol, period) -> history DataFrame
+    """
+    manifest = {"version": ARCHIVE_VERSION, "info": infos, "histories": []}
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for n, ((symbol, period), history) in enumerate(sorted(histories.items())):
+            meta, values, timestamps = _encode_history(history)
+            manifest["histories"].append({"symbol": symbol, "period": period, **meta})
+            archive.writestr(f"histories/{n}.npy", _npy_bytes(values))
+            archive.writestr(f"histories/{n}.index.npy", _npy_bytes(timestamps))
+        archive.writestr("manifest.json", json.dumps(manifest, default=str))
+    os.replace(tmp_path, path)
+
+
+def _read_archive(path):
+    """Return the manifest and a loader that decodes history entry n on demand."""
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        if manifest.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported market data archive version {manifest.get('version')!r} in {path}")
+        members = {name: archive.read(name) for name in archive.namelist() if name.startswith("histories/")}
+
+    def load(n):
+        meta = manifest["histories"][n]
+        values = np.load(io.BytesIO(members[f"histories/{n}.npy"]))
+        timestamps = np.load(io.BytesIO(members[f"histories/{n}.index.npy"]))
+        return _decode_history(meta, values, timestamps)
+    return manifest, load
+
+
+def load_archive(path):
+    """
+    Read an archive written by save_archive.
+
+    :param path: Archive path
+    :return: Tuple (infos, histories) in the form accepted by save_archive
+    """
+    manifest, load = _read_archive(path)
+    histories = {(meta["symbol"], meta["period"]): load(n) for n, meta in enumerate(manifest["histories"])}
+    return manifest["info"], histories
+
+
+class RecordingProvider:
+    """
+    Pass requests through to another provider and capture the responses.
+
+    Call save() (or use the recording() context manager) to write the archive.
+    Recordings already in the archive are kept unless re-recorded.
+
+    :param inner: Provider to record, e.g. YFinanceProvider()
+    :param path: Archive path
+    """
+
+    def __init__(self, inner, path=DEFAULT_ARCHIVE):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.infos, self.recorded_histories = load_archive(path)
+        else:
+            self.infos, self.recorded_histories = {}, {}
+
+    def ticker(self, symbol):
+        return _ProviderTicker(self, symbol)
+
+    def info(self, symbol):
+        info = self.inner.ticker(symbol).info
+        with self._lock:
+            self.infos[symbol] = dict(info)
+        return info
+
+    def history(self, symbol, period="1mo"):
+        history = self.inner.ticker(symbol).history(period=period)
+        with self._lock:
+            self.recorded_histories[(symbol, period)] = history.copy()
+        return history
+
+    def histories(self, symbols, period="1y"):
+        result = self.inner.histories(symbols, period)
+        with self._lock:
+            for symbol, history in result.items():
+                self.recorded_histories[(symbol, period)] = history.copy()
+        return result
+
+    def save(self):
+        with self._lock:
+            save_archive(self.path, dict(self.infos), dict(self.recorded_histories))
+
+
+class ReplayProvider:
+    """
+    Serve market data from a recorded archive, without network access.
+
+    A history request for a period that was not recorded is served from the
+    shortest longer recording of the same symbol, trimmed to the period.
+    Recordings are decoded on first use and each (symbol, period) frame is
+    kept, so a repeated request costs a dict lookup and a DataFrame copy.
+
+    :param path: Archive path
+    :param latency: Simulated seconds of latency added to every request
+    :param jitter: Extra latency drawn uniformly from [0, jitter] seconds
+    :param error_rate: Probability that a request raises SimulatedUpstreamError
+    :param seed: Seed for the latency jitter and injected errors
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        manifest, self._load = _read_archive(path)
+        self.infos = manifest["info"]
+        self._entries = {}
+        for n, meta in enumerate(manifest["histories"]):
+            self._entries.setdefault(meta["symbol"], []).append((period_bars(meta["period"]), meta["period"], n))
+        for entries in self._entries.values():
+            entries.sort()
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def ticker(self, symbol):
+        return _ProviderTicker(self, symbol)
+
+    def _simulate_upstream(self, request):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise SimulatedUpstreamError(f"Simulated upstream failure for {request}")
+
+    def _recorded_history(self, symbol, period):
+        key = (symbol, period)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._decode(symbol, period)
+            with self._lock:
+                self._frames[key] = frame
+        return frame.copy()
+
+    def _decode(self, symbol, period):
+        entries = self._entries.get(symbol, ())
+        for bars, recorded, n in entries:
+            if recorded == period:
+                return self._load(n)
+        bars = period_bars(period)
+        for recorded_bars, recorded, n in entries:
+            if recorded_bars >= bars:
+                return self._recorded_history(symbol, recorded).iloc[-bars:]
+        raise MissingRecordingError(f"No recorded {period} history for {symbol} in {self.path}")
+
+    def info(self, symbol):
+        self._simulate_upstream(f"{symbol} info")
+        if symbol not in self.infos:
+            raise MissingRecordingError(f"No recorded info for {symbol} in {self.path}")
+        return dict(self.infos[symbol])
+
+    def history(self, symbol, period="1mo"):
+        self._simulate_upstream(f"{symbol} {period} history")
+        return self._recorded_history(symbol, period)
+
+    def histories(self, symbols, period="1y"):
+        self._simulate_upstream(f"{len(symbols)} {period} histories")
+        result = {}
+        for symbol in dict.fromkeys(symbols):
+            try:
+                result[symbol] = self._recorded_history(symbol, period)
+            except MissingRecordingError:
+                # Like a batched download, symbols without data are left out.
+                pass
+        return result
+
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.environ.get('INVESTSMARTLY_CACHE_DIR', '.cache'), "market_snapshots")
+
+SNAPSHOT_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+# Snapshot layout, written by publish_snapshot and read by SharedSnapshotProvider:
+#   CURRENT                 {"version": n, "path": "v00000n"}, replaced atomically
+#   v00000n/meta.json       symbols, fields, period, index time zone, creation time
+#   v00000n/dates.npy       int64 nanosecond UTC timestamps, shape (days,)
+#   v00000n/ohlcv.npy       float64, shape (symbols, days, fields), NaN where a
+#                           symbol has no bar on a date
+#   v00000n/info.json       fundamentals (the .info dict) per symbol
+# A version directory is complete before CURRENT points at it and is never
+# modified afterwards, so readers never see a half-written update. Readers
+# memory-map the arrays, so every process on the host shares one copy of the
+# page cache; put the directory on /dev/shm to keep it entirely in memory.
+
+
+def _write_npy(path, array):
+    with open(path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _snapshot_versions(directory):
+    return sorted(int(name[1:]) for name in os.listdir(directory)
+                  if name.startswith("v") and name[1:].isdigit())
+
+
+def publish_snapshot(directory, histories, infos, period, keep=3):
+    """
+    Align histories on one date axis and publish them as a new snapshot version.
+
+    :param directory: Snapshot directory
+    :param histories: Dict of symbol -> history DataFrame with OHLCV columns
+    :param infos: Dict of symbol -> info dict
+    :param period: yfinance period string the histories cover
+    :param keep: Number of versions to keep; older ones are deleted
+    :return: The new version number
+    """
+    os.makedirs(directory, exist_ok=True)
+    symbols = list(histories)
+    indexes = {}
+    tz = None
+    for symbol, history in histories.items():
+        index = history.index
+        if getattr(index, "tz", None) is not None:
+            tz = str(index.tz)
+            index = index.tz_convert("UTC").tz_localize(None)
+        indexes[symbol] = index.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    dates = np.unique(np.concatenate(list(indexes.values()))) if indexes else np.empty(0, dtype=np.int64)
+    ohlcv = np.full((len(symbols), len(dates), len(SNAPSHOT_FIELDS)), np.nan)
+    for row, symbol in enumerate(symbols):
+        columns = histories[symbol].reindex(columns=list(SNAPSHOT_FIELDS)).to_numpy(dtype=np.float64)
+        ohlcv[row, np.searchsorted(dates, indexes[symbol])] = columns
+
+    versions = _snapshot_versions(directory)
+    version = versions[-1] + 1 if versions else 1
+    name = f"v{version:07d}"
+    tmp_path = os.path.join(directory, f"{name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    _write_npy(os.path.join(tmp_path, "dates.npy"), dates)
+    _write_npy(os.path.join(tmp_path, "ohlcv.npy"), ohlcv)
+    _write_json(os.path.join(tmp_path, "info.json"), {symbol: infos[symbol] for symbol in infos})
+    _write_json(os.path.join(tmp_path, "meta.json"), {
+        "symbols": symbols, "fields": list(SNAPSHOT_FIELDS), "period": period, "tz": tz, "created": time.time(),
+    })
+    os.rename(tmp_path, os.path.join(directory, name))
+    _write_json(os.path.join(directory, "CURRENT.tmp"), {"version": version, "path": name})
+    os.replace(os.path.join(directory, "CURRENT.tmp"), os.path.join(directory, "CURRENT"))
+
+    # Readers keep old versions they have mapped readable after deletion.
+    for old in versions[:max(len(versions) + 1 - keep, 0)]:
+        shutil.rmtree(os.path.join(directory, f"v{old:07d}"), ignore_errors=True)
+    return version
+
+
+class _Snapshot:
+    def __init__(self, directory, name):
+        path = os.path.join(directory, name)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.version = int(name[1:])
+        self.period = meta["period"]
+        self.created = meta["created"]
+        self.rows = {symbol: row for row, symbol in enumerate(meta["symbols"])}
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        self.ohlcv = np.load(os.path.join(path, "ohlcv.npy"), mmap_mode="r")
+        index = pd.DatetimeIndex(np.asarray(self.dates).view("datetime64[ns]"), name="Date")
+        if meta["tz"] is not None:
+            index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        self.index = index
+        self.columns = pd.Index(SNAPSHOT_FIELDS)
+        self._info_path = os.path.join(path, "info.json")
+        self._infos = None
+
+    @property
+    def infos(self):
+        if self._infos is None:
+            with open(self._info_path) as f:
+                self._infos = json.load(f)
+        return self._infos
+
+    def history(self, symbol, bars):
+        """History of the last `bars` bars, as a zero-copy view when the symbol has no gaps."""
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        values = self.ohlcv[row]
+        valid = ~np.isnan(values[:, 3])
+        last = len(valid) - int(np.argmax(valid[::-1])) if valid.any() else 0
+        start = max(last - bars, 0)
+        if valid[start:last].all():
+            return pd.DataFrame(values[start:last], index=self.index[start:last], columns=self.columns, copy=False)
+        positions = np.flatnonzero(valid)[-bars:]
+        return pd.DataFrame(values[positions], index=self.index[positions], columns=self.columns)
+
+
+class SharedSnapshotProvider:
+    """
+    Read-only provider over the snapshots published by an ingestion worker.
+
+    Histories are served as DataFrames over memory-mapped arrays shared by all
+    processes, without copying; treat them as read-only. Every request checks
+    CURRENT and switches to a newer version when one is published. Frames
+    already handed out keep the version they were built from.
+
+    :param directory: Snapshot directory
+    :param fallback: Provider for symbols, periods and fundamentals the
+                     snapshot does not cover, or None to raise MissingRecordingError
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, fallback=None):
+        self.directory = directory
+        self.fallback = fallback
+        self._current_path = os.path.join(directory, "CURRENT")
+        self._current_stat = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def ticker(self, symbol):
+        return _ProviderTicker(self, symbol)
+
+    @property
+    def snapshot(self):
+        """The latest published snapshot, or None before the first one."""
+        try:
+            stat = os.stat(self._current_path)
+        except FileNotFoundError:
+            return self._snapshot
+        key = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if key != self._current_stat:
+            with self._lock:
+                if key != self._current_stat:
+                    with open(self._current_path) as f:
+                        current = json.load(f)
+                    if self._snapshot is None or self._snapshot.version != current["version"]:
+                        self._snapshot = _Snapshot(self.directory, current["path"])
+                    self._current_stat = key
+        return self._snapshot
+
+    def _miss(self, symbol, request):
+        increment("market_data.snapshot_miss")
+        if self.fallback is None:
+            raise MissingRecordingError(f"No {request} for {symbol} in the snapshot in {self.directory}")
+        return self.fallback
+
+    def info(self, symbol):
+        snapshot = self.snapshot
+        if snapshot is not None and symbol in snapshot.infos:
+            return dict(snapshot.infos[symbol])
+        return self._miss(symbol, "info").ticker(symbol).info
+
+    def history(self, symbol, period="1mo"):
+        snapshot = self.snapshot
+        history = None
+        if snapshot is not None and period_bars(period) <= period_bars(snapshot.period):
+            history = snapshot.history(symbol, period_bars(period))
+        if history is None:
+            return self._miss(symbol, f"{period} history").ticker(symbol).history(period=period)
+        return history
+
+    def histories(self, symbols, period="1y"):
+        snapshot = self.snapshot
+        result = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            history = None
+            if snapshot is not None and period_bars(period) <= period_bars(snapshot.period):
+                history = snapshot.history(symbol, period_bars(period))
+            if history is None:
+                missing.append(symbol)
+            else:
+                result[symbol] = history
+        if missing:
+            result.update(self._miss(missing[0], f"{period} history").histories(missing, period))
+        return result
+
+
+def _price_archive_provider():
+    from price_archive import ArchiveProvider
+    return ArchiveProvider(os.environ.get('INVESTSMARTLY_PRICE_ARCHIVE', "prices.ispa"), fallback=YFinanceProvider())
+
+
+def _archive_path():
+    return os.environ.get('INVESTSMARTLY_MARKET_DATA_ARCHIVE', DEFAULT_ARCHIVE)
+
+
+def _recording_provider():
+    provider = RecordingProvider(YFinanceProvider(), _archive_path())
+    atexit.register(provider.save)
+    return provider
+
+
+def _replay_provider():
+    return ReplayProvider(
+        _archive_path(),
+        latency=float(os.environ.get('INVESTSMARTLY_REPLAY_LATENCY_MS', 0)) / 1000,
+        error_rate=float(os.environ.get('INVESTSMARTLY_REPLAY_ERROR_RATE', 0)),
+    )
+
+
+_PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "fake": FakeMarketDataProvider,
+    "record": _recording_provider,
+    "replay": _replay_provider,
+    "archive": _price_archive_provider,
+    "shared": lambda: SharedSnapshotProvider(
+        os.environ.get('INVESTSMARTLY_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR), fallback=YFinanceProvider()
+    ),
+}
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        name = os.environ.get('INVESTSMARTLY_MARKET_DATA', 'yfinance')
+        if name not in _PROVIDERS:
+            raise ValueError(f"Unknown market data provider {name!r}; expected one of {sorted(_PROVIDERS)}")
+        _provider = _PROVIDERS[name]()
+    return _provider
+
+
+def set_provider(provider):
+    """
+    Replace the active provider.
+
+    :param provider: Provider instance, or None to fall back to INVESTSMARTLY_MARKET_DATA
+    :return: The previous provider
+    """
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+
+def ticker(symbol):
+    """Return a yfinance-like Ticker from the active provider."""
+    return get_provider().ticker(symbol)
+
+
+def histories(symbols, period="1y"):
+    """
+    Fetch daily history for several symbols in one batched request.
+
+    :param symbols: List of ticker symbols
+    :param period: yfinance period string
+    :return: Dict mapping symbol to its history DataFrame
+    """
+    return get_provider().histories(symbols, period)
+
+
+@contextmanager
+def recording(path=DEFAULT_ARCHIVE, inner=None):
+    """
+    Record all market data requests made inside the block to an archive.
+
+    :param path: Archive path
+    :param inner: Provider to record; defaults to the active provider
+    """
+    recorder = RecordingProvider(inner or get_provider(), path)
+    previous = set_provider(recorder)
+    try:
+        yield recorder
+    finally:
+        set_provider(previous)
+        recorder.save()
+
+
+def benchmark_replay(num_symbols=500, calls=20_000):
+    """
+    Compare replay throughput with the fake provider and report archive size.
+
+    :param num_symbols: Number of symbols to record
+    :param calls: Number of history requests per measurement
+    """
+    import tempfile
+    symbols = [f"SYM{i:04d}" for i in range(num_symbols)]
+    periods = ["1d", "2d", "1mo", "6mo", "1y"]
+    fake = FakeMarketDataProvider()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive.zip")
+        start_time = time.perf_counter()
+        with recording(path, inner=fake):
+            for symbol in symbols:
+                ticker(symbol).info
+                histories([symbol], "1y")
+        record_seconds = time.perf_counter() - start_time
+        raw_bytes = sum(len(fake.history(symbol, "1y").to_csv()) for symbol in symbols)
+        print(f"Recorded {num_symbols} symbols in {record_seconds:.2f} s: "
+              f"{os.path.getsize(path) / 2**20:.2f} MiB archive vs {raw_bytes / 2**20:.2f} MiB as CSV")
+
+        start_time = time.perf_counter()
+        replay = ReplayProvider(path)
+        print(f"Opened archive in {(time.perf_counter() - start_time) * 1000:.0f} ms")
+
+        rng = random.Random(0)
+        requests = [(rng.choice(symbols), rng.choice(periods)) for _ in range(calls)]
+        for label, provider in (("fake", fake), ("replay", replay)):
+            start_time = time.perf_counter()
+            for symbol, period in requests:
+                provider.history(symbol, period)
+            history_us = (time.perf_counter() - start_time) / calls * 1e6
+            start_time = time.perf_counter()
+            for symbol, _ in requests:
+                provider.info(symbol)
+            info_us = (time.perf_counter() - start_time) / calls * 1e6
+            print(f"{label:>6}: history {history_us:6.1f} us/call, info {info_us:6.1f} us/call")
+
+
+if __name__ == "__main__":
+    print("Benchmarking market data replay...")
+    benchmark_replay()
@@ -0,0 +1,332 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import market_data
+from metrics import timed, increment
+
+# Market overview: sector and industry performance over several horizons.
+#
+# The universe (INVESTSMARTLY_MARKET_UNIVERSE, default market_universe.csv next
+# to this module) is a CSV of symbol, sector and industry. One batched market_data.histories call
+# fetches a year of bars for the whole universe and the major indices; the
+# closes are aligned into one dates x symbols matrix, each horizon's return is
+# one vectorised division against a reference row, and sectors and industries
+# are aggregated with np.bincount over their group codes.
+#
+# The result is computed at most once every REFRESH_SECONDS per process and
+# shared by every session: while one thread recomputes a stale overview, the
+# others keep serving the previous one.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+UNIVERSE_PATH = os.environ.get('INVESTSMARTLY_MARKET_UNIVERSE', os.path.join(APP_DIR, 'market_universe.csv'))
+REFRESH_SECONDS = 300
+HISTORY_PERIOD = "1y"
+
+HORIZONS = ["1D", "1W", "1M", "YTD"]
+
+INDICES = {
+    "^GSPC": "S&P 500",
+    "^DJI": "Dow Jones",
+    "^IXIC": "NASDAQ",
+}
+
+
+def load_universe(path=UNIVERSE_PATH):
+    """
+    Read the universe CSV.
+
+    :param path: CSV with symbol, sector and industry columns
+    :return: DataFrame indexed by symbol
+    """
+    universe = pd.read_csv(path, dtype=str).dropna(subset=["symbol"])
+    universe["sector"] = universe["sector"].fillna("Unknown")
+    universe["industry"] = universe["industry"].fillna("Unknown")
+    return universe.drop_duplicates("symbol").set_index("symbol")
+
+
+def reference_rows(dates):
+    """
+    Row of the closes each horizon's return is measured from.
+
+    :param dates: Sorted DatetimeIndex of the closes
+    :return: Dict of horizon -> row index, or -1 where the history is too short
+    """
+    last = dates[-1]
+    targets = {
+        "1W": last - pd.Timedelta(days=7),
+        "1M": last - pd.DateOffset(months=1),
+        "YTD": pd.Timestamp(year=last.year, month=1, day=1) - pd.Timedelta(days=1),
+    }
+    rows = {"1D": len(dates) - 2}
+    for horizon, target in targets.items():
+        # Last close on or before the target date.
+        rows[horizon] = int(np.searchsorted(dates.to_numpy(), np.datetime64(target), side="right")) - 1
+    return rows
+
+
+def horizon_returns(closes):
+    """
+    Percentage return of every symbol over every horizon.
+
+    :param closes: DataFrame of closes, dates x symbols
+    :return: DataFrame of returns in percent, symbols x HORIZONS
+    """
+    closes = closes.sort_index().ffill()
+    values = closes.to_numpy(dtype=np.float64)
+    rows = reference_rows(closes.index)
+    result = np.full((values.shape[1], len(HORIZONS)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for column, horizon in enumerate(HORIZONS):
+            if rows[horizon] >= 0:
+                result[:, column] = (values[-1] / values[rows[horizon]] - 1) * 100
+    result[~np.isfinite(result)] = np.nan
+    return pd.DataFrame(result, index=closes.columns, columns=HORIZONS)
+
+
+def group_returns(returns, groups):
+    """
+    Equal-weighted mean return of each group, ignoring symbols without data.
+
+    :param returns: DataFrame of returns, symbols x HORIZONS
+    :param groups: Series of symbol -> group label, or DataFrame of symbol -> label columns
+    :return: DataFrame indexed by group with one column per horizon, "Stocks" and "Advancing" (share up over 1D)
+    """
+    labels = groups.reindex(returns.index)
+    if isinstance(labels, pd.DataFrame):
+        keys = pd.MultiIndex.from_frame(labels.fillna("Unknown"))
+        codes, names = pd.factorize(keys, sort=True)
+        names = pd.MultiIndex.from_tuples(names, names=labels.columns)
+    else:
+        codes, names = pd.factorize(labels.fillna("Unknown"), sort=True)
+    values = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    size = len(names)
+    sums = np.column_stack([np.bincount(codes, np.where(valid[:, i], values[:, i], 0), size) for i in range(len(HORIZONS))])
+    counts = np.column_stack([np.bincount(codes, valid[:, i], size) for i in range(len(HORIZONS))])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / counts
+        advancing = np.bincount(codes, valid[:, 0] & (np.nan_to_num(values[:, 0]) > 0), size) / counts[:, 0]
+    result = pd.DataFrame(means, index=names, columns=HORIZONS)
+    result["Stocks"] = counts.max(axis=1).astype(int)
+    result["Advancing"] = advancing
+    return result[result["Stocks"] > 0]
+
+
+def close_matrix(histories):
+    """
+    Align the closes of many histories into one dates x symbols DataFrame.
+
+    A batched download returns every symbol on the same dates, so when the
+    indexes match the close arrays are stacked directly instead of aligning
+    one Series per symbol.
+
+    :param histories: Dict of symbol -> history DataFrame with a Close column
+    :return: DataFrame of closes
+    """
+    histories = {symbol: history for symbol, history in histories.items() if history is not None and len(history)}
+    if not histories:
+        return pd.DataFrame()
+    dates = next(iter(histories.values())).index
+    if all(history.index is dates or history.index.equals(dates) for history in histories.values()):
+        values = np.column_stack([history["Close"].to_numpy(dtype=np.float64) for history in histories.values()])
+        return pd.DataFrame(values, index=dates, columns=list(histories))
+    return pd.DataFrame({symbol: history["Close"] for symbol, history in histories.items()})
+
+
+@timed("market_overview.compute")
+def compute_overview(histories, universe):
+    """
+    Sector, industry, stock and index performance from one batch of histories.
+
+    :param histories: Dict of symbol -> history DataFrame with a Close column
+    :param universe: DataFrame from load_universe()
+    :return: Dict with "as_of", "sectors", "industries", "stocks" and "indices"
+    """
+    closes = close_matrix(histories)
+    if closes.empty:
+        return None
+    if getattr(closes.index, "tz", None) is not None:
+        closes.index = closes.index.tz_localize(None)
+    returns = horizon_returns(closes)
+    stock_returns = returns.reindex(universe.index)
+    indices = returns.reindex(list(INDICES)).dropna(how="all")
+    indices.index = [INDICES[symbol] for symbol in indices.index]
+    return {
+        "as_of": closes.index.max(),
+        "sectors": group_returns(stock_returns, universe["sector"]),
+        "industries": group_returns(stock_returns, universe[["sector", "industry"]]),
+        "stocks": stock_returns.join(universe[["sector", "industry"]]),
+        "indices": indices,
+    }
+
+
+_overview = None
+_overview_version = 0
+_computed_at = 0.0
+_overview_lock = threading.Lock()
+
+
+def refresh_overview(universe=None):
+    """
+    Fetch the universe in one batched request and recompute the overview.
+
+    :param universe: DataFrame from load_universe(), or None to read UNIVERSE_PATH
+    :return: The new overview, or None if no data was returned
+    """
+    universe = load_universe() if universe is None else universe
+    histories = market_data.histories(list(universe.index) + list(INDICES), HISTORY_PERIOD)
+    return compute_overview(histories, universe)
+
+
+def get_market_overview():
+    """
+    The process-wide overview, recomputed at most every REFRESH_SECONDS.
+
+    :return: Tuple of (version, overview dict or None)
+    """
+    global _overview, _overview_version, _computed_at
+    if time.time() - _computed_at < REFRESH_SECONDS:
+        return _overview_version, _overview
+    # Only one thread recomputes; the others serve the stale overview if there is one.
+    if not _overview_lock.acquire(blocking=_overview is None):
+        increment("market_overview.stale_served")
+        return _overview_version, _overview
+    try:
+        if time.time() - _computed_at >= REFRESH_SECONDS:
+            try:
+                overview = refresh_overview()
+            except Exception as e:
+                print(f"Error refreshing market overview: {e}")
+                overview = None
+            _computed_at = time.time()
+            if overview is not None:
+                _overview = overview
+                _overview_version += 1
+        return _overview_version, _overview
+    finally:
+        _overview_lock.release()
+
+
+_figure_cache = {}
+
+
+def get_heatmap_figure(version, overview, level="sectors", dark_mode=False):
+    """
+    Heatmap of group returns by horizon, rebuilt only when the overview changes.
+
+    :param version: Overview version from get_market_overview()
+    :param overview: Overview dict
+    :param level: "sectors" or "industries"
+    :param dark_mode: Use the dark Plotly template
+    :return: Plotly Figure
+    """
+    key = (level, bool(dark_mode))
+    cached = _figure_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    import plotly.graph_objects as go
+    table = overview[level]
+    if level == "industries":
+        table = table.sort_index(level=["sector", "industry"], ascending=[False, False])
+        labels = [f"{industry} ({sector})" for sector, industry in table.index]
+    else:
+        table = table.sort_values("YTD")
+        labels = list(table.index)
+    values = table[HORIZONS].to_numpy()
+    limit = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1.0
+    fig = go.Figure(data=go.Heatmap(
+        z=values, x=HORIZONS, y=labels,
+        colorscale="RdYlGn", zmid=0, zmin=-limit, zmax=limit,
+        texttemplate="%{z:+.1f}%", customdata=np.repeat(table["Stocks"].to_numpy()[:, None], len(HORIZONS), axis=1),
+        hovertemplate="%{y}<br>%{x}: %{z:+.2f}%<br>%{customdata} stocks<extra></extra>",
+        colorbar=dict(title="%"),
+    ))
+    fig.update_layout(
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=max(300, 28 * len(labels) + 120),
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis=dict(side="top"),
+    )
+    _figure_cache[key] = (version, fig)
+    return fig
+
+
+def _synthetic_universe(num_symbols, num_sectors=11, industries_per_sector=6, seed=0):
+    rng = np.random.default_rng(seed)
+    sectors = rng.integers(num_sectors, size=num_symbols)
+    industries = rng.integers(industries_per_sector, size=num_symbols)
+    return pd.DataFrame({
+        "sector": [f"Sector {s}" for s in sectors],
+        "industry": [f"Industry {s}.{i}" for s, i in zip(sectors, industries)],
+    }, index=pd.Index([f"SYM{i:05d}" for i in range(num_symbols)], name="symbol"))
+
+
+def _per_ticker_overview(provider, universe):
+    """The per-ticker approach, for comparison: one request and one Series per symbol."""
+    rows = {}
+    for symbol in universe.index:
+        close = provider.ticker(symbol).history(period=HISTORY_PERIOD)["Close"]
+        rows[symbol] = {horizon: (close.iloc[-1] / close.iloc[row] - 1) * 100 if row >= 0 else np.nan
+                        for horizon, row in reference_rows(close.index).items()}
+    returns = pd.DataFrame.from_dict(rows, orient="index")
+    return returns.join(universe).groupby("sector")[HORIZONS].mean()
+
+
+def benchmark_market_overview(universe_sizes=(100, 500, 2000), repeats=20):
+    """
+    Compare one batched fetch plus grouped aggregation with per-ticker requests,
+    and time a cached read and the heatmap build.
+
+    :param universe_sizes: Numbers of symbols
+    :param repeats: Repetitions of the cached read
+    """
+    from fake_upstream import CountingProvider
+    for size in universe_sizes:
+        universe = _synthetic_universe(size)
+        symbols = list(universe.index) + list(INDICES)
+
+        provider = CountingProvider()
+        start_time = time.perf_counter()
+        histories = provider.histories(symbols, HISTORY_PERIOD)
+        fetch_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        overview = compute_overview(histories, universe)
+        compute_seconds = time.perf_counter() - start_time
+        batched_fetches = provider.fetches
+
+        provider = CountingProvider()
+        start_time = time.perf_counter()
+        per_ticker = _per_ticker_overview(provider, universe)
+        per_ticker_seconds = time.perf_counter() - start_time
+        assert np.allclose(per_ticker.to_numpy(), overview["sectors"][HORIZONS].to_numpy(), equal_nan=True)
+
+        print(f"{size} symbols, {len(overview['sectors'])} sectors, {len(overview['industries'])} industries")
+        print(f"  batched:    {batched_fetches:5d} requests, fetch {fetch_seconds * 1000:7.1f} ms, "
+              f"aggregate {compute_seconds * 1000:6.1f} ms")
+        print(f"  per ticker: {provider.fetches:5d} requests, total {per_ticker_seconds * 1000:7.1f} ms")
+
+        start_time = time.perf_counter()
+        for level in ("sectors", "industries"):
+            get_heatmap_figure(size, overview, level)
+        figure_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            for level in ("sectors", "industries"):
+                get_heatmap_figure(size, overview, level)
+        cached_seconds = (time.perf_counter() - start_time) / repeats
+        print(f"  heatmaps:   build {figure_seconds * 1000:.1f} ms, cached {cached_seconds * 1000:.3f} ms")
+
+    global _overview, _overview_version, _computed_at
+    _overview, _overview_version, _computed_at = overview, _overview_version + 1, time.time()
+    start_time = time.perf_counter()
+    for _ in range(repeats * 100):
+        get_market_overview()
+    print(f"Shared overview read by a session: {(time.perf_counter() - start_time) / (repeats * 100) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    print("Benchmarking market overview...")
+    benchmark_market_overview()
@@ -0,0 +1,382 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+
+# Lightweight, process-wide instrumentation.
+#
+# Stages are timed with the `timed` decorator or context manager:
+#
+#     @timed("fetch.stock_info")
+#     def get_stock_info(ticker): ...
+#
+#     with timed("storage.save_users"):
+#         json.dump(...)
+#
+# Timings go into per-stage latency histograms and events into counters. Both
+# can be exported in Prometheus text format or as JSON lines. Recording is off
+# unless INVESTSMARTLY_METRICS=1 (or enable() is called); when off, `timed`
+# costs one flag check per call. Only the standard library is used so that
+# importing this module does not slow down start-up.
+#
+# Environment variables:
+#   INVESTSMARTLY_METRICS=1           record timings and counters
+#   INVESTSMARTLY_METRICS_DIR=path    write metrics.prom and metrics.jsonl there on exit
+#   INVESTSMARTLY_PROFILE=1           also run the sampling profiler; the folded
+#                                     stacks are written to profile.folded on exit
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = "investsmartly"
+
+_enabled = os.environ.get('INVESTSMARTLY_METRICS', '') not in ('', '0')
+_lock = threading.Lock()
+_histograms = {}
+_counters = Counter()
+_profiler = None
+
+
+class _Histogram:
+    __slots__ = ('bucket_counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+            if seen + bucket_count >= rank and bucket_count:
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None and not issubclass(exc_type, (KeyboardInterrupt, SystemExit)):
+            increment(f"{self.stage}.errors")
+        return False
+
+
+class timed:
+    """
+    Time a stage, as a decorator or as a context manager.
+
+    :param stage: Stage name, e.g. "fetch.stock_info"
+    """
+
+    __slots__ = ('stage', '_timer')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __call__(self, func):
+        stage = self.stage
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self._timer = _Timer(self.stage) if _enabled else _NULL_TIMER
+        return self._timer.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._timer.__exit__(*exc_info)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def observe(stage, seconds):
+    """
+    Record one duration for a stage.
+
+    :param stage: Stage name
+    :param seconds: Duration in seconds
+    """
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = _Histogram()
+        histogram.observe(seconds)
+
+
+def increment(event, value=1):
+    """
+    Add to an event counter.
+
+    :param event: Counter name, e.g. "fetch.stock_info.errors"
+    :param value: Amount to add
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[event] += value
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """
+    Summarise all stages and counters.
+
+    :return: Dict with a "stages" dict (count, sum, mean, p50, p95, p99, max and
+             bucket counts per stage, times in milliseconds) and a "counters" dict
+    """
+    with _lock:
+        stages = {}
+        for stage, histogram in sorted(_histograms.items()):
+            stages[stage] = {
+                'count': histogram.count,
+                'sum_ms': histogram.sum * 1000,
+                'mean_ms': histogram.sum / histogram.count * 1000,
+                'p50_ms': histogram.quantile(0.5) * 1000,
+                'p95_ms': histogram.quantile(0.95) * 1000,
+                'p99_ms': histogram.quantile(0.99) * 1000,
+                'max_ms': histogram.max * 1000,
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], histogram.bucket_counts)),
+            }
+        return {'stages': stages, 'counters': dict(sorted(_counters.items()))}
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def export_prometheus():
+    """
+    Render all stages and counters in the Prometheus text exposition format.
+
+    :return: Exposition text
+    """
+    with _lock:
+        histograms = [(stage, h.bucket_counts[:], h.count, h.sum) for stage, h in sorted(_histograms.items())]
+        counters = sorted(_counters.items())
+
+    name = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines = [f"# HELP {name} Time spent in each instrumented stage.", f"# TYPE {name} histogram"]
+    for stage, bucket_counts, count, total in histograms:
+        stage = _label(stage)
+        cumulative = 0
+        for bound, bucket_count in zip(list(BUCKETS) + ['+Inf'], bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+    name = f"{METRIC_PREFIX}_events_total"
+    lines += [f"# HELP {name} Count of instrumented events.", f"# TYPE {name} counter"]
+    for event, value in counters:
+        lines.append(f'{name}{{event="{_label(event)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def export_json_lines():
+    """
+    Render all stages and counters as JSON lines, one object per stage or counter.
+
+    :return: JSON lines text
+    """
+    now = time.time()
+    data = snapshot()
+    lines = [json.dumps({'timestamp': now, 'type': 'stage', 'stage': stage, **summary})
+             for stage, summary in data['stages'].items()]
+    lines += [json.dumps({'timestamp': now, 'type': 'counter', 'event': event, 'value': value})
+              for event, value in data['counters'].items()]
+    return "".join(line + "\n" for line in lines)
+
+
+def write_metrics(directory):
+    """
+    Write metrics.prom (replaced) and metrics.jsonl (appended) into a directory.
+
+    :param directory: Output directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    prom_path = os.path.join(directory, "metrics.prom")
+    with open(f"{prom_path}.tmp", 'w') as f:
+        f.write(export_prometheus())
+    os.replace(f"{prom_path}.tmp", prom_path)
+    with open(os.path.join(directory, "metrics.jsonl"), 'a') as f:
+        f.write(export_json_lines())
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of all other threads.
+
+    Samples are aggregated as folded stacks ("outer;inner;leaf count"), the
+    input format of flamegraph tools.
+
+    :param interval: Seconds between samples
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def export_folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def start_profiler(interval=0.01):
+    """Start the process-wide sampling profiler if it is not already running."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval).start()
+    return _profiler
+
+
+def stop_profiler():
+    """Stop the process-wide sampling profiler and return it."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler.stop() if profiler is not None else None
+
+
+def _write_on_exit():
+    directory = os.environ.get('INVESTSMARTLY_METRICS_DIR')
+    profiler = stop_profiler()
+    if not directory:
+        return
+    write_metrics(directory)
+    if profiler is not None:
+        with open(os.path.join(directory, "profile.folded"), 'w') as f:
+            f.write(profiler.export_folded())
+
+
+if os.environ.get('INVESTSMARTLY_PROFILE', '') not in ('', '0'):
+    start_profiler()
+if _enabled or _profiler is not None:
+    atexit.register(_write_on_exit)
+
+
+def benchmark_overhead(iterations=1_000_000):
+    """
+    Measure the per-call cost of `timed` when recording is disabled and enabled.
+
+    :param iterations: Number of calls per measurement
+    """
+    def plain():
+        pass
+
+    decorated = timed("benchmark.decorated")(plain)
+    was_enabled = _enabled
+    for label, switch in (("disabled", disable), ("enabled", enable)):
+        switch()
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            plain()
+        baseline = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            decorated()
+        decorator_cost = (time.perf_counter() - start_time - baseline) / iterations
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            with timed("benchmark.context"):
+                pass
+        context_cost = (time.perf_counter() - start_time) / iterations
+        print(f"{label}: decorator +{decorator_cost * 1e9:.0f} ns/call, context manager {context_cost * 1e9:.0f} ns/block")
+    (enable if was_enabled else disable)()
+    reset()
+
+
+if __name__ == "__main__":
+    print("Measuring instrumentation overhead...")
+    benchmark_overhead()
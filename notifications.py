@@ -1,11 +1,16 @@
-import yfinance as yf
+import market_data
 import pandas as pd
 from datetime import datetime, timedelta
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+import time
+from itertools import islice
+from alerts import check_alert_rules
+from metrics import timed
 
+@timed("fetch.significant_changes")
 def check_significant_changes(ticker, threshold=5):
     """
     Check if a stock has had a significant price change in the last day.
@@ -14,7 +19,7 @@ def check_significant_changes(ticker, threshold=5):
     :param threshold: Percentage change threshold
     :return: Tuple (bool, float) indicating if there's a significant change and the change percentage
     """
-    stock = yf.Ticker(ticker)
+    stock = market_data.ticker(ticker)
     hist = stock.history(period="2d")
     
     if len(hist) < 2:
@@ -43,6 +48,7 @@ def get_market_news():
         "Cryptocurrency Market Experiences High Volatility"
     ]
 
+@timed("fetch.market_events")
 def check_market_events():
     """
     Check for significant market events.
@@ -58,9 +64,13 @@ def check_market_events():
         "^IXIC": "NASDAQ"
     }
     
+    # One batched request for all indices; two days of bars are needed for a daily change.
+    histories = market_data.histories(list(indices), "5d")
     for symbol, name in indices.items():
-        index = yf.Ticker(symbol)
-        index_change = index.history(period="1d")['Close'].pct_change().iloc[-1] * 100
+        history = histories.get(symbol)
+        if history is None or len(history) < 2:
+            continue
+        index_change = history['Close'].pct_change().iloc[-1] * 100
         
         if abs(index_change) > 1:
             direction = "up" if index_change > 0 else "down"
@@ -68,6 +78,7 @@ def check_market_events():
     
     return events
 
+@timed("notifications.generate")
 def generate_notifications(watchlist, user_preferences):
     """
     Generate notifications for stocks in the watchlist, general market news, and market events.
@@ -87,11 +98,26 @@ def generate_notifications(watchlist, user_preferences):
                 direction = "up" if change > 0 else "down"
                 notifications.append({
                     'type': 'price_change',
+                    'ticker': ticker,
+                    'change': change,
                     'message': f"{ticker} has moved {direction} by {abs(change):.2f}% in the last day.",
                     'timestamp': datetime.now(),
                     'read': False
                 })
     
+    # User-defined alert rules
+    alert_rules = user_preferences.get('alert_rules', [])
+    if alert_rules:
+        for rule, ticker in check_alert_rules(watchlist, alert_rules):
+            notifications.append({
+                'type': 'alert_rule',
+                'ticker': ticker,
+                'rule': rule,
+                'message': f"{ticker}: alert \"{rule}\" triggered.",
+                'timestamp': datetime.now(),
+                'read': False
+            })
+    
     # Market news
     if user_preferences.get('market_news', True):
         news = get_market_news()
@@ -135,6 +161,161 @@ def get_notification_history(notifications, days=7):
     cutoff_date = datetime.now() - timedelta(days=days)
     return [n for n in notifications if n['timestamp'] > cutoff_date]
 
+class NotificationInbox:
+    """
+    Notifications for one session, with stable numeric ids and unread groups.
+
+    Unread notifications are grouped by (type, ticker) and the groups are kept
+    up to date as notifications are added or marked as read, so rendering a
+    page of groups costs the same whether there are 10 or 10,000 unread
+    notifications. Notifications remain plain dicts, so `notifications` can be
+    passed to get_notification_history.
+    """
+
+    def __init__(self):
+        self.notifications = []
+        self.unread_count = 0
+        # group key -> dict of unread ids, in insertion order; the most
+        # recently updated group is last.
+        self._unread_groups = {}
+        # dedupe key -> notification id, for the current day only.
+        self._seen = {}
+        self._seen_date = None
+
+    @staticmethod
+    def dedupe_key(notification):
+        """
+        Key under which repeats are merged: a price move is one move per ticker
+        and day, however often it is refetched; anything else repeats when the
+        same message comes back on the same day.
+        """
+        day = notification['timestamp'].date()
+        if notification['type'] == 'price_change':
+            return (notification['type'], notification['ticker'], day)
+        return (notification['type'], notification['message'], day)
+
+    def add(self, notification):
+        """
+        Add a notification. A repeat on the same day is not added again; a
+        repeated price move updates the existing notification's change,
+        message and timestamp instead.
+
+        :param notification: Notification dict as built by generate_notifications
+        :return: The notification's id, or None if it was a repeat
+        """
+        dedupe_key = self.dedupe_key(notification)
+        day = dedupe_key[-1]
+        if self._seen_date is None or day > self._seen_date:
+            # Keys from previous days can no longer match; drop them.
+            self._seen = {key: value for key, value in self._seen.items() if key[-1] >= day}
+            self._seen_date = day
+        existing_id = self._seen.get(dedupe_key)
+        if existing_id is not None:
+            if notification['type'] == 'price_change':
+                self._update(existing_id, notification)
+            return None
+        notification_id = len(self.notifications)
+        self._seen[dedupe_key] = notification_id
+        notification['id'] = notification_id
+        self.notifications.append(notification)
+        if not notification['read']:
+            key = self.group_key(notification)
+            group = self._unread_groups.pop(key, {})
+            group[notification_id] = None
+            self._unread_groups[key] = group
+            self.unread_count += 1
+        return notification_id
+
+    def _update(self, notification_id, notification):
+        existing = self.notifications[notification_id]
+        for field in ('change', 'message', 'timestamp'):
+            existing[field] = notification[field]
+        if not existing['read']:
+            # The group now holds the most recent update.
+            key = self.group_key(existing)
+            self._unread_groups[key] = self._unread_groups.pop(key)
+
+    def extend(self, notifications):
+        for notification in notifications:
+            self.add(notification)
+
+    @staticmethod
+    def group_key(notification):
+        return (notification['type'], notification.get('ticker'))
+
+    def mark_read(self, notification_ids):
+        """
+        Mark several notifications as read in one operation.
+
+        :param notification_ids: Iterable of notification ids
+        """
+        for notification_id in notification_ids:
+            notification = self.notifications[notification_id]
+            if notification['read']:
+                continue
+            mark_notification_as_read(notification)
+            key = self.group_key(notification)
+            group = self._unread_groups[key]
+            del group[notification_id]
+            if not group:
+                del self._unread_groups[key]
+            self.unread_count -= 1
+
+    def mark_group_read(self, key):
+        self.mark_read(list(self._unread_groups.get(key, ())))
+
+    def mark_all_read(self):
+        for group in self._unread_groups.values():
+            for notification_id in group:
+                mark_notification_as_read(self.notifications[notification_id])
+        self._unread_groups.clear()
+        self.unread_count = 0
+
+    @property
+    def group_count(self):
+        return len(self._unread_groups)
+
+    def unread_page(self, page=0, page_size=10):
+        """
+        Summarise one page of unread groups, most recently updated first.
+
+        :param page: Zero-based page number
+        :param page_size: Number of groups per page
+        :return: List of dicts with the group key, unread count, latest notification and summary text
+        """
+        groups = islice(reversed(self._unread_groups.items()), page * page_size, (page + 1) * page_size)
+        summaries = []
+        for key, group in groups:
+            latest = self.notifications[next(reversed(group))]
+            summaries.append({
+                'key': key,
+                'count': len(group),
+                'latest': latest,
+                'summary': summarize_notification_group(len(group), latest)
+            })
+        return summaries
+
+
+def summarize_notification_group(count, latest):
+    """
+    Describe a group of unread notifications in one line.
+
+    :param count: Number of unread notifications in the group
+    :param latest: Most recent notification of the group
+    :return: Summary text
+    """
+    if count == 1:
+        return latest['message']
+    if latest['type'] == 'price_change':
+        return f"{latest['ticker']}: {count} moves, latest {latest['change']:+.1f}%"
+    if latest['type'] == 'alert_rule':
+        return f"{latest['ticker']}: {count} alerts, latest \"{latest['rule']}\""
+    if latest['type'] == 'market_news':
+        return f"{count} market news headlines, latest: {latest['message'].removeprefix('Market News: ')}"
+    if latest['type'] == 'market_event':
+        return f"{count} market events, latest: {latest['message']}"
+    return f"{count} notifications, latest: {latest['message']}"
+
 def send_email_notification(to_email, subject, body):
     """
     Send an email notification.
@@ -212,6 +393,44 @@ def stress_test_notifications(num_notifications=1000):
     history = get_notification_history(test_notifications)
     print(f"Notification history contains {len(history)} notifications")
 
+def benchmark_notification_inbox(counts=(10, 100, 1000, 10000), page_size=10):
+    """
+    Measure the cost of building one sidebar page of unread notification groups.
+
+    :param counts: Numbers of unread notifications to test with
+    :param page_size: Number of groups per page
+    """
+    tickers = [f"T{i:03d}" for i in range(100)]
+    for count in counts:
+        inbox = NotificationInbox()
+        start_time = time.perf_counter()
+        for i in range(count):
+            ticker = tickers[i % len(tickers)]
+            inbox.add({
+                'type': 'price_change',
+                'ticker': ticker,
+                'change': 5.0 + i % 7,
+                'message': f"{ticker} has moved up by {5.0 + i % 7:.2f}% in the last day.",
+                # One move per ticker and day
+                'timestamp': datetime.now() - timedelta(days=i // len(tickers)),
+                'read': False
+            })
+        add_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(100):
+            page = inbox.unread_page(0, page_size)
+        page_time = (time.perf_counter() - start_time) / 100
+        groups = inbox.group_count
+
+        start_time = time.perf_counter()
+        inbox.mark_all_read()
+        mark_time = time.perf_counter() - start_time
+
+        print(f"{count:6d} unread in {groups} groups: "
+              f"add {add_time * 1000:.1f} ms, page of {len(page)} groups {page_time * 1e6:.0f} us, "
+              f"mark all read {mark_time * 1000:.2f} ms")
+
 def test_no_notifications():
     """
     Test the behavior when there are no new notifications.
@@ -237,3 +456,5 @@ if __name__ == "__main__":
     stress_test_notifications()
     print("\nTesting no notifications scenario...")
     test_no_notifications()
+    print("\nBenchmarking notification inbox...")
+    benchmark_notification_inbox()
@@ -0,0 +1,562 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+import numpy as np
+import pandas as pd
+import market_data
+
+# Compressed on-disk archive for long daily or minute price histories.
+#
+# A file holds any number of tickers. Each ticker's bars are split into
+# chunks of up to `chunk_rows` rows, and every chunk encodes its columns
+# separately:
+#   timestamps  epoch seconds, stored as the first timestamp, the first delta
+#               and zigzag delta-of-deltas (zero for regular bars)
+#   prices      exactly, as XOR of consecutive float64 bit patterns,
+#               byte-shuffled before deflating; or, when `price_decimals` is
+#               set, as scaled integers rounded to that many decimals, stored
+#               as the first value and zigzag deltas (smaller, but lossy)
+#   volume      integers, stored like rounded prices with no decimals
+# Deltas are narrowed to the smallest integer type that holds the chunk and
+# deflated. Columns that cannot be scaled (NaN, fractional volume) fall back
+# to the exact XOR encoding.
+#
+# The reader memory-maps the file. Per-ticker chunk indexes (first and last
+# timestamp of every chunk) live in a table at the end of the file, so a
+# date-range read decodes only the chunks, and only the columns, it touches.
+#
+# File layout:
+#   b"ISPA" + u16 version
+#   chunks
+#   chunk table     CHUNK_DTYPE records, grouped by ticker
+#   footer          JSON: fields, chunk_rows, per-ticker first chunk, chunk count and time zone
+#   trailer         u64 table offset, u64 chunk count, u64 footer offset, u64 footer length, b"ISPA"
+#
+#     python price_archive.py                  # benchmark against Parquet and CSV
+#     python price_archive.py build out.ispa AAPL MSFT --period max
+#     python price_archive.py build out.ispa AAPL --price-decimals 4   # rounded, smaller
+
+MAGIC = b"ISPA"
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_ROWS = 1024
+DEFAULT_PRICE_DECIMALS = None
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+CHUNK_DTYPE = np.dtype([("first", "<i8"), ("last", "<i8"), ("offset", "<u8"), ("rows", "<u4")])
+
+_TRAILER = struct.Struct("<QQQQ4s")
+_TIMESTAMP_HEADER = struct.Struct("<qqBI")  # first timestamp, first delta, delta width, compressed length
+_COLUMN_HEADER = struct.Struct("<BBbqI")    # encoding, width, decimals, first value, compressed length
+
+_SCALED = 0
+_XOR = 1
+
+_WIDTHS = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+class PriceArchiveError(ValueError):
+    """The file is not a price archive or is corrupt."""
+
+
+def _zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(values):
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def _narrow(values):
+    """Return (width, bytes) of unsigned values in the smallest type that holds them."""
+    top = int(values.max()) if len(values) else 0
+    for width, dtype in _WIDTHS.items():
+        if top <= np.iinfo(dtype).max:
+            return width, values.astype(dtype).tobytes()
+
+
+def _widen(payload, width, count):
+    return np.frombuffer(payload, dtype=_WIDTHS[width], count=count).astype(np.uint64)
+
+
+def _encode_timestamps(seconds):
+    deltas = np.diff(seconds)
+    first_delta = int(deltas[0]) if len(deltas) else 0
+    width, payload = _narrow(_zigzag(np.diff(deltas)))
+    payload = zlib.compress(payload)
+    return _TIMESTAMP_HEADER.pack(int(seconds[0]), first_delta, width, len(payload)) + payload
+
+
+def _decode_timestamps(buffer, offset, rows):
+    first, first_delta, width, length = _TIMESTAMP_HEADER.unpack_from(buffer, offset)
+    offset += _TIMESTAMP_HEADER.size
+    seconds = np.empty(rows, dtype=np.int64)
+    seconds[0] = first
+    if rows > 1:
+        deltas = np.empty(rows - 1, dtype=np.int64)
+        deltas[0] = first_delta
+        deltas[1:] = _unzigzag(_widen(zlib.decompress(buffer[offset:offset + length]), width, rows - 2))
+        seconds[1:] = first + np.cumsum(np.cumsum(deltas))
+    return seconds, offset + length
+
+
+def _encode_column(values, decimals):
+    """
+    Encode one column as scaled-integer deltas, or XOR if it cannot be scaled.
+
+    :param values: float64 array
+    :param decimals: Decimals to round to, or None to require an exact encoding
+    """
+    if decimals is not None and np.isfinite(values).all():
+        scaled = np.round(values * 10.0 ** decimals)
+        if np.abs(scaled).max(initial=0) < 2 ** 53:
+            quantized = scaled.astype(np.int64)
+            width, payload = _narrow(_zigzag(np.diff(quantized)))
+            payload = zlib.compress(payload)
+            return _COLUMN_HEADER.pack(_SCALED, width, decimals, int(quantized[0]), len(payload)) + payload
+    bits = values.astype(np.float64).view(np.uint64)
+    xored = bits[1:] ^ bits[:-1]
+    # Byte-shuffle so the mostly-zero high bytes of every value sit together.
+    payload = zlib.compress(xored.view(np.uint8).reshape(-1, 8).T.tobytes())
+    return _COLUMN_HEADER.pack(_XOR, 8, 0, int(bits[0].view(np.int64)), len(payload)) + payload
+
+
+def _decode_column(buffer, offset, rows, decode=True):
+    encoding, width, decimals, first, length = _COLUMN_HEADER.unpack_from(buffer, offset)
+    offset += _COLUMN_HEADER.size
+    end = offset + length
+    if not decode:
+        return None, end
+    if encoding == _SCALED:
+        quantized = np.empty(rows, dtype=np.int64)
+        quantized[0] = first
+        if rows > 1:
+            quantized[1:] = first + np.cumsum(_unzigzag(_widen(zlib.decompress(buffer[offset:end]), width, rows - 1)))
+        return quantized / 10.0 ** decimals, end
+    bits = np.empty(rows, dtype=np.uint64)
+    bits[0] = np.int64(first).view(np.uint64)
+    if rows > 1:
+        shuffled = np.frombuffer(zlib.decompress(buffer[offset:end]), dtype=np.uint8).reshape(8, rows - 1)
+        bits[1:] = np.bitwise_xor.accumulate(np.ascontiguousarray(shuffled.T).view(np.uint64).ravel())
+        bits[1:] ^= bits[0]
+    return bits.view(np.float64), end
+
+
+class PriceArchiveWriter:
+    """
+    Stream tickers into a new archive.
+
+    :param path: Output path; written to a temporary file and moved into place on close()
+    :param chunk_rows: Rows per chunk; smaller chunks make narrow range reads cheaper
+    :param price_decimals: Decimals to round prices to, which makes the file smaller but loses
+        precision, or None to store them exactly
+    :param fields: Columns to store
+    """
+
+    def __init__(self, path, chunk_rows=DEFAULT_CHUNK_ROWS, price_decimals=DEFAULT_PRICE_DECIMALS, fields=FIELDS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.price_decimals = price_decimals
+        self.fields = list(fields)
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC + struct.pack("<H", FORMAT_VERSION))
+        self._chunks = []
+        self._symbols = {}
+
+    def add(self, symbol, history):
+        """
+        Append one ticker's bars.
+
+        :param symbol: Ticker symbol, added at most once
+        :param history: DataFrame indexed by timestamp with the archive's fields
+        """
+        if symbol in self._symbols:
+            raise ValueError(f"{symbol} is already in the archive")
+        history = history[~history.index.duplicated()].sort_index()
+        index = history.index
+        tz = str(index.tz) if getattr(index, "tz", None) is not None else None
+        if tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        seconds = index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+        columns = [history[field].to_numpy(dtype=np.float64) for field in self.fields]
+        decimals = [0 if field == "Volume" else self.price_decimals for field in self.fields]
+
+        self._symbols[symbol] = [len(self._chunks), 0, tz]
+        for start in range(0, len(seconds), self.chunk_rows):
+            end = min(start + self.chunk_rows, len(seconds))
+            offset = self._file.tell()
+            self._file.write(_encode_timestamps(seconds[start:end]))
+            for values, column_decimals in zip(columns, decimals):
+                values = values[start:end]
+                if column_decimals == 0 and not np.array_equal(values, np.round(values)):
+                    column_decimals = None
+                self._file.write(_encode_column(values, column_decimals))
+            self._chunks.append((seconds[start], seconds[end - 1], offset, end - start))
+            self._symbols[symbol][1] += 1
+
+    def close(self):
+        table = np.array(self._chunks, dtype=CHUNK_DTYPE)
+        table_offset = self._file.tell()
+        self._file.write(table.tobytes())
+        footer = json.dumps({
+            "fields": self.fields,
+            "chunk_rows": self.chunk_rows,
+            "price_decimals": self.price_decimals,
+            "symbols": self._symbols,
+        }).encode()
+        footer_offset = self._file.tell()
+        self._file.write(footer)
+        self._file.write(_TRAILER.pack(table_offset, len(table), footer_offset, len(footer), MAGIC))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+        return False
+
+
+def write_archive(path, histories, **kwargs):
+    """
+    Write a dict of symbol -> history DataFrame to a new archive.
+
+    Keyword arguments are passed to PriceArchiveWriter.
+    """
+    with PriceArchiveWriter(path, **kwargs) as writer:
+        for symbol, history in histories.items():
+            writer.add(symbol, history)
+
+
+class PriceArchive:
+    """
+    Memory-mapped reader for an archive written by PriceArchiveWriter.
+
+    :param path: Archive path
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if len(buffer) < len(MAGIC) + 2 + _TRAILER.size or bytes(buffer[:4]) != MAGIC:
+            raise PriceArchiveError(f"{path} is not a price archive")
+        version, = struct.unpack_from("<H", buffer, 4)
+        if version != FORMAT_VERSION:
+            raise PriceArchiveError(f"Unsupported price archive version {version} in {path}")
+        table_offset, chunk_count, footer_offset, footer_length, magic = _TRAILER.unpack_from(buffer, len(buffer) - _TRAILER.size)
+        if magic != MAGIC:
+            raise PriceArchiveError(f"{path} is truncated")
+        self._buffer = buffer
+        self._table = np.frombuffer(self._mmap, dtype=CHUNK_DTYPE, count=chunk_count, offset=table_offset)
+        footer = json.loads(bytes(buffer[footer_offset:footer_offset + footer_length]))
+        self.fields = footer["fields"]
+        self.chunk_rows = footer["chunk_rows"]
+        self._symbols = footer["symbols"]
+
+    @property
+    def symbols(self):
+        return list(self._symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._symbols
+
+    def _chunk_table(self, symbol):
+        first_chunk, count, tz = self._symbols[symbol]
+        return self._table[first_chunk:first_chunk + count], tz
+
+    def date_range(self, symbol):
+        """First and last timestamp stored for a symbol."""
+        chunks, tz = self._chunk_table(symbol)
+        first, last = (pd.Timestamp(chunks[0]["first"], unit="s"), pd.Timestamp(chunks[-1]["last"], unit="s"))
+        return (first.tz_localize("UTC").tz_convert(tz), last.tz_localize("UTC").tz_convert(tz)) if tz else (first, last)
+
+    def _decode(self, chunks, columns):
+        wanted = [field in columns for field in self.fields]
+        seconds = []
+        values = [[] for _ in self.fields]
+        for chunk in chunks:
+            rows = int(chunk["rows"])
+            chunk_seconds, offset = _decode_timestamps(self._buffer, int(chunk["offset"]), rows)
+            seconds.append(chunk_seconds)
+            for i, decode in enumerate(wanted):
+                column, offset = _decode_column(self._buffer, offset, rows, decode)
+                if decode:
+                    values[i].append(column)
+        return seconds, values
+
+    def read(self, symbol, start=None, end=None, columns=None):
+        """
+        Read a symbol's bars between two timestamps, decoding only the chunks they touch.
+
+        :param symbol: Ticker symbol
+        :param start: First timestamp to include, or None for the beginning
+        :param end: Last timestamp to include, or None for the end
+        :param columns: Fields to decode, or None for all
+        :return: DataFrame indexed by timestamp
+        """
+        if symbol not in self._symbols:
+            raise KeyError(symbol)
+        chunks, tz = self._chunk_table(symbol)
+        columns = self.fields if columns is None else [field for field in self.fields if field in columns]
+        start_seconds = self._to_seconds(start, tz) if start is not None else None
+        end_seconds = self._to_seconds(end, tz) if end is not None else None
+        lo = int(np.searchsorted(chunks["last"], start_seconds, "left")) if start_seconds is not None else 0
+        hi = int(np.searchsorted(chunks["first"], end_seconds, "right")) if end_seconds is not None else len(chunks)
+        seconds, values = self._decode(chunks[lo:hi], columns)
+        return self._frame(seconds, values, columns, tz, start_seconds, end_seconds)
+
+    def tail(self, symbol, rows, columns=None):
+        """
+        Read a symbol's last `rows` bars, decoding only the chunks they span.
+
+        :param symbol: Ticker symbol
+        :param rows: Number of bars
+        :param columns: Fields to decode, or None for all
+        """
+        if symbol not in self._symbols:
+            raise KeyError(symbol)
+        chunks, tz = self._chunk_table(symbol)
+        columns = self.fields if columns is None else [field for field in self.fields if field in columns]
+        covered = np.cumsum(chunks["rows"][::-1])
+        needed = int(np.searchsorted(covered, rows)) + 1
+        seconds, values = self._decode(chunks[max(len(chunks) - needed, 0):], columns)
+        frame = self._frame(seconds, values, columns, tz)
+        return frame.iloc[-rows:] if rows else frame.iloc[:0]
+
+    @staticmethod
+    def _to_seconds(timestamp, tz):
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tzinfo is None and tz is not None:
+            timestamp = timestamp.tz_localize(tz)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        return int(timestamp.value // 10**9)
+
+    def _frame(self, seconds, values, columns, tz, start_seconds=None, end_seconds=None):
+        seconds = np.concatenate(seconds) if seconds else np.empty(0, dtype=np.int64)
+        keep = slice(
+            int(np.searchsorted(seconds, start_seconds, "left")) if start_seconds is not None else 0,
+            int(np.searchsorted(seconds, end_seconds, "right")) if end_seconds is not None else len(seconds),
+        )
+        index = pd.DatetimeIndex(seconds[keep].astype("datetime64[s]").astype("datetime64[ns]"), name="Date")
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        data = {}
+        for field, column in zip(self.fields, values):
+            if field in columns:
+                column = np.concatenate(column) if column else np.empty(0)
+                data[field] = column[keep]
+        return pd.DataFrame(data, index=index, columns=columns)
+
+    def close(self):
+        self._table = None
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class ArchiveProvider:
+    """
+    Market data provider serving histories from a price archive.
+
+    Fundamentals, and symbols or periods the archive does not cover, come
+    from the fallback provider.
+
+    :param path: Archive path
+    :param fallback: Provider for everything the archive does not cover, or None
+                     to raise market_data.MissingRecordingError
+    """
+
+    def __init__(self, path, fallback=None):
+        self.archive = PriceArchive(path)
+        self.fallback = fallback
+
+    def ticker(self, symbol):
+        return market_data._ProviderTicker(self, symbol)
+
+    def _fallback(self, request):
+        if self.fallback is None:
+            raise market_data.MissingRecordingError(f"No {request} in {self.archive.path}")
+        return self.fallback
+
+    def info(self, symbol):
+        return self._fallback(f"info for {symbol}").ticker(symbol).info
+
+    def history(self, symbol, period="1mo"):
+        if symbol in self.archive:
+            return self.archive.tail(symbol, market_data.period_bars(period))
+        return self._fallback(f"{period} history for {symbol}").ticker(symbol).history(period=period)
+
+    def histories(self, symbols, period="1y"):
+        symbols = list(dict.fromkeys(symbols))
+        result = {symbol: self.history(symbol, period) for symbol in symbols if symbol in self.archive}
+        missing = [symbol for symbol in symbols if symbol not in self.archive]
+        if missing:
+            result.update(self._fallback(f"{period} histories for {missing}").histories(missing, period))
+        return result
+
+
+def build_archive(path, symbols, period="max", provider=None, **kwargs):
+    """
+    Download histories from a provider into a new archive, in one batched request.
+
+    :param path: Output path
+    :param symbols: Ticker symbols
+    :param period: yfinance period string
+    :param provider: Provider to download from, or None for the active provider
+    :return: Number of symbols written
+    """
+    histories = (provider or market_data.get_provider()).histories(symbols, period)
+    write_archive(path, histories, **kwargs)
+    return len(histories)
+
+
+def _synthetic_bars(num_bars, freq, seed):
+    rng = np.random.default_rng(seed)
+    close = np.round(rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(0.0002, 0.015, num_bars))), 2)
+    spread = np.round(np.abs(rng.normal(0, 0.01, num_bars)) * close, 2)
+    if freq == "min":
+        # Regular-session minutes on business days.
+        days = pd.bdate_range("2024-01-02", periods=-(-num_bars // 390))
+        index = (days.repeat(390) + pd.to_timedelta(np.tile(np.arange(390), len(days)) + 570, unit="min"))[:num_bars]
+    else:
+        index = pd.bdate_range("2000-01-03", periods=num_bars)
+    return pd.DataFrame({
+        "Open": np.round(close + rng.normal(0, 0.2, num_bars), 2),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(100_000, 50_000_000, num_bars).astype(np.int64),
+    }, index=pd.DatetimeIndex(index, name="Date"))
+
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+# Rounding benchmarked against the exact default.
+ROUNDED_DECIMALS = 4
+
+
+def benchmark_price_archive(num_tickers=200, daily_bars=5040, minute_tickers=10, minute_bars=98_280, reads=200):
+    """
+    Compare size on disk and range-read latency of the archive, exact and
+    with prices rounded to ROUNDED_DECIMALS, against Parquet and CSV (one
+    file per ticker for both).
+
+    :param num_tickers: Tickers of daily bars (default 20 years each)
+    :param daily_bars: Daily bars per ticker
+    :param minute_tickers: Tickers of minute bars
+    :param minute_bars: Minute bars per ticker (default about one year)
+    :param reads: Random range reads per measurement
+    """
+    import tempfile
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+        print("pyarrow is not installed; skipping Parquet")
+
+    cases = {
+        f"{num_tickers} tickers x {daily_bars} daily bars": ("B", num_tickers, daily_bars,
+                                                              {"6 months": 126, "1 year": 252, "5 years": 1260, "all": None}),
+        f"{minute_tickers} tickers x {minute_bars} minute bars": ("min", minute_tickers, minute_bars,
+                                                                  {"1 day": 390, "1 week": 1950, "1 month": 8190, "all": None}),
+    }
+    for name, (freq, tickers, bars, windows) in cases.items():
+        histories = {f"T{i:04d}": _synthetic_bars(bars, freq, i) for i in range(tickers)}
+        raw_bytes = tickers * bars * (len(FIELDS) + 1) * 8
+        print(f"{name} ({raw_bytes / 2**20:.0f} MiB as float64):")
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_path = os.path.join(tmp, "prices.ispa")
+            csv_dir = os.path.join(tmp, "csv")
+            parquet_dir = os.path.join(tmp, "parquet")
+            os.makedirs(csv_dir)
+            os.makedirs(parquet_dir)
+
+            formats = {}
+            start_time = time.perf_counter()
+            write_archive(archive_path, histories)
+            formats["archive"] = [time.perf_counter() - start_time, os.path.getsize(archive_path)]
+            # Opt-in rounding: scaled integers instead of exact floats.
+            rounded_path = os.path.join(tmp, "rounded.ispa")
+            start_time = time.perf_counter()
+            write_archive(rounded_path, histories, price_decimals=ROUNDED_DECIMALS)
+            formats["archive, rounded"] = [time.perf_counter() - start_time, os.path.getsize(rounded_path)]
+            start_time = time.perf_counter()
+            for symbol, history in histories.items():
+                history.to_csv(os.path.join(csv_dir, f"{symbol}.csv"))
+            formats["CSV"] = [time.perf_counter() - start_time, _directory_size(csv_dir)]
+            if pq is not None:
+                start_time = time.perf_counter()
+                for symbol, history in histories.items():
+                    history.to_parquet(os.path.join(parquet_dir, f"{symbol}.parquet"))
+                formats["Parquet"] = [time.perf_counter() - start_time, _directory_size(parquet_dir)]
+
+            rng = np.random.default_rng(0)
+            archive = PriceArchive(archive_path)
+            rounded = PriceArchive(rounded_path)
+            readers = {
+                "archive": lambda symbol, start, end: archive.read(symbol, start, end),
+                "archive, rounded": lambda symbol, start, end: rounded.read(symbol, start, end),
+                "CSV": lambda symbol, start, end: pd.read_csv(
+                    os.path.join(csv_dir, f"{symbol}.csv"), index_col="Date", parse_dates=True).loc[start:end],
+                "Parquet": lambda symbol, start, end: pd.read_parquet(
+                    os.path.join(parquet_dir, f"{symbol}.parquet"),
+                    filters=[("Date", ">=", start), ("Date", "<=", end)]),
+            }
+            for label, (write_seconds, size) in formats.items():
+                timings = []
+                for window, rows in windows.items():
+                    count = max(reads // (10 if label == "CSV" else 1), 5)
+                    requests = []
+                    for _ in range(count):
+                        symbol = f"T{rng.integers(tickers):04d}"
+                        index = histories[symbol].index
+                        first = int(rng.integers(0, len(index) - rows + 1)) if rows else 0
+                        requests.append((symbol, index[first], index[first + rows - 1] if rows else index[-1]))
+                    start_time = time.perf_counter()
+                    for symbol, start, end in requests:
+                        frame = readers[label](symbol, start, end)
+                    assert len(frame) == (rows or bars), (label, window, len(frame))
+                    timings.append(f"{window} {(time.perf_counter() - start_time) / count * 1000:6.2f} ms")
+                print(f"  {label:<16} {size / 2**20:7.1f} MiB ({raw_bytes / size:4.1f}x)  write {write_seconds:5.1f} s  "
+                      + "  ".join(timings))
+            archive.close()
+            rounded.close()
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["build"]:
+        import argparse
+        parser = argparse.ArgumentParser(description="Download histories into a price archive.")
+        parser.add_argument("path")
+        parser.add_argument("symbols", nargs="+")
+        parser.add_argument("--period", default="max")
+        parser.add_argument("--price-decimals", type=int, default=DEFAULT_PRICE_DECIMALS,
+                            help="round prices to this many decimals for a smaller, lossy archive")
+        args = parser.parse_args(sys.argv[2:])
+        count = build_archive(args.path, args.symbols, args.period, price_decimals=args.price_decimals)
+        print(f"Wrote {count} symbols to {args.path}")
+    else:
+        print("Benchmarking price archive...")
+        benchmark_price_archive()
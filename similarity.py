@@ -0,0 +1,537 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import market_data
+from metrics import timed
+
+# "Similar stocks" search.
+#
+# Every ticker is embedded as one unit vector made of two parts:
+#   returns        its daily log returns over the last `window` trading days,
+#                  z-scored and scaled to unit length, so that the dot product
+#                  of two return parts is their Pearson correlation
+#   fundamentals   log P/E and dividend yield (z-scored across the universe),
+#                  a market cap bucket and the sector, one-hot encoded
+# The parts are weighted so that similarity = return_weight * correlation +
+# (1 - return_weight) * cosine similarity of fundamentals.
+#
+# Queries are either exact (a matrix-vector product over all tickers, or a
+# blocked matrix product for every ticker at once) or approximate (an
+# inverted-file index: tickers are clustered with k-means and a query only
+# scores the tickers in its `nprobe` nearest clusters).
+#
+# When a new bar arrives, add_bars() shifts the closes window and recomputes
+# the return parts of every ticker in one vectorised pass and reassigns them
+# to their nearest cluster; clusters are retrained only after
+# RETRAIN_FRACTION of the tickers have moved cluster.
+
+DEFAULT_WINDOW = 126
+DEFAULT_RETURN_WEIGHT = 0.7
+RETRAIN_FRACTION = 0.2
+KMEANS_ITERATIONS = 10
+KMEANS_REFINE_ITERATIONS = 2
+
+# Upper bounds of the market cap buckets: micro, small, mid, large; above is mega.
+MARKET_CAP_BUCKETS = (3e8, 2e9, 1e10, 2e11)
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _return_parts(closes):
+    """Z-scored log returns of each row of a closes matrix, scaled to unit length."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(closes), axis=1)
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    returns -= returns.mean(axis=1, keepdims=True)
+    return _unit_rows(returns)
+
+
+def _numeric_fundamentals(infos):
+    """Log P/E (NaN when not positive) and dividend yield of each info dict."""
+    pe = np.array([info.get("trailingPE") or np.nan for info in infos], dtype=np.float64)
+    dividend = np.array([info.get("dividendYield") or 0.0 for info in infos], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_pe = np.where(pe > 0, np.log(np.clip(pe, 1, 500)), np.nan)
+    return np.column_stack([log_pe, dividend])
+
+
+def _top_k(scores, k, exclude=None):
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    k = min(k, len(scores) - (exclude is not None))
+    if k <= 0:
+        return np.empty(0, dtype=int)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class SimilarityIndex:
+    """
+    Similarity index over a universe of tickers.
+
+    :param window: Trading days of returns compared
+    :param return_weight: Weight of return correlation against fundamentals, between 0 and 1
+    :param clusters: Number of k-means clusters for approximate queries, or None for about sqrt(tickers)
+    :param seed: Seed for k-means initialisation
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, return_weight=DEFAULT_RETURN_WEIGHT, clusters=None, seed=0):
+        self.window = window
+        self.return_weight = return_weight
+        self.clusters = clusters
+        self.seed = seed
+        self.symbols = []
+        self.infos = {}
+        self._rows = {}
+        self._closes = np.empty((0, window + 1))
+        self._fundamentals = np.empty((0, 0))
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._sectors = []
+        self._centroids = None
+        self._assignments = None
+        self._trained_assignments = None
+        self._moved = 0
+        self.last_date = None
+        # Serialises queries with updates from the background refresh.
+        self._lock = threading.RLock()
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    # Building
+
+    @timed("similarity.build")
+    def build(self, histories, infos):
+        """
+        Build the index from scratch.
+
+        :param histories: Dict of symbol -> history DataFrame with a Close column
+        :param infos: Dict of symbol -> info dict (trailingPE, dividendYield, marketCap, sector)
+        :return: self
+        """
+        self.symbols = [symbol for symbol, history in histories.items() if history is not None and len(history) > 1]
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.infos = {symbol: dict(infos.get(symbol) or {}) for symbol in self.symbols}
+        closes = pd.DataFrame({symbol: histories[symbol]["Close"] for symbol in self.symbols})
+        closes.index = pd.DatetimeIndex(closes.index).tz_localize(None) if getattr(closes.index, "tz", None) else closes.index
+        closes = closes.sort_index().ffill().bfill().iloc[-(self.window + 1):]
+        self.last_date = closes.index[-1] if len(closes) else None
+        matrix = closes.to_numpy(dtype=np.float64).T
+        if matrix.shape[1] < self.window + 1:
+            # Short histories: pad with the first close, i.e. zero returns.
+            pad = np.repeat(matrix[:, :1], self.window + 1 - matrix.shape[1], axis=1) if matrix.size else \
+                np.ones((len(self.symbols), self.window + 1 - matrix.shape[1]))
+            matrix = np.concatenate([pad, matrix], axis=1)
+        self._closes = matrix
+        self._build_fundamentals()
+        self._refresh_vectors()
+        self._train()
+        return self
+
+    def _build_fundamentals(self):
+        infos = [self.infos[s] for s in self.symbols]
+        self._sectors = sorted({info.get("sector") or "Unknown" for info in infos})
+        numeric = _numeric_fundamentals(infos)
+        mean = np.nanmean(numeric, axis=0) if len(numeric) else np.zeros(2)
+        std = np.nanstd(numeric, axis=0) if len(numeric) else np.ones(2)
+        self._numeric_stats = (np.nan_to_num(mean), np.where(np.nan_to_num(std) > 0, np.nan_to_num(std), 1.0))
+        self._fundamentals = self._encode_fundamentals(infos)
+
+    def _encode_fundamentals(self, infos):
+        """Fundamentals parts of `infos`, z-scored against the universe; unknown sectors get no sector column."""
+        numeric = np.nan_to_num((_numeric_fundamentals(infos) - self._numeric_stats[0]) / self._numeric_stats[1])
+        market_cap = np.array([info.get("marketCap") or 0.0 for info in infos], dtype=np.float64)
+        buckets = np.zeros((len(infos), len(MARKET_CAP_BUCKETS) + 1))
+        buckets[np.arange(len(infos)), np.searchsorted(MARKET_CAP_BUCKETS, market_cap)] = 1
+        sector_columns = {sector: i for i, sector in enumerate(self._sectors)}
+        sectors = np.zeros((len(infos), len(self._sectors)))
+        for row, info in enumerate(infos):
+            column = sector_columns.get(info.get("sector") or "Unknown")
+            if column is not None:
+                sectors[row, column] = 1
+        return _unit_rows(np.concatenate([numeric, buckets, sectors], axis=1))
+
+    def _closes_window(self, history):
+        close = history["Close"].dropna().to_numpy(dtype=np.float64)[-(self.window + 1):]
+        if len(close) < self.window + 1:
+            close = np.concatenate([np.full(self.window + 1 - len(close), close[0] if len(close) else 1.0), close])
+        return close
+
+    def _combine(self, closes, fundamentals):
+        vectors = np.concatenate([
+            _return_parts(closes) * np.sqrt(self.return_weight),
+            fundamentals * np.sqrt(1 - self.return_weight),
+        ], axis=1)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _refresh_vectors(self):
+        self._vectors = self._combine(self._closes, self._fundamentals)
+
+    # Approximate index
+
+    def _train(self, initial=None):
+        n = len(self.symbols)
+        clusters = min(self.clusters or max(int(np.sqrt(n)), 1), n)
+        if n == 0:
+            self._centroids, self._assignments, self._trained_assignments = None, None, None
+            return
+        rng = np.random.default_rng(self.seed)
+        if initial is None or len(initial) != clusters:
+            initial = None
+            centroids = self._vectors[rng.choice(n, clusters, replace=False)].copy()
+        else:
+            centroids = initial
+        # Retraining starts from the current centroids, which are close already.
+        for _ in range(KMEANS_REFINE_ITERATIONS if initial is not None else KMEANS_ITERATIONS):
+            assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=clusters)
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums[~empty] = np.add.reduceat(self._vectors[order], starts[~empty], axis=0)
+            sums[empty] = self._vectors[rng.choice(n, int(empty.sum()))]
+            centroids = _unit_rows(sums).astype(np.float32)
+        self._centroids = centroids
+        self._trained_assignments = None
+        self._assign()
+
+    def _assign(self):
+        assignments = np.argmax(self._vectors @ self._centroids.T, axis=1)
+        trained = self._trained_assignments
+        if trained is None:
+            self._trained_assignments = assignments
+        elif len(assignments) > len(trained):
+            # Added tickers count as moved.
+            self._moved = len(assignments) - len(trained) + int(np.count_nonzero(assignments[:len(trained)] != trained))
+        else:
+            self._moved = int(np.count_nonzero(assignments != trained))
+        if trained is not None and self._moved > RETRAIN_FRACTION * len(self.symbols):
+            self._train(self._centroids)
+            return
+        self._assignments = assignments
+        order = np.argsort(assignments, kind="stable")
+        self._members = order
+        self._bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+
+    # Incremental updates
+
+    @timed("similarity.add_bars")
+    def add_bars(self, date, closes):
+        """
+        Append one day's closes and update every ticker's vector.
+
+        :param date: Date of the bar
+        :param closes: Dict of symbol -> close; tickers without a close keep the previous one
+        """
+        with self._lock:
+            previous = self._closes[:, -1]
+            latest = previous.copy()
+            for symbol, close in closes.items():
+                row = self._rows.get(symbol)
+                if row is not None and close is not None and np.isfinite(close):
+                    latest[row] = close
+            self._closes = np.concatenate([self._closes[:, 1:], latest[:, None]], axis=1)
+            self.last_date = pd.Timestamp(date)
+            self._refresh_vectors()
+            if self._centroids is not None:
+                self._assign()
+
+    def add(self, symbol, history, info):
+        """
+        Add a ticker to the index, or replace it.
+
+        :param symbol: Ticker symbol
+        :param history: History DataFrame with a Close column
+        :param info: Info dict
+        """
+        with self._lock:
+            close = self._closes_window(history)
+            if symbol not in self._rows:
+                self._rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                self._closes = np.concatenate([self._closes, close[None, :]])
+            else:
+                self._closes[self._rows[symbol]] = close
+            self.infos[symbol] = dict(info or {})
+            # The z-scores and sector columns depend on the whole universe.
+            self._build_fundamentals()
+            self._refresh_vectors()
+            # A new sector adds a column, so the centroids no longer fit.
+            if self._centroids is None or self._centroids.shape[1] != self._vectors.shape[1]:
+                self._train()
+            else:
+                self._assign()
+
+    def update(self, histories):
+        """
+        Append the bars in `histories` newer than the index's last date, one add_bars() per day.
+
+        :param histories: Dict of symbol -> recent history DataFrame with a Close column
+        :return: Number of days appended
+        """
+        closes = pd.DataFrame({symbol: history["Close"] for symbol, history in histories.items()
+                               if history is not None and len(history)})
+        if closes.empty:
+            return 0
+        if getattr(closes.index, "tz", None) is not None:
+            closes.index = closes.index.tz_localize(None)
+        if self.last_date is not None:
+            closes = closes[closes.index > self.last_date]
+        for date, row in closes.sort_index().iterrows():
+            self.add_bars(date, row.dropna().to_dict())
+        return len(closes)
+
+    # Queries
+
+    def most_similar(self, symbol, k=10, mode="exact", nprobe=4):
+        """
+        The k tickers most similar to `symbol`.
+
+        :param symbol: Ticker in the index
+        :param k: Number of results
+        :param mode: "exact" or "approximate"
+        :param nprobe: Clusters searched in approximate mode
+        :return: List of (symbol, similarity) pairs, most similar first
+        """
+        with self._lock:
+            row = self._rows[symbol]
+            return self._search(self._vectors[row], k, mode, nprobe, exclude=row)
+
+    def most_similar_to(self, history, info, k=10, mode="exact", nprobe=4):
+        """
+        The k tickers most similar to a ticker outside the index, without adding it.
+
+        :param history: History DataFrame with a Close column
+        :param info: Info dict
+        :param k: Number of results
+        :param mode: "exact" or "approximate"
+        :param nprobe: Clusters searched in approximate mode
+        :return: List of (symbol, similarity) pairs, most similar first
+        """
+        with self._lock:
+            query = self._combine(self._closes_window(history)[None, :], self._encode_fundamentals([dict(info or {})]))
+            return self._search(query[0], k, mode, nprobe)
+
+    def _search(self, query, k, mode, nprobe, exclude=None):
+        if mode == "exact":
+            scores = self._vectors @ query
+            top = _top_k(scores, k, exclude=exclude)
+            return [(self.symbols[i], float(scores[i])) for i in top]
+        if mode != "approximate":
+            raise ValueError(f"Unknown mode {mode!r}; expected 'exact' or 'approximate'")
+        probes = np.argsort(-(self._centroids @ query))[:nprobe]
+        candidates = np.concatenate([self._members[self._bounds[c]:self._bounds[c + 1]] for c in probes])
+        scores = self._vectors[candidates] @ query
+        self_position = np.flatnonzero(candidates == exclude) if exclude is not None else []
+        top = _top_k(scores, k, exclude=self_position if len(self_position) else None)
+        return [(self.symbols[candidates[i]], float(scores[i])) for i in top]
+
+    def most_similar_all(self, k=10, block_size=1024):
+        """
+        The k most similar tickers for every ticker, by blocked exact matrix products.
+
+        :param k: Number of results per ticker
+        :param block_size: Rows per block; bounds memory to block_size x tickers scores
+        :return: Array of shape (tickers, k) of row indices into self.symbols
+        """
+        with self._lock:
+            n = len(self.symbols)
+            k = min(k, n - 1)
+            result = np.empty((n, k), dtype=int)
+            for start in range(0, n, block_size):
+                block = self._vectors[start:start + block_size] @ self._vectors.T
+                rows = np.arange(start, min(start + block_size, n))
+                block[rows - start, rows] = -np.inf
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(block, top, axis=1), axis=1, kind="stable")
+                result[start:start + len(rows)] = np.take_along_axis(top, order, axis=1)
+            return result
+
+
+def default_universe():
+    """Stocks the similarity search compares against: the ingestion universe without indices."""
+    from ingest_worker import universe
+    return [symbol for symbol in universe() if not symbol.startswith("^")]
+
+
+@timed("similarity.build_universe")
+def build_similarity_index(symbols=None, period="1y"):
+    """
+    Fetch a universe in one batched history request and build its index.
+
+    :param symbols: Ticker symbols, or None for default_universe()
+    :param period: yfinance period of history to fetch
+    :return: SimilarityIndex
+    """
+    symbols = list(dict.fromkeys(symbols or default_universe()))
+    histories = market_data.histories(symbols, period)
+    infos = {}
+    for symbol in histories:
+        try:
+            infos[symbol] = market_data.ticker(symbol).info
+        except Exception as e:
+            print(f"Error fetching info for {symbol}: {e}")
+    return SimilarityIndex().build(histories, infos)
+
+
+REFRESH_SECONDS = 3600
+
+_index = None
+_index_checked_at = 0.0
+_index_refreshing = False
+_index_lock = threading.Lock()
+
+
+def _refresh_index():
+    global _index, _index_checked_at, _index_refreshing
+    index = _index
+    try:
+        if index is None or not index.symbols:
+            index = build_similarity_index()
+        else:
+            index.update(market_data.histories(index.symbols, "5d"))
+    except Exception as e:
+        # Keep serving the previous index and retry after REFRESH_SECONDS.
+        print(f"Error refreshing similarity index: {e}")
+    with _index_lock:
+        _index = index
+        _index_checked_at = time.time()
+        _index_refreshing = False
+
+
+def get_similarity_index(wait=False):
+    """
+    The process-wide index. It is built on first use and brought up to date
+    with the latest bars at most every REFRESH_SECONDS, in a background
+    thread, so no session waits for the universe to be fetched.
+
+    :param wait: Block until a build or refresh started by this call finishes
+    :return: SimilarityIndex, or None while the first build is running
+    """
+    global _index_refreshing
+    thread = None
+    with _index_lock:
+        if not _index_refreshing and time.time() - _index_checked_at > REFRESH_SECONDS:
+            _index_refreshing = True
+            thread = threading.Thread(target=_refresh_index, name="similarity-index", daemon=True)
+            thread.start()
+    if wait and thread is not None:
+        thread.join()
+    return _index
+
+
+def similar_stocks(symbol, k=10):
+    """
+    The k stocks in the universe most similar to `symbol`.
+
+    :param symbol: Ticker symbol; looked up, but not added to the index, if missing
+    :param k: Number of results
+    :return: DataFrame with Symbol, Sector and Similarity columns, most similar
+             first (empty if the stock has no data), or None while the index is
+             being built
+    """
+    empty = pd.DataFrame(columns=["Symbol", "Sector", "Similarity"])
+    index = get_similarity_index()
+    if index is None:
+        return None
+    if symbol in index:
+        matches = index.most_similar(symbol, k)
+    else:
+        # Off-universe lookups are answered against the index without joining
+        # it, so searching arbitrary tickers does not grow it.
+        try:
+            stock = market_data.ticker(symbol)
+            history = stock.history(period="1y")
+            if len(history) <= 1:
+                return empty
+            matches = index.most_similar_to(history, stock.info, k)
+        except Exception as e:
+            print(f"Error looking up {symbol} for similar stocks: {e}")
+            return empty
+    return pd.DataFrame({
+        "Symbol": [match for match, _ in matches],
+        "Sector": [index.infos[match].get("sector", "Unknown") for match, _ in matches],
+        "Similarity": [score for _, score in matches],
+    })
+
+
+def _synthetic_universe(num_tickers, window=DEFAULT_WINDOW, seed=0):
+    """Tickers whose returns follow a sector factor model, with matching fundamentals."""
+    rng = np.random.default_rng(seed)
+    sectors = market_data.FAKE_SECTORS
+    sector_of = rng.integers(len(sectors), size=num_tickers)
+    days = window + 40
+    market = rng.normal(0, 0.01, days)
+    sector_factors = rng.normal(0, 0.012, (len(sectors), days))
+    loadings = rng.uniform(0.5, 1.5, num_tickers)[:, None]
+    returns = loadings * market + sector_factors[sector_of] + rng.normal(0, 0.015, (num_tickers, days))
+    closes = rng.uniform(10, 500, num_tickers)[:, None] * np.exp(np.cumsum(returns, axis=1))
+    index = pd.bdate_range(end="2026-01-02", periods=days, name="Date")
+    symbols = [f"T{i:05d}" for i in range(num_tickers)]
+    histories = {symbol: pd.DataFrame({"Close": closes[i]}, index=index) for i, symbol in enumerate(symbols)}
+    infos = {symbol: {
+        "trailingPE": float(rng.lognormal(3, 0.5)),
+        "dividendYield": float(rng.choice([0.0, rng.uniform(0.002, 0.05)])),
+        "marketCap": float(rng.lognormal(22, 2)),
+        "sector": sectors[sector_of[i]],
+    } for i, symbol in enumerate(symbols)}
+    return histories, infos, rng.normal(0, 0.02, num_tickers)
+
+
+def benchmark_similarity(universe_sizes=(5000, 50000), queries=500, k=10):
+    """
+    Compare exact and approximate queries: latency, recall against exact, build
+    and incremental update times.
+
+    :param universe_sizes: Numbers of tickers
+    :param queries: Queries per measurement
+    :param k: Results per query
+    """
+    for size in universe_sizes:
+        histories, infos, next_returns = _synthetic_universe(size)
+        start_time = time.perf_counter()
+        index = SimilarityIndex().build(histories, infos)
+        build_seconds = time.perf_counter() - start_time
+        print(f"{size} tickers: build {build_seconds:.2f} s, {len(index._centroids)} clusters, "
+              f"{index._vectors.shape[1]} dimensions")
+
+        rng = np.random.default_rng(1)
+        query_symbols = [index.symbols[i] for i in rng.integers(size, size=queries)]
+        exact = {}
+        latencies = []
+        for symbol in query_symbols:
+            start_time = time.perf_counter()
+            exact[symbol] = {s for s, _ in index.most_similar(symbol, k)}
+            latencies.append(time.perf_counter() - start_time)
+        print(f"  exact              p50 {np.median(latencies) * 1000:6.3f} ms  p99 {np.percentile(latencies, 99) * 1000:6.3f} ms")
+        for nprobe in (1, 4, 8):
+            latencies = []
+            hits = 0
+            for symbol in query_symbols:
+                start_time = time.perf_counter()
+                found = index.most_similar(symbol, k, mode="approximate", nprobe=nprobe)
+                latencies.append(time.perf_counter() - start_time)
+                hits += len(exact[symbol] & {s for s, _ in found})
+            print(f"  approximate np={nprobe:<2} p50 {np.median(latencies) * 1000:6.3f} ms  "
+                  f"p99 {np.percentile(latencies, 99) * 1000:6.3f} ms  recall@{k} {hits / (k * queries):.2f}")
+
+        if size <= 10000:
+            start_time = time.perf_counter()
+            index.most_similar_all(k)
+            print(f"  all tickers, blocked exact: {time.perf_counter() - start_time:.2f} s")
+
+        last_closes = index._closes[:, -1] * np.exp(next_returns)
+        start_time = time.perf_counter()
+        index.add_bars(index.last_date + pd.offsets.BDay(1), dict(zip(index.symbols, last_closes)))
+        print(f"  new bar for every ticker: incremental update {(time.perf_counter() - start_time) * 1000:.1f} ms "
+              f"vs full rebuild {build_seconds * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("Benchmarking similar-stock search...")
+    benchmark_similarity()
@@ -0,0 +1,127 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Startup benchmark: how long it takes to import the app and to produce the
+# first paint of the login page in a fresh process.
+#
+#     python startup_benchmark.py
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Modules the login page no longer imports; they load when a tab needs them.
+DEFERRED_MODULES = ["stock_analysis", "charts", "notifications", "alerts", "economic_trends", "similarity", "market_overview", "watchlist_dashboard"]
+
+FIRST_PAINT_SCRIPT = """
+import time
+start_time = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({main!r}, default_timeout=60)
+at.run()
+assert not at.exception, at.exception
+print(f"FIRST_PAINT {{(time.perf_counter() - start_time) * 1000:.1f}}")
+"""
+
+
+def _run_python(args, env=None):
+    return subprocess.run([sys.executable] + args, cwd=APP_DIR, capture_output=True, text=True, env=env)
+
+
+def import_times(statement):
+    """
+    Run `statement` in a fresh interpreter with -X importtime.
+
+    :param statement: Python statement to execute, e.g. "import main"
+    :return: List of (module, self_us, cumulative_us, depth) in import order
+    """
+    result = _run_python(["-X", "importtime", "-c", statement])
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def print_import_breakdown(statement, top=8, repeats=3):
+    """
+    Print the import time of `statement` broken down by the modules it imports.
+
+    Each module imported by the statement is listed with its cumulative time,
+    followed by its most expensive direct imports. Interpreter startup
+    imports (site, encodings, ...) are excluded from the total.
+
+    :param statement: Python statement of the form "import a, b; import c"
+    :param top: Number of direct imports to list per module
+    :param repeats: Number of fresh interpreters to run; the median run is reported
+    """
+    modules = [name.strip() for part in statement.split(";") for name in part.replace("import", "", 1).split(",")]
+    runs = []
+    for _ in range(repeats):
+        entries = import_times(statement)
+        total = sum(cumulative for module, _, cumulative, depth in entries if depth == 0 and module in modules)
+        runs.append((total, entries))
+    runs.sort(key=lambda run: run[0])
+    total, entries = runs[len(runs) // 2]
+
+    print(f"{statement}: {total / 1000:.1f} ms (median of {repeats})")
+    children = []
+    for module, _, cumulative, depth in entries:
+        if depth == 1:
+            children.append((module, cumulative))
+        elif depth == 0:
+            if module in modules:
+                print(f"  {cumulative / 1000:8.1f} ms  {module}")
+                for child, child_cumulative in sorted(children, key=lambda c: c[1], reverse=True)[:top]:
+                    print(f"  {child_cumulative / 1000:8.1f} ms    {child}")
+            children = []
+
+
+def first_paint_times(repeats=3):
+    """
+    Time a fresh process importing the app and rendering the login page once.
+
+    :param repeats: Number of fresh processes to run
+    :return: List of wall-clock times in milliseconds
+    """
+    script = FIRST_PAINT_SCRIPT.format(main=os.path.join(APP_DIR, "main.py"))
+    times = []
+    for _ in range(repeats):
+        result = _run_python(["-c", script])
+        match = re.search(r"FIRST_PAINT ([\d.]+)", result.stdout)
+        if not match:
+            raise RuntimeError(f"Login page failed to render:\n{result.stderr[-2000:]}")
+        times.append(float(match.group(1)))
+    return times
+
+
+def benchmark_startup(repeats=3):
+    """
+    Report import time of the login path, of the modules deferred until a tab
+    opens, of the original eager import set, and the first paint of the login page.
+
+    :param repeats: Number of fresh processes per measurement
+    """
+    print("Login path:")
+    print_import_breakdown("import main", repeats=repeats)
+    print("\nDeferred until the Stock Analysis or Economic Trends tab or notifications load:")
+    print_import_breakdown("import main; import " + ", ".join(DEFERRED_MODULES), repeats=repeats)
+    print("\nOriginal eager import set, for comparison:")
+    print_import_breakdown(
+        "import streamlit, pandas, yfinance, plotly.graph_objects, plotly.subplots, plotly.express, "
+        "streamlit_lottie, requests, ta, numpy",
+        repeats=repeats
+    )
+    times = first_paint_times(repeats)
+    print(f"\nLogin page first paint in a fresh process: median {statistics.median(times):.0f} ms "
+          f"(min {min(times):.0f} ms, max {max(times):.0f} ms)")
+
+
+if __name__ == "__main__":
+    print("Running startup benchmark...")
+    benchmark_startup()
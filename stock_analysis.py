@@ -1,11 +1,13 @@
-import yfinance as yf
+import market_data
 import pandas as pd
+from metrics import timed
 
-def get_stock_info(ticker):
+@timed("fetch.stock_info")
+def get_stock_info(ticker, period="6mo"):
     try:
-        stock = yf.Ticker(ticker)
+        stock = market_data.ticker(ticker)
         info = stock.info
-        history = stock.history(period="6mo")
+        history = stock.history(period=period)
         
         return {
             "longName": info.get("longName", "N/A"),
@@ -19,10 +21,11 @@ def get_stock_info(ticker):
         print(f"Error fetching stock info for {ticker}: {e}")
         return None
 
+@timed("fetch.compare_stocks")
 def compare_stocks(tickers):
     data = []
     for ticker in tickers:
-        stock = yf.Ticker(ticker)
+        stock = market_data.ticker(ticker)
         info = stock.info
         data.append({
             "Ticker": ticker,
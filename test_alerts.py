@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from alerts import AlertProgram, AlertRuleError, build_panel, parse_rule
+
+
+def make_panel(closes):
+    closes = np.asarray(closes, dtype=float)
+    return {
+        "open": closes,
+        "high": closes,
+        "low": closes,
+        "close": closes,
+        "volume": np.ones_like(closes),
+    }
+
+
+def test_parse_rule():
+    assert parse_rule("rsi(14) > 70") == (">", ("rsi", ("field", "close"), 14), ("const", 70.0))
+    assert parse_rule("close crosses above sma(close, 50)")[0] == "crosses_above"
+
+
+def test_invalid_rules():
+    for rule in ["close >", "foo > 1", "sma(close) > 1", "close + 1", "1 > 2", "(close > 1) * 2 > 1"]:
+        try:
+            AlertProgram([rule])
+        except AlertRuleError:
+            continue
+        raise AssertionError(f"Rule {rule!r} should have been rejected")
+
+
+def test_shared_subexpressions_are_deduplicated():
+    program = AlertProgram([
+        "close > sma(close, 50)",
+        "sma(close, 50) < close",
+        "close crosses above sma(close, 50)",
+    ])
+    assert [op for op, _, _ in program.nodes].count("sma") == 1
+    assert program.roots[0] == program.roots[1]
+
+
+def test_evaluate_matches_pandas():
+    rng = np.random.default_rng(1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(300, 4)), axis=0))
+    frame = pd.DataFrame(closes)
+    sma = frame.rolling(20).mean()
+    program = AlertProgram([
+        "close > sma(close, 20)",
+        "close crosses below sma(close, 20)",
+        "drawdown(close, 252) > 10",
+    ])
+    result = program.evaluate(make_panel(closes))
+
+    expected_above = (frame.iloc[-1] > sma.iloc[-1]).to_numpy()
+    expected_cross = ((frame.iloc[-1] < sma.iloc[-1]) & (frame.iloc[-2] >= sma.iloc[-2])).to_numpy()
+    expected_drawdown = ((1 - frame.iloc[-1] / frame.iloc[-252:].max()) * 100 > 10).to_numpy()
+    assert (result[0] == expected_above).all()
+    assert (result[1] == expected_cross).all()
+    assert (result[2] == expected_drawdown).all()
+
+
+def test_crosses_above():
+    closes = np.array([[10.0], [10.0], [9.0], [12.0]])
+    result = AlertProgram(["close crosses above 10", "close crosses above 8"]).evaluate(make_panel(closes))
+    assert result[:, 0].tolist() == [True, False]
+
+
+def test_insufficient_history_never_triggers():
+    closes = np.full((10, 2), 100.0)
+    result = AlertProgram(["close > sma(close, 50) - 1", "rsi(14) < 101"]).evaluate(make_panel(closes))
+    assert not result.any()
+    # 'not' and '!=' of an undecided comparison stay false
+    result = AlertProgram([
+        "not (rsi(14) > 70)",
+        "not (close > sma(close, 50) or rsi(14) > 70)",
+        "not close crosses above sma(close, 50)",
+        "close != sma(close, 50)",
+    ]).evaluate(make_panel(closes))
+    assert not result.any()
+    # One decided side settles and/or
+    result = AlertProgram([
+        "not (close < 50 and rsi(14) > 70)",
+        "close > 50 or rsi(14) > 70",
+        "not (close > 50 or rsi(14) > 70)",
+    ]).evaluate(make_panel(closes))
+    assert result[:, 0].tolist() == [True, True, False]
+    # With enough history 'not' behaves as before
+    falling = np.repeat(np.linspace(120.0, 100.0, 20)[:, None], 2, axis=1)
+    result = AlertProgram(["not (rsi(14) > 70)"]).evaluate(make_panel(falling))
+    assert result.all()
+
+
+def test_build_panel_aligns_tickers():
+    index = pd.date_range("2024-01-01", periods=3)
+    histories = {
+        "AAPL": pd.DataFrame({"Close": [1.0, 2.0, 3.0], "Volume": [10, 20, 30]}, index=index),
+        "MSFT": pd.DataFrame({"Close": [5.0, 6.0]}, index=index[1:]),
+    }
+    tickers, panel = build_panel(histories)
+    assert tickers == ["AAPL", "MSFT"]
+    assert panel["close"].shape == (3, 2)
+    assert np.isnan(panel["close"][0, 1])
+    assert np.isnan(panel["volume"][:, 1]).all()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import charts
+from charts import lttb, minmax_downsample, downsample_ohlc, get_price_figure, _synthetic_history
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(10000)
+    y = np.sin(np.linspace(0, 20, 10000))
+    y[4321] = 5.0
+    keep = lttb(x, y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == 9999
+    assert (np.diff(keep) > 0).all()
+    assert 4321 in keep
+
+
+def test_minmax_keeps_global_extremes():
+    y = np.random.default_rng(0).normal(size=5000)
+    keep = minmax_downsample(y, 100)
+    assert len(keep) <= 202
+    assert y[keep].max() == y.max() and y[keep].min() == y.min()
+
+
+def test_downsample_ohlc_preserves_range_and_volume():
+    history = _synthetic_history(1000, "B")
+    bars = downsample_ohlc(history, 100)
+    assert len(bars) == 100
+    assert bars["High"].max() == history["High"].max()
+    assert bars["Low"].min() == history["Low"].min()
+    assert bars["Volume"].sum() == history["Volume"].sum()
+    assert bars["Open"].iloc[0] == history["Open"].iloc[0]
+    assert bars["Close"].iloc[-1] == history["Close"].iloc[-1]
+
+
+def test_figure_cache_reuses_unchanged_figures():
+    history = _synthetic_history(2000, "B")
+    fig = get_price_figure("TEST", history, "5y", dark_mode=False)
+    assert get_price_figure("TEST", history, "5y", dark_mode=False) is fig
+    assert get_price_figure("TEST", history, "5y", dark_mode=True) is not fig
+    assert get_price_figure("TEST", history.iloc[:-1], "5y", dark_mode=False) is not fig
+    assert len(fig.data[0].x) <= 700
+
+
+def test_figure_cache_is_safe_across_sessions():
+    class YieldingCache(OrderedDict):
+        # Yield between the lookup and the LRU update, where another session can evict the key.
+        def get(self, key, default=None):
+            value = super().get(key, default)
+            time.sleep(0)
+            return value
+
+    history = _synthetic_history(50, "B")
+    original_build, original_size, original_cache = charts.build_price_figure, charts.FIGURE_CACHE_SIZE, charts._figure_cache
+    charts.build_price_figure = lambda *args: object()
+    charts.FIGURE_CACHE_SIZE = 2
+    charts._figure_cache = YieldingCache()
+    errors = []
+
+    def session(seed):
+        try:
+            for i in range(500):
+                get_price_figure(f"T{(seed + i) % 5}", history)
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=session, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        charts.build_price_figure, charts.FIGURE_CACHE_SIZE = original_build, original_size
+        charts._figure_cache = original_cache
+    assert errors == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name} passed")
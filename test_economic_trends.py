@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from economic_trends import MacroStore, STATIC_TRENDS, get_economic_trends, parse_observations
+
+
+def _write_drops(directory):
+    months = pd.date_range("2020-01-01", periods=24, freq="MS")
+    pd.DataFrame({"observation_date": months.strftime("%Y-%m-%d"), "CPIAUCSL": 100 + np.arange(24.0)}).to_csv(
+        os.path.join(directory, "CPIAUCSL.csv"), index=False)
+    days = pd.bdate_range("2024-01-01", periods=5)
+    with open(os.path.join(directory, "DGS10.json"), "w") as f:
+        json.dump({"observations": [{"date": f"{day:%Y-%m-%d}", "value": "." if i == 2 else str(4 + i / 10)}
+                                    for i, day in enumerate(days)]}, f)
+    with open(os.path.join(directory, "DGS2.csv"), "w") as f:
+        f.write("DATE,DGS2\n" + "".join(f"{day:%Y-%m-%d},{4.5 - i / 10}\n" for i, day in enumerate(days)))
+
+
+def test_parse_observations_drops_missing_values():
+    dates, values = parse_observations("DATE,UNRATE\n2024-02-01,3.9\n2024-01-01,3.7\n2024-03-01,.\n")
+    assert list(dates.astype(str)) == ["2024-01-01", "2024-02-01"]
+    assert list(values) == [3.7, 3.9]
+
+
+def test_views_recompute_only_on_new_observations():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MacroStore(tmp, cache_dir=os.path.join(tmp, "cache"))
+        assert get_economic_trends(store) == STATIC_TRENDS
+        _write_drops(tmp)
+        assert sorted(store.refresh(force=True)) == ["CPIAUCSL", "DGS10", "DGS2"]
+
+        inflation = store.view("inflation")
+        assert len(inflation) == 12
+        assert np.isclose(inflation.iloc[-1], (123 / 111 - 1) * 100)
+        spread = store.view("yield_curve_spread")
+        assert np.allclose(spread.to_numpy(), [-0.5, -0.3, 0.1, 0.3])
+        assert store.view("unemployment") is None
+
+        # Unchanged drops and repeated observations do not invalidate views
+        assert store.refresh(force=True) == []
+        assert not store.ingest("DGS2", ["2024-01-01"], [4.5])
+        assert store.view("inflation") is inflation and store.view("yield_curve_spread") is spread
+
+        # A new observation recomputes only the views that depend on it
+        assert store.ingest("DGS2", ["2024-01-08"], [4.0])
+        assert store.view("inflation") is inflation
+        assert store.view("yield_curve_spread") is not spread
+        # A revision replaces the earlier value
+        assert store.ingest("CPIAUCSL", ["2021-12-01"], [130.0])
+        assert np.isclose(store.view("inflation").iloc[-1], (130 / 111 - 1) * 100)
+
+        # Reopening reads the columnar cache instead of reparsing the drops
+        reopened = MacroStore(tmp, cache_dir=os.path.join(tmp, "cache"))
+        assert reopened.refresh(force=True) == []
+        assert len(reopened.series("DGS10")) == 4
+
+        summary = get_economic_trends(store)
+        assert "Inflation (CPI, year over year)" in summary and "Yield Curve Spread" in summary
+
+
+def test_fetch_runs_in_the_background():
+    release = threading.Event()
+
+    def slow_fetcher(series_id):
+        release.wait(5)
+        if series_id == "UNRATE":
+            raise RuntimeError("503 Service Unavailable")
+        return "DATE,VALUE\n2024-01-01,3.7\n2024-02-01,3.9\n"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MacroStore(tmp, cache_dir=None, fetcher=slow_fetcher, series=("CPIAUCSL", "UNRATE", "DGS10"))
+        # The fetch does not block refresh or readers, and only one runs at a time
+        assert store.refresh(force=True) == [] and store.fetching
+        thread = store._fetch_thread
+        assert store.refresh(force=True) == [] and store._fetch_thread is thread
+        assert store.view("unemployment") is None and get_economic_trends(store) == STATIC_TRENDS
+        release.set()
+        thread.join()
+        # The fetch stops at the first failure and keeps what it got
+        assert not store.fetching and list(store.versions) == ["CPIAUCSL"]
+        assert store._fetch_failed_at > 0
+        assert store.refresh(force=True, wait=True) == []
+
+
+if __name__ == "__main__":
+    for test in (test_parse_observations_drops_missing_values, test_views_recompute_only_on_new_observations,
+                 test_fetch_runs_in_the_background):
+        test()
+        print(f"{test.__name__} passed")
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import market_data
+from fake_upstream import CountingProvider
+from ingest_worker import IngestWorker, universe
+from market_overview import load_universe
+
+
+def test_worker_publishes_versioned_snapshots():
+    fake = market_data.FakeMarketDataProvider()
+    with tempfile.TemporaryDirectory() as directory:
+        upstream = CountingProvider()
+        worker = IngestWorker(directory, ["AAPL", "MSFT"], "1y", upstream)
+        reader = market_data.SharedSnapshotProvider(directory)
+        assert reader.snapshot is None
+        assert worker.refresh() == 1
+        assert upstream.fetches == 3  # one batched history request and one info per symbol
+
+        history = reader.ticker("AAPL").history(period="6mo")
+        expected = fake.history("AAPL", "6mo")[list(market_data.SNAPSHOT_FIELDS)]
+        pd.testing.assert_frame_equal(history, expected, check_dtype=False, check_freq=False)
+        assert np.shares_memory(history.to_numpy(), reader.snapshot.ohlcv)
+        assert reader.info("MSFT") == fake.info("MSFT")
+
+        # Fundamentals are not refetched before info_refresh; prices are
+        worker.symbols = ["AAPL", "MSFT", "GOOGL"]
+        assert worker.refresh() == 2
+        assert upstream.fetches == 5
+        assert sorted(reader.histories(["AAPL", "GOOGL"], "1mo")) == ["AAPL", "GOOGL"]
+        assert reader.snapshot.version == 2
+        # Frames from an older version stay readable
+        assert history["Close"].iloc[-1] == expected["Close"].iloc[-1]
+
+        for _ in range(3):
+            worker.refresh()
+        assert sorted(os.listdir(directory)) == ["CURRENT", "v0000003", "v0000004", "v0000005"]
+
+        try:
+            reader.history("AAPL", "5y")
+            assert False, "expected MissingRecordingError"
+        except market_data.MissingRecordingError:
+            pass
+        with_fallback = market_data.SharedSnapshotProvider(directory, fallback=fake)
+        assert len(with_fallback.history("AAPL", "5y")) == len(fake.history("AAPL", "5y"))
+        assert "NVDA" in with_fallback.histories(["AAPL", "NVDA"], "1mo")
+
+
+def test_overview_universe_is_fetched_for_prices_only():
+    with tempfile.TemporaryDirectory() as directory:
+        upstream = CountingProvider()
+        IngestWorker(directory, None, "1mo", upstream).refresh()
+        # One batched history request, and fundamentals only for the default symbols and watchlists
+        assert upstream.fetches == 1 + len(universe())
+        reader = market_data.SharedSnapshotProvider(directory)
+        overview_symbols = list(load_universe().index)
+        assert sorted(reader.histories(overview_symbols, "1mo")) == sorted(overview_symbols)
+        assert set(reader.snapshot.infos) == set(universe())
+
+
+def test_snapshot_alignment_with_gaps():
+    index = pd.date_range("2024-01-01", periods=5, freq="D", name="Date", unit="ns")
+    full = pd.DataFrame({field: np.arange(5.0) for field in market_data.SNAPSHOT_FIELDS}, index=index)
+    sparse = full.iloc[[0, 2, 4]] * 10
+    with tempfile.TemporaryDirectory() as directory:
+        market_data.publish_snapshot(directory, {"FULL": full, "SPARSE": sparse}, {}, "5d")
+        reader = market_data.SharedSnapshotProvider(directory)
+        pd.testing.assert_frame_equal(reader.history("FULL", "5d"), full, check_freq=False)
+        pd.testing.assert_frame_equal(reader.history("SPARSE", "5d"), sparse, check_freq=False)
+        assert list(reader.history("SPARSE", "2d")["Close"]) == [20.0, 40.0]
+
+
+if __name__ == "__main__":
+    for test in (test_worker_publishes_versioned_snapshots, test_overview_universe_is_fetched_for_prices_only,
+                 test_snapshot_alignment_with_gaps):
+        test()
+        print(f"{test.__name__} passed")
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import pandas as pd
+import market_data
+
+
+def _record(path, symbols):
+    with market_data.recording(path, inner=market_data.FakeMarketDataProvider()):
+        for symbol in symbols:
+            market_data.ticker(symbol).info
+            market_data.ticker(symbol).history(period="1y")
+        market_data.histories(symbols, "1mo")
+
+
+def test_record_and_replay_roundtrip():
+    fake = market_data.FakeMarketDataProvider()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive.zip")
+        _record(path, ["AAPL", "MSFT"])
+        replay = market_data.ReplayProvider(path)
+
+        assert replay.ticker("AAPL").info == fake.info("AAPL")
+        pd.testing.assert_frame_equal(replay.ticker("MSFT").history(period="1y"), fake.history("MSFT", "1y"))
+        # Periods that were not recorded are trimmed from a longer recording
+        pd.testing.assert_frame_equal(replay.history("AAPL", "6mo"), fake.history("AAPL", "6mo"))
+        batch = replay.histories(["AAPL", "MSFT", "NOPE"], "1mo")
+        assert sorted(batch) == ["AAPL", "MSFT"]
+        pd.testing.assert_frame_equal(batch["AAPL"], fake.history("AAPL", "1mo"))
+
+        # Returned frames are copies
+        history = replay.history("AAPL", "1y")
+        history["Close"] = 0.0
+        assert replay.history("AAPL", "1y")["Close"].iloc[-1] > 0
+
+        for request in (lambda: replay.info("NOPE"), lambda: replay.history("AAPL", "5y")):
+            try:
+                request()
+                assert False, "expected MissingRecordingError"
+            except market_data.MissingRecordingError:
+                pass
+
+        # Recording again keeps the earlier recordings
+        _record(path, ["GOOGL"])
+        assert sorted(market_data.ReplayProvider(path).infos) == ["AAPL", "GOOGL", "MSFT"]
+
+
+def test_replay_simulated_errors_and_latency():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive.zip")
+        _record(path, ["AAPL"])
+        failing = market_data.ReplayProvider(path, error_rate=1.0)
+        try:
+            failing.history("AAPL", "1mo")
+            assert False, "expected SimulatedUpstreamError"
+        except market_data.SimulatedUpstreamError:
+            pass
+
+        flaky = [market_data.ReplayProvider(path, error_rate=0.5, seed=1) for _ in range(2)]
+        outcomes = []
+        for provider in flaky:
+            results = []
+            for _ in range(20):
+                try:
+                    provider.info("AAPL")
+                    results.append(True)
+                except market_data.SimulatedUpstreamError:
+                    results.append(False)
+            outcomes.append(results)
+        assert outcomes[0] == outcomes[1] and 0 < sum(outcomes[0]) < 20
+
+        slow = market_data.ReplayProvider(path, latency=0.02)
+        start_time = pd.Timestamp.now()
+        slow.info("AAPL")
+        assert (pd.Timestamp.now() - start_time).total_seconds() >= 0.02
+
+
+def test_counting_provider_keeps_nothing_in_process():
+    from fake_upstream import CountingProvider
+    upstream = CountingProvider(seed=7)
+    cached = market_data._fake_history.cache_info().currsize
+    history = upstream.history("UNCACHED", "1y")
+    upstream.histories(["UNCACHED", "OTHER"], "1mo")
+    assert upstream.fetches == 2
+    assert market_data._fake_history.cache_info().currsize == cached
+    pd.testing.assert_frame_equal(history, market_data.FakeMarketDataProvider(seed=7).history("UNCACHED", "1y"))
+
+
+if __name__ == "__main__":
+    for test in (test_record_and_replay_roundtrip, test_replay_simulated_errors_and_latency,
+                 test_counting_provider_keeps_nothing_in_process):
+        test()
+        print(f"{test.__name__} passed")
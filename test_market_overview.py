@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import market_data
+import market_overview
+from market_overview import HORIZONS, compute_overview, load_universe, reference_rows
+
+
+def _histories(symbols, dates):
+    rng = np.random.default_rng(0)
+    return {symbol: pd.DataFrame({"Close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))}, index=dates)
+            for symbol in symbols}
+
+
+def test_grouped_returns_match_per_stock_returns():
+    dates = pd.bdate_range("2025-11-03", "2026-03-13", name="Date")
+    universe = pd.DataFrame({
+        "sector": ["Technology", "Technology", "Energy", "Energy"],
+        "industry": ["Semiconductors", "Software", "Oil & Gas", "Oil & Gas"],
+    }, index=pd.Index(["AAA", "BBB", "CCC", "DDD"], name="symbol"))
+    histories = _histories(["AAA", "BBB", "CCC", "DDD", "^GSPC"], dates)
+    # A stock with gaps and one that only listed this month
+    histories["DDD"] = histories["DDD"].drop(dates[-3:-1])
+    histories["BBB"] = histories["BBB"].iloc[-5:]
+
+    rows = reference_rows(dates)
+    assert dates[rows["1W"]] == pd.Timestamp("2026-03-06")
+    assert dates[rows["1M"]] == pd.Timestamp("2026-02-13")
+    assert dates[rows["YTD"]] == pd.Timestamp("2025-12-31")
+
+    overview = compute_overview(histories, universe)
+    assert overview["as_of"] == dates[-1]
+    expected = {}
+    for symbol in universe.index:
+        close = histories[symbol]["Close"].reindex(dates).ffill()
+        expected[symbol] = [(close.iloc[-1] / close.iloc[rows[horizon]] - 1) * 100 for horizon in HORIZONS]
+    expected = pd.DataFrame.from_dict(expected, orient="index", columns=HORIZONS)
+    assert np.allclose(overview["stocks"][HORIZONS], expected, equal_nan=True)
+
+    sectors = overview["sectors"]
+    assert np.allclose(sectors.loc["Energy", HORIZONS], expected.loc[["CCC", "DDD"]].mean())
+    # BBB has no YTD return, so Technology's YTD is AAA's alone
+    assert np.isclose(sectors.loc["Technology", "YTD"], expected.loc["AAA", "YTD"])
+    assert sectors.loc["Technology", "Stocks"] == 2
+    assert overview["industries"].loc[("Energy", "Oil & Gas"), "Stocks"] == 2
+    assert list(overview["indices"].index) == ["S&P 500"]
+
+
+def test_overview_is_shared_and_refreshed_once_per_interval():
+    previous = market_data.set_provider(market_data.FakeMarketDataProvider())
+    calls = []
+    original_histories = market_data.histories
+
+    def counting_histories(symbols, period="1y"):
+        calls.append(len(symbols))
+        return original_histories(symbols, period)
+
+    market_data.histories = counting_histories
+    market_overview._overview, market_overview._computed_at = None, 0.0
+    try:
+        version, overview = market_overview.get_market_overview()
+        assert market_overview.get_market_overview() == (version, overview)
+        # One batched request for the whole universe and the indices
+        assert calls == [len(load_universe()) + len(market_overview.INDICES)]
+        assert set(overview["sectors"].index) == set(load_universe()["sector"])
+        assert len(overview["indices"]) == 3
+
+        market_overview._computed_at -= market_overview.REFRESH_SECONDS
+        assert market_overview.get_market_overview()[0] == version + 1
+        assert len(calls) == 2
+        figure = market_overview.get_heatmap_figure(version + 1, market_overview._overview, "industries")
+        assert market_overview.get_heatmap_figure(version + 1, market_overview._overview, "industries") is figure
+    finally:
+        market_data.histories = original_histories
+        market_data.set_provider(previous)
+        market_overview._overview, market_overview._computed_at = None, 0.0
+
+
+if __name__ == "__main__":
+    for test in (test_grouped_returns_match_per_stock_returns, test_overview_is_shared_and_refreshed_once_per_interval):
+        test()
+        print(f"{test.__name__} passed")
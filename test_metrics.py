@@ -0,0 +1,54 @@
+import metrics
+
+
+def test_disabled_records_nothing():
+    metrics.disable()
+    metrics.reset()
+
+    @metrics.timed("test.disabled")
+    def work():
+        return 42
+
+    assert work() == 42
+    with metrics.timed("test.disabled_block"):
+        pass
+    metrics.increment("test.event")
+    assert metrics.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_histograms_counters_and_exports():
+    metrics.reset()
+    metrics.enable()
+    try:
+        for seconds in (0.002, 0.002, 0.02, 3.0):
+            metrics.observe("test.stage", seconds)
+        try:
+            with metrics.timed("test.failing"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        metrics.increment("test.event", 2)
+
+        data = metrics.snapshot()
+        stage = data['stages']['test.stage']
+        assert stage['count'] == 4
+        assert stage['max_ms'] == 3000.0
+        assert 1.0 <= stage['p50_ms'] <= 2.5
+        assert data['counters'] == {'test.event': 2, 'test.failing.errors': 1}
+
+        prometheus = metrics.export_prometheus()
+        assert 'investsmartly_stage_duration_seconds_bucket{stage="test.stage",le="0.0025"} 2' in prometheus
+        assert 'investsmartly_stage_duration_seconds_bucket{stage="test.stage",le="+Inf"} 4' in prometheus
+        assert 'investsmartly_stage_duration_seconds_count{stage="test.stage"} 4' in prometheus
+        assert 'investsmartly_events_total{event="test.event"} 2' in prometheus
+        assert len(metrics.export_json_lines().splitlines()) == 4
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name} passed")
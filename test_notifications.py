@@ -1,7 +1,37 @@
+import os
+import tempfile
 import streamlit as st
-from notifications import generate_notifications, mark_notification_as_read, get_notification_history, stress_test_notifications, test_no_notifications
+from datetime import datetime, timedelta
+import market_data
+from notifications import generate_notifications, mark_notification_as_read, get_notification_history, stress_test_notifications, test_no_notifications, NotificationInbox
+import user_accounts
 from user_accounts import get_user_preferences, update_user_preferences
 
+_archive_dir = None
+_previous_provider = None
+_previous_user_store = None
+
+
+def setup_module():
+    """Replay recorded market data and use a throwaway user store, so the tests do not depend on the live market."""
+    global _archive_dir, _previous_provider, _previous_user_store
+    _archive_dir = tempfile.TemporaryDirectory()
+    _previous_user_store = user_accounts.USER_DATA_FILE
+    user_accounts.use_user_store(os.path.join(_archive_dir.name, "users.json"))
+    user_accounts.create_user("test_user", "test-password")
+    path = os.path.join(_archive_dir.name, "archive.zip")
+    with market_data.recording(path, inner=market_data.FakeMarketDataProvider()):
+        for symbol in ["AAPL", "GOOGL", "MSFT", "^GSPC", "^DJI", "^IXIC"]:
+            market_data.ticker(symbol).history(period="1y")
+    _previous_provider = market_data.set_provider(market_data.ReplayProvider(path))
+
+
+def teardown_module():
+    market_data.set_provider(_previous_provider)
+    user_accounts.use_user_store(_previous_user_store)
+    _archive_dir.cleanup()
+
+
 def test_notification_system():
     print("Starting notification system tests...")
 
@@ -64,5 +94,50 @@ def test_notification_system():
 
     print("\nNotification system tests completed.")
 
+def test_notification_inbox():
+    inbox = NotificationInbox()
+    # AAPL moves on three days, MSFT on one
+    for i, (change, days_ago) in enumerate([(5.1, 3), (-6.2, 2), (5.3, 2), (6.5, 0)]):
+        ticker = "AAPL" if i != 1 else "MSFT"
+        inbox.add({
+            'type': 'price_change',
+            'ticker': ticker,
+            'change': change,
+            'message': f"{ticker} move {i}",
+            'timestamp': datetime.now() - timedelta(days=days_ago),
+            'read': False
+        })
+    # Refetching today's move updates it instead of adding another
+    assert inbox.add({'type': 'price_change', 'ticker': 'AAPL', 'change': 7.0, 'message': "AAPL move 3",
+                      'timestamp': datetime.now(), 'read': False}) is None
+    assert [n['id'] for n in inbox.notifications] == [0, 1, 2, 3]
+    assert inbox.notifications[3]['change'] == 7.0 and inbox.notifications[3]['message'] == "AAPL move 3"
+    assert inbox.unread_count == 4
+    # Keys from earlier days are pruned
+    assert {key[-1] for key in inbox._seen} == {datetime.now().date()}
+    assert inbox.add({'type': 'market_news', 'message': "News", 'timestamp': datetime.now(), 'read': False}) == 4
+    assert inbox.add({'type': 'market_news', 'message': "News", 'timestamp': datetime.now(), 'read': False}) is None
+    inbox.mark_read([4])
+
+    page = inbox.unread_page(0, page_size=10)
+    assert [group['key'] for group in page] == [('price_change', 'AAPL'), ('price_change', 'MSFT')]
+    assert page[0]['count'] == 3
+    assert page[0]['summary'] == "AAPL: 3 moves, latest +7.0%"
+    assert page[1]['summary'] == "MSFT move 1"
+    assert inbox.unread_page(1, page_size=1)[0]['key'] == ('price_change', 'MSFT')
+
+    inbox.mark_read([3])
+    assert inbox.unread_page(0)[0]['summary'] == "AAPL: 2 moves, latest +5.3%"
+    inbox.mark_group_read(('price_change', 'AAPL'))
+    assert inbox.unread_count == 1 and inbox.group_count == 1
+    inbox.mark_all_read()
+    assert inbox.unread_count == 0 and inbox.unread_page(0) == []
+    assert all(n['read'] for n in inbox.notifications)
+
 if __name__ == "__main__":
-    test_notification_system()
+    setup_module()
+    try:
+        test_notification_system()
+        test_notification_inbox()
+    finally:
+        teardown_module()
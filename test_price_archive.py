@@ -0,0 +1,74 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import market_data
+from price_archive import PriceArchive, PriceArchiveError, ArchiveProvider, write_archive, _synthetic_bars
+
+
+def test_roundtrip_and_range_reads():
+    daily = _synthetic_bars(3000, "B", 1)
+    minute = _synthetic_bars(5000, "min", 2)
+    gappy = daily.copy()
+    gappy.iloc[5, 0] = np.nan
+    gappy["Volume"] = gappy["Volume"] + 0.5
+    exact = daily * (1 + 1e-9)
+    zoned = daily.tz_localize("America/New_York")
+    histories = {"DAILY": daily, "MINUTE": minute, "GAPPY": gappy, "ZONED": zoned, "ONE": daily.iloc[:1]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.ispa")
+        write_archive(path, histories, chunk_rows=500)
+        exact_path = os.path.join(tmp, "exact.ispa")
+        write_archive(exact_path, {"EXACT": exact})
+        rounded_path = os.path.join(tmp, "rounded.ispa")
+        write_archive(rounded_path, {"EXACT": exact}, price_decimals=2)
+
+        with PriceArchive(path) as archive, PriceArchive(exact_path) as exact_archive, \
+                PriceArchive(rounded_path) as rounded_archive:
+            assert archive.symbols == list(histories)
+            for symbol, history in histories.items():
+                pd.testing.assert_frame_equal(archive.read(symbol), history.astype(float), check_freq=False, check_index_type=False)
+            # Prices are stored exactly unless rounding is asked for
+            pd.testing.assert_frame_equal(exact_archive.read("EXACT"), exact.astype(float), check_exact=True,
+                                          check_freq=False, check_index_type=False)
+            error = (rounded_archive.read("EXACT") - exact).abs().to_numpy()
+            assert 0 < error.max() <= 0.005
+            assert os.path.getsize(rounded_path) < os.path.getsize(exact_path)
+
+            window = archive.read("DAILY", "2005-01-01", "2005-12-31")
+            pd.testing.assert_frame_equal(window, daily.loc["2005-01-01":"2005-12-31"].astype(float), check_freq=False, check_index_type=False)
+            session = archive.read("MINUTE", "2024-01-03 09:30", "2024-01-03 15:59", columns=["Close"])
+            assert list(session.columns) == ["Close"] and len(session) == 390
+            assert archive.read("DAILY", "1990-01-01", "1990-12-31").empty
+
+            tail = archive.tail("ZONED", 126)
+            pd.testing.assert_frame_equal(tail, zoned.iloc[-126:].astype(float), check_freq=False, check_index_type=False)
+            assert archive.read("ZONED", "2011-06-01", "2011-06-30").index[0] == pd.Timestamp("2011-06-01", tz="America/New_York")
+            assert archive.date_range("DAILY") == (daily.index[0], daily.index[-1])
+
+
+def test_rejects_other_files_and_serves_provider_requests():
+    fake = market_data.FakeMarketDataProvider()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.ispa")
+        with open(path, "w") as f:
+            f.write("Date,Close\n" * 10)
+        try:
+            PriceArchive(path)
+            assert False, "expected PriceArchiveError"
+        except PriceArchiveError:
+            pass
+
+        write_archive(path, fake.histories(["AAPL"], "5y"))
+        provider = ArchiveProvider(path, fallback=fake)
+        history = provider.ticker("AAPL").history(period="6mo")
+        expected = fake.history("AAPL", "6mo")[["Open", "High", "Low", "Close", "Volume"]]
+        pd.testing.assert_frame_equal(history, expected.astype(float), check_freq=False, check_index_type=False, atol=1e-4)
+        assert sorted(provider.histories(["AAPL", "MSFT"], "1mo")) == ["AAPL", "MSFT"]
+        assert provider.info("AAPL") == fake.info("AAPL")
+
+
+if __name__ == "__main__":
+    for test in (test_roundtrip_and_range_reads, test_rejects_other_files_and_serves_provider_requests):
+        test()
+        print(f"{test.__name__} passed")
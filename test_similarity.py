@@ -0,0 +1,88 @@
+import numpy as np
+import market_data
+import similarity
+from similarity import SimilarityIndex, _synthetic_universe
+
+
+def test_exact_and_approximate_queries():
+    histories, infos, _ = _synthetic_universe(600)
+    index = SimilarityIndex(clusters=20).build(histories, infos)
+    symbol = index.symbols[0]
+    assert symbol in index and "NOPE" not in index
+    matches = index.most_similar(symbol, 10)
+    assert len(matches) == 10 and symbol not in [match for match, _ in matches]
+    scores = [score for _, score in matches]
+    assert scores == sorted(scores, reverse=True)
+    # Stocks driven by the same sector factor and in the same sector rank first
+    assert all(infos[match]["sector"] == infos[symbol]["sector"] for match, _ in matches)
+
+    # Every cluster probed is an exact search
+    assert index.most_similar(symbol, 10, mode="approximate", nprobe=20) == matches
+    assert [match for match, _ in matches][:5] == [index.symbols[i] for i in index.most_similar_all(10, block_size=64)[0][:5]]
+
+    # The return part of a vector is the correlation of returns
+    other = matches[0][0]
+    returns = [np.diff(np.log(histories[s]["Close"].to_numpy()[-(index.window + 1):])) for s in (symbol, other)]
+    correlation = np.corrcoef(returns)[0, 1]
+    fundamentals = index._fundamentals[index._rows[symbol]] @ index._fundamentals[index._rows[other]]
+    assert np.isclose(matches[0][1], 0.7 * correlation + 0.3 * fundamentals, atol=1e-4)
+
+
+def test_incremental_updates_match_rebuild():
+    histories, infos, _ = _synthetic_universe(200)
+    latest = {symbol: history.iloc[:-1] for symbol, history in histories.items()}
+    index = SimilarityIndex(clusters=10).build(latest, infos)
+    new_bars = {symbol: history.iloc[-1:] for symbol, history in histories.items()}
+    assert index.update(new_bars) == 1
+    assert index.update(new_bars) == 0
+
+    rebuilt = SimilarityIndex(clusters=10).build(histories, infos)
+    assert index.last_date == rebuilt.last_date
+    assert np.allclose(index._vectors, rebuilt._vectors, atol=1e-6)
+    assert index.most_similar("T00007", 5) == rebuilt.most_similar("T00007", 5)
+
+    # A ticker outside the index is answered without adding it
+    twin = histories["T00003"].copy()
+    outside = index.most_similar_to(twin, dict(infos["T00003"]), 6)
+    assert outside[0][0] == "T00003" and np.isclose(outside[0][1], 1, atol=1e-5)
+    assert [match for match, _ in outside[1:]] == [match for match, _ in index.most_similar("T00003", 5)]
+    assert index.most_similar_to(twin, infos["T00003"], 6, mode="approximate", nprobe=10) == outside
+    assert "TWIN" not in index and len(index.symbols) == len(rebuilt.symbols)
+
+    # Added tickers are searchable and can be found from their twin
+    index.add("TWIN", twin, dict(infos["T00003"]))
+    assert index.most_similar("TWIN", 1)[0][0] == "T00003"
+    assert index.most_similar("T00003", 1, mode="approximate")[0][0] == "TWIN"
+
+
+class _FlakyProvider(market_data.FakeMarketDataProvider):
+    def info(self, symbol):
+        if symbol == "ZZZ":
+            raise RuntimeError("429 Too Many Requests")
+        return super().info(symbol)
+
+
+def test_index_builds_in_background_and_survives_upstream_errors():
+    previous = market_data.set_provider(_FlakyProvider())
+    similarity._index, similarity._index_checked_at = None, 0.0
+    try:
+        assert similarity.get_similarity_index(wait=True) is not None
+        assert "AAPL" in similarity._index and "^GSPC" not in similarity._index
+        assert len(similarity.similar_stocks("AAPL", 3)) == 3
+        # An upstream failure for a missing ticker gives no results instead of an error
+        assert similarity.similar_stocks("ZZZ").empty
+        assert similarity.similar_stocks("QQQQ", 3)["Symbol"].tolist()
+        # Off-universe lookups do not grow the index
+        size = len(similarity._index.symbols)
+        similarity.similar_stocks("QQQR", 3)
+        assert "QQQQ" not in similarity._index and len(similarity._index.symbols) == size
+    finally:
+        market_data.set_provider(previous)
+        similarity._index, similarity._index_checked_at = None, 0.0
+
+
+if __name__ == "__main__":
+    for test in (test_exact_and_approximate_queries, test_incremental_updates_match_rebuild,
+                 test_index_builds_in_background_and_survives_upstream_errors):
+        test()
+        print(f"{test.__name__} passed")
@@ -0,0 +1,77 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from fake_upstream import CountingProvider
+from watchlist_dashboard import COLUMNS, EVICT_AFTER_REFRESHES, SPARKLINE_POINTS, WatchlistTable
+
+
+def test_rows_match_histories_and_refresh_incrementally():
+    upstream = CountingProvider()
+    table = WatchlistTable(upstream, refresh_seconds=3600)
+    symbols = ["AAA", "BBB", "CCC"]
+    frame, changed = table.update(symbols + ["AAA"])
+    assert upstream.fetches == 1 and changed == symbols
+    assert list(frame.columns) == COLUMNS and list(frame["Symbol"]) == symbols
+
+    history = upstream.inner.history("BBB", "1y")
+    row = frame.iloc[1]
+    assert np.isclose(row["Price"], history["Close"].iloc[-1])
+    assert np.isclose(row["Change %"], (history["Close"].iloc[-1] / history["Close"].iloc[-2] - 1) * 100)
+    assert np.isclose(row["52W Low"], history["Low"].min()) and np.isclose(row["52W High"], history["High"].max())
+    assert 0 <= row["52W Range"] <= 1
+    assert len(row["Trend"]) == SPARKLINE_POINTS
+    assert row["Trend"][0] == round(history["Close"].iloc[0], 4) and row["Trend"][-1] == round(history["Close"].iloc[-1], 4)
+
+    # Fresh histories are not refetched and unchanged rows are not recomputed
+    _, changed = table.update(symbols + ["DDD"])
+    assert upstream.fetches == 2 and changed == ["DDD"]
+
+    # A new bar recomputes only that ticker's row
+    fetched_at, history = table._histories["CCC"]
+    bar = history.iloc[-1:] * 1.1
+    bar.index = bar.index + pd.offsets.BDay(1)
+    table._histories["CCC"] = (fetched_at, pd.concat([history, bar]))
+    frame, changed = table.update(symbols)
+    assert changed == ["CCC"] and np.isclose(frame.iloc[2]["Change %"], 10)
+
+
+def test_missing_tickers_get_an_empty_row():
+    class EmptyProvider:
+        def histories(self, symbols, period="1y"):
+            return {}
+
+    frame, changed = WatchlistTable(EmptyProvider()).update(["NOPE"])
+    assert changed == ["NOPE"]
+    assert frame.iloc[0]["Symbol"] == "NOPE" and pd.isna(frame.iloc[0]["Price"]) and frame.iloc[0]["Trend"] == []
+
+
+def test_concurrent_sessions_share_one_fetch_and_unviewed_tickers_are_evicted():
+    class SlowProvider(CountingProvider):
+        def histories(self, symbols, period="1y"):
+            time.sleep(0.2)
+            return super().histories(symbols, period)
+
+    upstream = SlowProvider()
+    table = WatchlistTable(upstream, refresh_seconds=60)
+    frames = []
+    sessions = [threading.Thread(target=lambda: frames.append(table.update(["AAA", "BBB"])[0])) for _ in range(4)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    # One session fetched; the others waited for its result
+    assert upstream.fetches == 1 and not table._in_flight
+    assert all(frame["Price"].notna().all() for frame in frames)
+
+    fetched_at, history = table._histories["AAA"]
+    table._histories["AAA"] = (fetched_at - EVICT_AFTER_REFRESHES * 60, history)
+    table.update(["BBB", "CCC"])
+    assert sorted(table._histories) == sorted(table._rows) == ["BBB", "CCC"]
+
+
+if __name__ == "__main__":
+    for test in (test_rows_match_histories_and_refresh_incrementally, test_missing_tickers_get_an_empty_row,
+                 test_concurrent_sessions_share_one_fetch_and_unviewed_tickers_are_evicted):
+        test()
+        print(f"{test.__name__} passed")
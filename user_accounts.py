@@ -1,12 +1,12 @@
 import streamlit as st
 import bcrypt
-import pandas as pd
 from typing import Dict, List
 import json
 import os
+from metrics import timed
 
 # File to store user data
-USER_DATA_FILE = 'user_data.json'
+USER_DATA_FILE = os.environ.get('INVESTSMARTLY_USER_DATA', 'user_data.json')
 
 def load_users():
     if os.path.exists(USER_DATA_FILE):
@@ -14,6 +14,7 @@ def load_users():
             return json.load(f)
     return {}
 
+@timed("storage.save_users")
 def save_users(users):
     with open(USER_DATA_FILE, 'w') as f:
         json.dump(users, f)
@@ -21,10 +22,18 @@ def save_users(users):
 # Load user data
 users_db = load_users()
 
+def use_user_store(path: str) -> None:
+    """Switch to another user data file, e.g. a throwaway store for tests."""
+    global USER_DATA_FILE
+    USER_DATA_FILE = path
+    users_db.clear()
+    users_db.update(load_users())
+
 def create_user(username: str, password: str) -> bool:
     if username in users_db:
         return False
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with timed("auth.bcrypt_hash"):
+        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     users_db[username] = {
         'password': hashed_password,
         'preferences': {},
@@ -36,7 +45,8 @@ def create_user(username: str, password: str) -> bool:
 def authenticate_user(username: str, password: str) -> bool:
     if username not in users_db:
         return False
-    return bcrypt.checkpw(password.encode('utf-8'), users_db[username]['password'].encode('utf-8'))
+    with timed("auth.bcrypt_check"):
+        return bcrypt.checkpw(password.encode('utf-8'), users_db[username]['password'].encode('utf-8'))
 
 def get_user_preferences(username: str) -> Dict:
     return users_db[username]['preferences']
@@ -52,6 +62,7 @@ def update_user_watchlist(username: str, watchlist: List[str]) -> None:
     users_db[username]['watchlist'] = watchlist
     save_users(users_db)
 
+@timed("recommendations.build")
 def get_personalized_recommendations(username: str) -> List[str]:
     preferences = get_user_preferences(username)
     watchlist = get_user_watchlist(username)
@@ -1,3 +1,15 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+
+# Static assets fetched over the network are cached here between processes.
+ASSET_CACHE_DIR = os.environ.get('INVESTSMARTLY_CACHE_DIR', '.cache')
+
+# After a failed asset fetch, wait this long before trying again.
+ASSET_RETRY_SECONDS = 600
+
 def format_large_number(num):
     if num >= 1_000_000_000_000:
         return f"${num / 1_000_000_000_000:.2f}T"
@@ -7,3 +19,45 @@ def format_large_number(num):
         return f"${num / 1_000_000:.2f}M"
     else:
         return f"${num:,.0f}"
+
+
+@lru_cache(maxsize=None)
+def read_text_file(path):
+    """Read a static text file once per process."""
+    with open(path) as f:
+        return f.read()
+
+_lottie_cache = {}
+
+def load_lottieurl(url: str):
+    """
+    Load a Lottie animation, fetching it over the network only once.
+
+    Animations are kept in memory for the life of the process and on disk in
+    ASSET_CACHE_DIR across restarts. A failed fetch is retried after
+    ASSET_RETRY_SECONDS rather than on every render.
+    """
+    cached = _lottie_cache.get(url)
+    if cached is not None and (cached[0] is not None or time.time() - cached[1] < ASSET_RETRY_SECONDS):
+        return cached[0]
+    
+    path = os.path.join(ASSET_CACHE_DIR, f"lottie_{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json")
+    lottie_json = None
+    if os.path.exists(path):
+        with open(path) as f:
+            lottie_json = json.load(f)
+    else:
+        import requests
+        try:
+            r = requests.get(url, timeout=5)
+            if r.status_code == 200:
+                lottie_json = r.json()
+                os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+                with open(f"{path}.tmp", 'w') as f:
+                    json.dump(lottie_json, f)
+                os.replace(f"{path}.tmp", path)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching animation {url}: {e}")
+    
+    _lottie_cache[url] = (lottie_json, time.time())
+    return lottie_json
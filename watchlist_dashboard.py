@@ -0,0 +1,248 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import market_data
+from metrics import timed, increment
+
+# Watchlist dashboard.
+#
+# The whole watchlist is shown as one table: last price, day change, 52-week
+# range and a sparkline per ticker, rendered by st.dataframe with a
+# LineChartColumn instead of one Plotly chart per ticker.
+#
+# Histories and rows are kept process-wide, per ticker, so users watching the
+# same tickers share them:
+#   histories   refetched only when older than REFRESH_SECONDS, all stale
+#               tickers of a watchlist in one batched market_data.histories call;
+#               a ticker already being fetched for another session is waited
+#               for instead of fetched again
+#   rows        recomputed only when the ticker's history changed; the
+#               sparkline is LTTB-downsampled to SPARKLINE_POINTS once per change
+#
+# Tickers nobody has viewed for EVICT_AFTER_REFRESHES refresh periods are dropped.
+
+HISTORY_PERIOD = "1y"
+REFRESH_SECONDS = 60
+EVICT_AFTER_REFRESHES = 5
+SPARKLINE_POINTS = 60
+# Trading days in 52 weeks.
+YEAR_BARS = 252
+
+COLUMNS = ["Symbol", "Price", "Change %", "52W Low", "52W High", "52W Range", "Trend"]
+
+
+def _fingerprint(history):
+    if history is None or history.empty:
+        return None
+    return (len(history), history.index[-1], float(history["Close"].iloc[-1]))
+
+
+def sparkline(close, points=SPARKLINE_POINTS):
+    """
+    Downsample closes to a short sparkline that keeps the shape of the series.
+
+    :param close: Array of closes
+    :param points: Number of points to keep
+    :return: List of floats
+    """
+    from charts import lttb
+    close = np.asarray(close, dtype=np.float64)
+    close = close[~np.isnan(close)]
+    return close[lttb(np.arange(len(close)), close, points)].round(4).tolist()
+
+
+def watchlist_row(symbol, history):
+    """
+    One dashboard row.
+
+    :param symbol: Ticker symbol
+    :param history: History DataFrame with a Close column (and High/Low if available), or None
+    :return: Dict with one value per COLUMNS entry
+    """
+    row = dict.fromkeys(COLUMNS)
+    row["Symbol"] = symbol
+    close = history["Close"].to_numpy(dtype=np.float64) if history is not None and not history.empty else np.empty(0)
+    close = close[~np.isnan(close)]
+    if len(close) == 0:
+        row["Trend"] = []
+        return row
+    year = history.iloc[-YEAR_BARS:]
+    low = np.nanmin(year["Low"].to_numpy(dtype=np.float64) if "Low" in year else close[-YEAR_BARS:])
+    high = np.nanmax(year["High"].to_numpy(dtype=np.float64) if "High" in year else close[-YEAR_BARS:])
+    row.update({
+        "Price": close[-1],
+        "Change %": (close[-1] / close[-2] - 1) * 100 if len(close) > 1 else np.nan,
+        "52W Low": low,
+        "52W High": high,
+        "52W Range": (close[-1] - low) / (high - low) if high > low else np.nan,
+        "Trend": sparkline(close[-YEAR_BARS:]),
+    })
+    return row
+
+
+class WatchlistTable:
+    """
+    Cached histories and rows of the watchlist dashboard.
+
+    :param provider: Market data provider, or None for the active provider
+    :param refresh_seconds: Age after which a ticker's history is refetched
+    """
+
+    def __init__(self, provider=None, refresh_seconds=REFRESH_SECONDS):
+        self.provider = provider
+        self.refresh_seconds = refresh_seconds
+        self._histories = {}
+        self._rows = {}
+        # Symbol -> Event set when the fetch in progress for it finishes.
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # A viewed ticker is refetched every refresh period, so an old fetch means nobody is viewing it.
+        expired = [symbol for symbol, (fetched_at, _) in self._histories.items()
+                   if now - fetched_at >= EVICT_AFTER_REFRESHES * self.refresh_seconds and symbol not in self._in_flight]
+        for symbol in expired:
+            del self._histories[symbol]
+            self._rows.pop(symbol, None)
+        increment("watchlist.evicted", len(expired))
+
+    def _fetch(self, symbols):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            stale = [symbol for symbol in symbols
+                     if now - self._histories.get(symbol, (0.0, None))[0] >= self.refresh_seconds]
+            waiting = [self._in_flight[symbol] for symbol in stale if symbol in self._in_flight]
+            stale = [symbol for symbol in stale if symbol not in self._in_flight]
+            done = threading.Event()
+            for symbol in stale:
+                self._in_flight[symbol] = done
+        try:
+            if stale:
+                with timed("watchlist.fetch"):
+                    provider = self.provider or market_data.get_provider()
+                    try:
+                        fetched = provider.histories(stale, HISTORY_PERIOD)
+                    except Exception as e:
+                        print(f"Error fetching watchlist histories: {e}")
+                        fetched = {}
+                with self._lock:
+                    for symbol in stale:
+                        history = fetched.get(symbol)
+                        if history is None and symbol in self._histories:
+                            # Keep the last good history if the refresh failed.
+                            history = self._histories[symbol][1]
+                        self._histories[symbol] = (now, history)
+        finally:
+            with self._lock:
+                for symbol in stale:
+                    del self._in_flight[symbol]
+            done.set()
+        for event in set(waiting):
+            event.wait()
+        return stale
+
+    @timed("watchlist.update")
+    def update(self, symbols):
+        """
+        Refresh stale histories and recompute the rows whose history changed.
+
+        :param symbols: Watchlist tickers
+        :return: Tuple of (table DataFrame in watchlist order, list of recomputed symbols)
+        """
+        symbols = list(dict.fromkeys(symbols))
+        self._fetch(symbols)
+        changed = []
+        with self._lock:
+            for symbol in symbols:
+                history = self._histories.get(symbol, (0.0, None))[1]
+                fingerprint = _fingerprint(history)
+                cached = self._rows.get(symbol)
+                if cached is None or cached[0] != fingerprint:
+                    self._rows[symbol] = (fingerprint, watchlist_row(symbol, history))
+                    changed.append(symbol)
+            rows = [self._rows[symbol][1] for symbol in symbols]
+        increment("watchlist.rows_recomputed", len(changed))
+        return pd.DataFrame(rows, columns=COLUMNS), changed
+
+
+_table = WatchlistTable()
+
+
+def get_watchlist_table(symbols):
+    """
+    The dashboard table for a watchlist from the process-wide cache.
+
+    :param symbols: Watchlist tickers
+    :return: Tuple of (table DataFrame, list of recomputed symbols)
+    """
+    return _table.update(symbols)
+
+
+def _per_ticker_render(symbols):
+    """The Stock Analysis approach, for comparison: one request and one Plotly chart per ticker."""
+    from stock_analysis import get_stock_info
+    from charts import build_price_figure
+    for symbol in symbols:
+        info = get_stock_info(symbol, HISTORY_PERIOD)
+        build_price_figure(symbol, info["history"], HISTORY_PERIOD).to_json()
+
+
+def _dashboard_render(symbols):
+    """The dashboard: the table and its Arrow payload, as st.dataframe sends it."""
+    import pyarrow as pa
+    table, _ = get_watchlist_table(symbols)
+    return pa.Table.from_pandas(table).nbytes
+
+
+def benchmark_watchlist(sizes=(10, 50, 200)):
+    """
+    Time-to-render of watchlists against one Plotly chart per ticker: cold,
+    warm, and after one ticker gets a new bar.
+
+    :param sizes: Watchlist sizes
+    """
+    from fake_upstream import CountingProvider
+    import charts  # Plotly's import time is not part of either render
+    global _table
+    for size in sizes:
+        symbols = [f"W{i:03d}" for i in range(size)]
+        previous = market_data.set_provider(CountingProvider())
+        try:
+            start_time = time.perf_counter()
+            _per_ticker_render(symbols)
+            per_ticker_seconds = time.perf_counter() - start_time
+            per_ticker_fetches = market_data.get_provider().fetches
+
+            upstream = CountingProvider()
+            _table = WatchlistTable(upstream)
+            start_time = time.perf_counter()
+            payload = _dashboard_render(symbols)
+            cold_seconds = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            _dashboard_render(symbols)
+            warm_seconds = time.perf_counter() - start_time
+
+            # One ticker gets a new bar: only its row is recomputed.
+            fetched_at, history = _table._histories[symbols[0]]
+            bar = history.iloc[-1:].copy()
+            bar.index = bar.index + pd.offsets.BDay(1)
+            _table._histories[symbols[0]] = (fetched_at, pd.concat([history, bar]))
+            start_time = time.perf_counter()
+            _, changed = _table.update(symbols)
+            incremental_seconds = time.perf_counter() - start_time
+        finally:
+            market_data.set_provider(previous)
+        print(f"{size} tickers:")
+        print(f"  one chart per ticker: {per_ticker_fetches:4d} requests, {per_ticker_seconds * 1000:8.1f} ms")
+        print(f"  dashboard cold:       {upstream.fetches:4d} requests, {cold_seconds * 1000:8.1f} ms, "
+              f"{payload / 1024:.1f} KiB table")
+        print(f"  dashboard warm:                      {warm_seconds * 1000:8.1f} ms")
+        print(f"  one new bar:          {len(changed):4d} row recomputed, {incremental_seconds * 1000:6.1f} ms")
+    _table = WatchlistTable()
+
+
+if __name__ == "__main__":
+    print("Benchmarking watchlist dashboard...")
+    benchmark_watchlist()